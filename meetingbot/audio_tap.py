@@ -0,0 +1,242 @@
+"""
+Audio Tap - живой PCM-поток звука встречи для локальных потребителей
+
+ffmpeg записи пишет второй выход (s16le) в pipe, AudioTap режет его на кадры
+фиксированного размера и раздаёт подписчикам: генератор, async-итератор и
+Unix-сокет. У каждого подписчика ограниченная очередь; если подписчик не
+успевает, кадры отбрасываются (ffmpeg и запись никогда не ждут потребителей).
+"""
+import asyncio
+import json
+import os
+import socketserver
+import threading
+from collections import deque
+from pathlib import Path
+
+# Политики переполнения очереди подписчика
+DROP_OLDEST = "drop_oldest"  # выбросить самый старый кадр (минимальная задержка)
+DROP_NEWEST = "drop_newest"  # не принимать новый кадр (без разрывов внутри очереди)
+
+
+class AudioSubscription:
+    """Очередь кадров одного подписчика"""
+
+    def __init__(self, tap: "AudioTap", max_frames: int, drop_policy: str):
+        if drop_policy not in (DROP_OLDEST, DROP_NEWEST):
+            raise ValueError(f"Неизвестная политика переполнения: {drop_policy}")
+        self.tap = tap
+        self.max_frames = max_frames
+        self.drop_policy = drop_policy
+        self.dropped = 0
+        self.closed = False
+        self._frames = deque()
+        self._ready = threading.Condition()
+
+    def _put(self, frame: bytes):
+        with self._ready:
+            if len(self._frames) >= self.max_frames:
+                self.dropped += 1
+                if self.drop_policy == DROP_NEWEST:
+                    return
+                self._frames.popleft()
+            self._frames.append(frame)
+            self._ready.notify()
+
+    def _finish(self):
+        with self._ready:
+            self.closed = True
+            self._ready.notify_all()
+
+    def get(self, timeout: float = None):
+        """Следующий кадр; None - поток закончился (или таймаут)"""
+        with self._ready:
+            if not self._ready.wait_for(lambda: self._frames or self.closed, timeout=timeout):
+                return None
+            if self._frames:
+                return self._frames.popleft()
+            return None
+
+    def close(self):
+        """Отписаться"""
+        self.tap._unsubscribe(self)
+        self._finish()
+
+    def __iter__(self):
+        try:
+            while True:
+                frame = self.get()
+                if frame is None:
+                    return
+                yield frame
+        finally:
+            self.close()
+
+    def __aiter__(self):
+        return self._async_frames()
+
+    async def _async_frames(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                # Ожидание кадра - в пуле потоков, чтобы не блокировать event loop
+                frame = await loop.run_in_executor(None, self.get, 1.0)
+                if frame is None:
+                    if self.closed and not self._frames:
+                        return
+                    continue
+                yield frame
+        finally:
+            self.close()
+
+
+class AudioTap:
+    """Раздача PCM-кадров из pipe ffmpeg подписчикам"""
+
+    def __init__(self, sample_rate: int = 16000, channels: int = 1, frame_ms: int = 20,
+                 max_frames: int = 250, drop_policy: str = DROP_OLDEST):
+        """
+        Args:
+            sample_rate: Частота дискретизации PCM (Гц)
+            channels: Число каналов
+            frame_ms: Длительность кадра (мс); кадр = sample_rate * channels * 2 * frame_ms / 1000 байт
+            max_frames: Размер очереди подписчика по умолчанию (250 x 20 мс = 5 сек)
+            drop_policy: Что делать при переполнении очереди (DROP_OLDEST / DROP_NEWEST)
+        """
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.frame_ms = frame_ms
+        self.frame_bytes = sample_rate * channels * 2 * frame_ms // 1000
+        self.max_frames = max_frames
+        self.drop_policy = drop_policy
+        self.frames_read = 0
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._reader = None
+        self._server = None
+        self._socket_path = None
+        self._finished = False
+
+    def ffmpeg_output_args(self, audio_map: str, fd: int) -> list:
+        """Второй выход ffmpeg: сырой PCM в унаследованный дескриптор"""
+        return [
+            "-map", audio_map,
+            "-codec:a", "pcm_s16le",
+            "-ar", str(self.sample_rate),
+            "-ac", str(self.channels),
+            "-f", "s16le",
+            "-flush_packets", "1",
+            f"pipe:{fd}",
+        ]
+
+    def format(self) -> dict:
+        """Описание потока (отправляется первой строкой клиентам сокета)"""
+        return {
+            "format": "s16le",
+            "sample_rate": self.sample_rate,
+            "channels": self.channels,
+            "frame_ms": self.frame_ms,
+            "frame_bytes": self.frame_bytes,
+        }
+
+    def attach(self, fd: int):
+        """Начать читать PCM из дескриптора (читающий конец pipe ffmpeg)"""
+        self._reader = threading.Thread(target=self._read, args=(fd,), name="audio-tap", daemon=True)
+        self._reader.start()
+
+    def _read(self, fd: int):
+        buffer = bytearray()
+        with os.fdopen(fd, "rb", buffering=0) as stream:
+            while True:
+                chunk = stream.read(65536)
+                if not chunk:
+                    break
+                buffer.extend(chunk)
+                while len(buffer) >= self.frame_bytes:
+                    frame = bytes(buffer[:self.frame_bytes])
+                    del buffer[:self.frame_bytes]
+                    self._publish(frame)
+        self._finish()
+
+    def _publish(self, frame: bytes):
+        self.frames_read += 1
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription._put(frame)
+
+    def _finish(self):
+        with self._lock:
+            self._finished = True
+            subscribers = self._subscribers
+            self._subscribers = []
+        for subscription in subscribers:
+            subscription._finish()
+
+    def subscribe(self, max_frames: int = None, drop_policy: str = None) -> AudioSubscription:
+        """Новый подписчик; кадры приходят с момента подписки"""
+        subscription = AudioSubscription(self, max_frames or self.max_frames, drop_policy or self.drop_policy)
+        with self._lock:
+            if self._finished:
+                subscription.closed = True
+            else:
+                self._subscribers.append(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: AudioSubscription):
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    def frames(self, max_frames: int = None, drop_policy: str = None):
+        """Генератор кадров (bytes по frame_bytes) до конца записи"""
+        return iter(self.subscribe(max_frames, drop_policy))
+
+    def serve(self, socket_path: Path):
+        """Раздавать кадры через Unix-сокет (каждое подключение - отдельный подписчик)
+
+        Протокол: первая строка - JSON с форматом потока, дальше сырые кадры.
+        """
+        socket_path = Path(socket_path)
+        if socket_path.exists():
+            socket_path.unlink()
+        tap = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                subscription = tap.subscribe()
+                try:
+                    self.request.sendall((json.dumps(tap.format()) + "\n").encode())
+                    for frame in subscription:
+                        self.request.sendall(frame)
+                except OSError:
+                    # Клиент отключился
+                    pass
+                finally:
+                    subscription.close()
+
+        self._server = socketserver.ThreadingUnixStreamServer(str(socket_path), Handler)
+        self._server.daemon_threads = True
+        self._socket_path = socket_path
+        threading.Thread(target=self._server.serve_forever, name="audio-tap-socket", daemon=True).start()
+        print(f"   🎧 Аудио-поток: {socket_path} ({self.sample_rate} Гц, кадр {self.frame_ms} мс)")
+
+    def stats(self) -> dict:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        return {
+            "frames_read": self.frames_read,
+            "subscribers": len(subscribers),
+            "dropped": sum(s.dropped for s in subscribers),
+        }
+
+    def close(self):
+        """Остановить раздачу (подписчики получают конец потока)"""
+        self._finish()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._socket_path and self._socket_path.exists():
+            self._socket_path.unlink()
+        self._socket_path = None
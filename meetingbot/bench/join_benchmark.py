@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Join Benchmark - замер ZoomConnector на локальном стенде (без живого Zoom)
+
+Каждая итерация: запуск Chrome -> join_meeting -> серия check_in_meeting ->
+leave_meeting -> ожидание события выхода. Метрики (p50/p95 по итерациям):
+  browser_launch_ms      холодный запуск Chrome
+  time_to_join_ms        join_meeting целиком
+  join_webdriver_calls   WebDriver-запросов (round trips) за join_meeting
+  screenshot_ms          синхронная часть одного скриншота (CDP captureScreenshot)
+  check_in_meeting_ms    один вызов check_in_meeting
+  check_webdriver_calls  WebDriver-запросов на один check_in_meeting
+  leave_ms               leave_meeting
+  exit_detection_ms      от подтверждения выхода в странице до возврата wait_for_meeting_end
+
+Запуск:
+    python bench/join_benchmark.py [--iterations 5] [--dom-delay-ms 300] [--latency-ms 20]
+                                   [--no-screenshots] [--output result.json]
+                                   [--baseline baseline.json --tolerance 0.2]
+
+С --baseline код возврата 1, если p50 любой метрики хуже базового больше чем на tolerance.
+"""
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from browser import launch_browser, quit_browser  # noqa: E402
+from config import BotConfig  # noqa: E402
+from connectors import ZoomConnector  # noqa: E402
+from screenshots import ScreenshotPipeline  # noqa: E402
+from tracing import Tracer, percentile  # noqa: E402
+from zoom_standin import StandinServer  # noqa: E402
+
+# Сколько раз вызывать check_in_meeting за итерацию
+CHECK_CALLS = 20
+
+# Метрики, для которых больше = хуже (все)
+METRICS = ("browser_launch_ms", "time_to_join_ms", "join_webdriver_calls", "screenshot_ms",
+           "check_in_meeting_ms", "check_webdriver_calls", "leave_ms", "exit_detection_ms")
+
+
+def run_iteration(server: StandinServer, args, work_dir: Path) -> dict:
+    # Окно 800x600 - под него рассчитаны координаты коннектора и стенда
+    config = BotConfig.from_env(meeting_url="", headless=True, window_width=800, window_height=600,
+                                enable_recording=False)
+    tracer = Tracer()
+    metrics = {}
+
+    started = time.perf_counter()
+    driver = launch_browser(config)
+    metrics["browser_launch_ms"] = (time.perf_counter() - started) * 1000
+    tracer.instrument_driver(driver)
+
+    screenshot_times = []
+    pipeline = None
+    take_screenshot = None
+    if not args.no_screenshots:
+        (work_dir / "screenshots").mkdir(parents=True, exist_ok=True)
+        pipeline = ScreenshotPipeline(driver, work_dir / "screenshots", image_format=config.screenshot_format,
+                                      viewport=(config.window_width, config.window_height),
+                                      policy=config.screenshot_policy)
+
+        def take_screenshot(name=None):
+            shot_started = time.perf_counter()
+            result = pipeline.capture(name)
+            screenshot_times.append((time.perf_counter() - shot_started) * 1000)
+            return result
+
+    try:
+        connector = ZoomConnector(driver, "Bench Bot", take_screenshot, display=config.display, tracer=tracer,
+                                  show_markers=config.screenshot_policy == "always")
+        url = server.meeting_url(dom_delay_ms=args.dom_delay_ms, join_delay_ms=args.join_delay_ms,
+                                 latency_ms=args.latency_ms)
+
+        calls_before = tracer.webdriver_calls
+        started = time.perf_counter()
+        if not connector.join_meeting(url):
+            raise RuntimeError("join_meeting вернул False")
+        metrics["time_to_join_ms"] = (time.perf_counter() - started) * 1000
+        metrics["join_webdriver_calls"] = tracer.webdriver_calls - calls_before
+        if screenshot_times:
+            metrics["screenshot_ms"] = percentile(screenshot_times, 50)
+
+        connector.start_presence_watcher()
+        check_times = []
+        calls_before = tracer.webdriver_calls
+        for _ in range(CHECK_CALLS):
+            check_started = time.perf_counter()
+            connector.check_in_meeting()
+            check_times.append((time.perf_counter() - check_started) * 1000)
+        metrics["check_in_meeting_ms"] = percentile(check_times, 50)
+        metrics["check_webdriver_calls"] = (tracer.webdriver_calls - calls_before) / CHECK_CALLS
+
+        started = time.perf_counter()
+        connector.leave_meeting()
+        metrics["leave_ms"] = (time.perf_counter() - started) * 1000
+
+        reason = connector.wait_for_meeting_end(timeout=10)
+        detected_at = time.time() * 1000
+        left_at = driver.execute_script("return window.__standinLeftAt || null;")
+        if reason and left_at:
+            metrics["exit_detection_ms"] = detected_at - left_at
+    finally:
+        if pipeline:
+            pipeline.close()
+        quit_browser(driver, promote="time_to_join_ms" in metrics)
+    return metrics
+
+
+def summarize(runs: list) -> dict:
+    summary = {}
+    for metric in METRICS:
+        values = [run[metric] for run in runs if metric in run]
+        if values:
+            summary[metric] = {"p50": round(percentile(values, 50), 2), "p95": round(percentile(values, 95), 2),
+                               "n": len(values)}
+    return summary
+
+
+def compare(summary: dict, baseline: dict, tolerance: float) -> list:
+    """Метрики, p50 которых хуже базового больше чем на tolerance"""
+    regressions = []
+    for metric, values in summary.items():
+        base = baseline.get(metric)
+        if base and base["p50"] > 0 and values["p50"] > base["p50"] * (1 + tolerance):
+            regressions.append((metric, base["p50"], values["p50"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк подключения ZoomConnector на локальном стенде")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--dom-delay-ms", type=int, default=300)
+    parser.add_argument("--join-delay-ms", type=int, default=500)
+    parser.add_argument("--latency-ms", type=int, default=20)
+    parser.add_argument("--bundle-kb", type=int, default=2048)
+    parser.add_argument("--no-screenshots", action="store_true", help="Без скриншотов (take_screenshot=None)")
+    parser.add_argument("--output", type=Path, help="Сохранить результат в JSON")
+    parser.add_argument("--baseline", type=Path, help="JSON предыдущего прогона для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Допустимое ухудшение p50 (доля)")
+    args = parser.parse_args()
+
+    server = StandinServer(bundle_kb=args.bundle_kb).start()
+    work_dir = Path(tempfile.mkdtemp(prefix="meetingbot-bench-"))
+    runs = []
+    try:
+        for i in range(args.iterations):
+            print(f"\n{'=' * 60}\n🧪 Итерация {i + 1}/{args.iterations}\n{'=' * 60}")
+            try:
+                runs.append(run_iteration(server, args, work_dir / str(i)))
+            except Exception as e:
+                print(f"❌ Итерация {i + 1} не удалась: {e}")
+    finally:
+        server.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    summary = summarize(runs)
+    print(f"\n{'метрика':<24} {'p50':>10} {'p95':>10} {'n':>4}")
+    print("-" * 51)
+    for metric, values in summary.items():
+        print(f"{metric:<24} {values['p50']:>10.1f} {values['p95']:>10.1f} {values['n']:>4}")
+    print(f"Успешных итераций: {len(runs)}/{args.iterations}")
+
+    result = {"params": {k: str(v) for k, v in vars(args).items()}, "summary": summary, "runs": runs}
+    if args.output:
+        args.output.write_text(json.dumps(result, ensure_ascii=False, indent=2))
+        print(f"💾 Результат: {args.output}")
+
+    failed = len(runs) < args.iterations
+    if args.baseline:
+        regressions = compare(summary, json.loads(args.baseline.read_text())["summary"], args.tolerance)
+        for metric, base, current in regressions:
+            print(f"⚠️  Регрессия {metric}: {base:.1f} -> {current:.1f}")
+        if not regressions:
+            print(f"✅ Регрессий нет (допуск {args.tolerance:.0%})")
+        failed = failed or bool(regressions)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
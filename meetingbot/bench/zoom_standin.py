@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Zoom Stand-in - локальная имитация страниц Zoom для ZoomConnector
+
+Повторяет то, что проходит коннектор (окно 800x600):
+  /j/<id>        лендинг: кнопка (400, 208) -> ссылка "Join from your browser" (536, 392)
+                 -> iframe#webclient
+  /wc/<id>       web client: поле #input-for-name, кнопки Mute / Stop Video / Join,
+                 после Join - интерфейс встречи с кнопкой Leave и диалогом подтверждения
+  /static/...    "бандл клиента" заданного размера (кэшируемый) и шрифт
+  /analytics/... маяки аналитики (для проверки блокировки запросов)
+
+Параметры задержек - query string URL встречи (передаются в iframe):
+  latency_ms       задержка ответа сервера на каждый запрос
+  dom_delay_ms     задержка появления элементов (лендинг, предпросмотр)
+  join_delay_ms    задержка между Join и интерфейсом встречи
+  end_after_s      хост завершает встречу через N сек после входа
+  remove_after_s   хост удаляет бота через N сек после входа
+  bundle_kb        размер /static/client.js (по умолчанию 2048)
+
+Запуск:
+    python bench/zoom_standin.py [--port 8765] [--latency-ms 0]
+    -> http://127.0.0.1:8765/j/123?dom_delay_ms=500
+"""
+import argparse
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+LANDING_HTML = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Zoom Stand-in</title>
+<link rel="stylesheet" href="/static/fonts.css?{query}">
+<script src="/static/client.js?{query}"></script>
+<script src="/analytics/tag.js"></script>
+<style>
+  html, body {{ margin: 0; height: 100%; font-family: sans-serif; }}
+  .hit {{ position: absolute; display: flex; align-items: center; justify-content: center; }}
+  #launch {{ left: 250px; top: 180px; width: 300px; height: 56px; }}
+  #browser-link {{ left: 430px; top: 372px; width: 220px; height: 40px; }}
+  #webclient {{ position: fixed; left: 0; top: 0; width: 100%; height: 100%; border: 0; background: #fff; }}
+</style></head>
+<body>
+<img src="/analytics/pixel.gif" width="1" height="1" alt="">
+<script>
+  var params = new URLSearchParams(location.search);
+  var domDelay = parseInt(params.get('dom_delay_ms') || '0', 10);
+  setTimeout(function() {{
+    var launch = document.createElement('button');
+    launch.id = 'launch';
+    launch.className = 'hit';
+    launch.textContent = 'Launch Meeting';
+    launch.onclick = function() {{
+      setTimeout(function() {{
+        var link = document.createElement('a');
+        link.id = 'browser-link';
+        link.className = 'hit';
+        link.href = '#';
+        link.textContent = 'Join from your browser';
+        link.onclick = function(e) {{
+          e.preventDefault();
+          var frame = document.createElement('iframe');
+          frame.id = 'webclient';
+          frame.name = 'webclient';
+          frame.src = '/wc/{meeting_id}' + location.search;
+          document.body.appendChild(frame);
+        }};
+        document.body.appendChild(link);
+      }}, domDelay);
+    }};
+    document.body.appendChild(launch);
+  }}, domDelay);
+</script>
+</body></html>
+"""
+
+WEBCLIENT_HTML = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Zoom Stand-in Web Client</title>
+<script src="/static/client.js?{query}"></script>
+<style>
+  html, body {{ margin: 0; height: 100%; font-family: sans-serif; }}
+  .abs {{ position: absolute; }}
+  #mute {{ left: 310px; top: 192px; width: 80px; height: 40px; }}
+  #video {{ left: 397px; top: 192px; width: 80px; height: 40px; }}
+  #input-for-name {{ left: 295px; top: 370px; width: 200px; height: 32px; }}
+  #join {{ left: 334px; top: 487px; width: 120px; height: 40px; }}
+  #notice {{ left: 560px; top: 180px; width: 200px; height: 40px; }}
+  #footer {{ left: 0; bottom: 0; width: 100%; height: 100px; background: #222; }}
+  #leave {{ left: 720px; top: 465px; width: 80px; height: 40px; position: fixed; }}
+  .zm-modal {{ position: fixed; left: 250px; top: 250px; width: 300px; padding: 20px; background: #eee; }}
+</style></head>
+<body>
+<script>
+  var params = new URLSearchParams(location.search);
+  var domDelay = parseInt(params.get('dom_delay_ms') || '0', 10);
+  var joinDelay = parseInt(params.get('join_delay_ms') || '500', 10);
+  var endAfter = parseFloat(params.get('end_after_s') || '0');
+  var removeAfter = parseFloat(params.get('remove_after_s') || '0');
+
+  function el(tag, id, text, attrs) {{
+    var e = document.createElement(tag);
+    if (id) e.id = id;
+    if (text) e.textContent = text;
+    Object.keys(attrs || {{}}).forEach(function(k) {{ e.setAttribute(k, attrs[k]); }});
+    e.classList.add('abs');
+    document.body.appendChild(e);
+    return e;
+  }}
+
+  function hostDialog(text, marker) {{
+    var footer = document.getElementById('footer');
+    if (footer) footer.remove();
+    var leave = document.getElementById('leave');
+    if (leave) leave.remove();
+    var dialog = el('div', null, text, {{role: 'dialog'}});
+    dialog.className = 'zm-modal';
+    window[marker] = Date.now();
+  }}
+
+  function meeting() {{
+    ['mute', 'video', 'input-for-name', 'join'].forEach(function(id) {{
+      var e = document.getElementById(id);
+      if (e) e.remove();
+    }});
+    el('div', 'footer');
+    var leave = el('button', 'leave', 'Leave', {{'aria-label': 'Leave'}});
+    leave.onclick = function() {{
+      var dialog = el('div', 'leave-dialog', null, {{role: 'dialog'}});
+      dialog.className = 'zm-modal';
+      var confirm = document.createElement('button');
+      confirm.textContent = 'Leave Meeting';
+      confirm.onclick = function() {{
+        dialog.remove();
+        document.getElementById('footer').remove();
+        leave.remove();
+        window.__standinLeftAt = Date.now();
+      }};
+      dialog.appendChild(confirm);
+    }};
+    var notice = el('button', 'notice', 'Got it');
+    notice.onclick = function() {{ notice.remove(); }};
+    window.__standinJoinedAt = Date.now();
+    if (endAfter) setTimeout(function() {{
+      hostDialog('This meeting has been ended by host', '__standinEndedAt');
+    }}, endAfter * 1000);
+    if (removeAfter) setTimeout(function() {{
+      hostDialog('You have been removed from this meeting by the host', '__standinRemovedAt');
+    }}, removeAfter * 1000);
+  }}
+
+  setTimeout(function() {{
+    var mute = el('button', 'mute', 'Mute', {{'aria-label': 'Mute'}});
+    mute.onclick = function() {{ mute.setAttribute('aria-label', 'Unmute'); mute.textContent = 'Unmute'; }};
+    var video = el('button', 'video', 'Stop Video', {{'aria-label': 'Stop Video'}});
+    video.onclick = function() {{ video.setAttribute('aria-label', 'Start Video'); video.textContent = 'Start Video'; }};
+    el('input', 'input-for-name', null, {{type: 'text', placeholder: 'Your Name'}});
+    var join = el('button', 'join', 'Join');
+    join.onclick = function() {{ setTimeout(meeting, joinDelay); }};
+  }}, domDelay);
+</script>
+<script src="/analytics/collect.js"></script>
+</body></html>
+"""
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    """Обработчик запросов стенда (параметры сервера - в self.server)"""
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status: int, body: bytes, content_type: str, cache: bool = False):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if cache:
+            self.send_header("Cache-Control", "public, max-age=86400, immutable")
+        else:
+            self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        latency_ms = float(params.get("latency_ms", self.server.latency_ms))
+        if latency_ms:
+            time.sleep(latency_ms / 1000)
+
+        parts = url.path.strip("/").split("/")
+        with self.server.stats_lock:
+            self.server.requests[parts[0]] = self.server.requests.get(parts[0], 0) + 1
+
+        if parts[0] == "j" and len(parts) == 2:
+            html = LANDING_HTML.format(meeting_id=parts[1], query=url.query)
+            self._send(200, html.encode(), "text/html; charset=utf-8")
+        elif parts[0] == "wc" and len(parts) == 2:
+            html = WEBCLIENT_HTML.format(query=url.query)
+            self._send(200, html.encode(), "text/html; charset=utf-8")
+        elif url.path == "/static/client.js":
+            size = int(params.get("bundle_kb", self.server.bundle_kb)) * 1024
+            # Валидный JS нужного размера: комментарий-заполнитель + маленький код
+            body = b"window.__standinBundle = true;\n/*" + b"x" * max(0, size - 40) + b"*/\n"
+            self._send(200, body, "application/javascript", cache=True)
+        elif url.path == "/static/fonts.css":
+            self._send(200, b"body { font-family: sans-serif; }\n", "text/css", cache=True)
+        elif parts[0] == "analytics":
+            self._send(200, b"/* beacon */", "application/javascript")
+        else:
+            self._send(404, b"not found", "text/plain")
+
+
+class StandinServer(ThreadingHTTPServer):
+    """HTTP-сервер стенда (можно запускать в фоновом потоке из бенчмарка)"""
+
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, latency_ms=0, bundle_kb=2048, verbose=False):
+        super().__init__((host, port), StandinHandler)
+        self.latency_ms = latency_ms
+        self.bundle_kb = bundle_kb
+        self.verbose = verbose
+        self.requests = {}
+        self.stats_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def meeting_url(self, meeting_id="123", **params) -> str:
+        query = "&".join(f"{k}={v}" for k, v in params.items())
+        return f"{self.base_url}/j/{meeting_id}" + (f"?{query}" if query else "")
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="zoom-standin", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальная имитация Zoom web client")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Задержка каждого ответа")
+    parser.add_argument("--bundle-kb", type=int, default=2048, help="Размер /static/client.js")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    server = StandinServer(args.host, args.port, args.latency_ms, args.bundle_kb, args.verbose)
+    print(f"🧪 Zoom stand-in: {server.meeting_url()}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
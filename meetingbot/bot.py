@@ -3,33 +3,37 @@
 MeetingBot - автоматизация встреч
 Открывает встречу по ссылке и делает скриншоты
 """
-import os
+import json
 import time
 import random
 import signal
 import sys
+import threading
 from datetime import datetime
 from pathlib import Path
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from dotenv import load_dotenv
+from audio_tap import AudioTap
+from browser import BrowserPool, launch_browser, quit_browser
+from config import BotConfig
 from connectors import ZoomConnector
-from recorder import ScreenRecorder
-
-# Загрузка переменных окружения
-load_dotenv()
-
-# Конфигурация
-MEETING_URL = os.getenv("MEETING_URL", "https://www.google.com")
-BOT_NAME = os.getenv("BOT_NAME", "MeetingBot")
-HEADLESS = os.getenv("HEADLESS", "true").lower() == "true"
-WINDOW_WIDTH = int(os.getenv("WINDOW_WIDTH", "1920"))
-WINDOW_HEIGHT = int(os.getenv("WINDOW_HEIGHT", "1080"))
-SCREENSHOT_DELAY = int(os.getenv("SCREENSHOT_DELAY", "3"))
-CONNECTOR_TYPE = os.getenv("CONNECTOR_TYPE", "zoom").lower()
-ENABLE_RECORDING = os.getenv("ENABLE_RECORDING", "false").lower() == "true"
-MAX_MEETING_DURATION_SECONDS = int(os.getenv("MAX_MEETING_DURATION_SECONDS", "7200"))  # 2 часа по умолчанию
+from page_monitor import BROWSER_GONE, CRASH, PageMonitor
+from recorder import ScreenRecorder, recording_filename
+from request_filter import REQUEST_FILTER_EXTRA, RequestFilter
+from screencast import ScreencastSource
+from screenshots import POLICY_ALWAYS, ScreenshotPipeline
+from session_index import MANIFEST_FILENAME, SessionIndex
+from tracing import Tracer
+
+# Как часто цикл мониторинга проверяет запрос на остановку (сек)
+STOP_CHECK_INTERVAL_SECONDS = 10
+
+# Запас до дедлайна завершения на принудительную остановку ffmpeg (сек)
+SHUTDOWN_KILL_MARGIN_SECONDS = 1
+
+# Сколько ждать событие сбоя от монитора вкладки после "left" (сек)
+FAILURE_EVENT_WAIT_SECONDS = 1
+
+# Разрывы записи из-за сбоев вкладки и повторных входов
+GAPS_FILENAME = "gaps.json"
 
 # Пути
 BASE_DIR = Path(__file__).parent
@@ -40,178 +44,447 @@ SESSIONS_DIR.mkdir(parents=True, exist_ok=True)
 class MeetingBot:
     """Бот для автоматизации встреч"""
 
-    def __init__(self):
+    def __init__(self, config: BotConfig = None, session_id: str = None, browser_pool: BrowserPool = None,
+                 session_index: SessionIndex = None):
+        """
+        Args:
+            config: Настройки сессии (по умолчанию из переменных окружения)
+            session_id: ID сессии (по умолчанию timestamp запуска)
+            browser_pool: Пул готовых браузеров (по умолчанию - холодный запуск)
+            session_index: SQLite индекс сессий (по умолчанию sessions/index.sqlite3)
+        """
+        self.config = config or BotConfig.from_env()
+        self.browser_pool = browser_pool
+        self.pooled_browser = None
         self.driver = None
         self.connector = None
         self.recorder = None
-        self.session_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.audio_tap = None
+        self.request_filter = None
+        self.page_monitor = None
+        # Подготовка записи в фоне (параллельно с запуском браузера и входом)
+        self._recorder_preparing = None
+        self._recorder_prepared = False
+        # Повторные входы после сбоев вкладки и соответствующие разрывы записи
+        self.rejoins = 0
+        self.gaps = []
+        self.status = "created"
+        self.stop_event = threading.Event()
+        self.session_id = session_id or datetime.now().strftime("%Y%m%d_%H%M%S")
         self.session_dir = SESSIONS_DIR / self.session_id
         self.screenshots_dir = self.session_dir / "screenshots"
         self.screenshots_dir.mkdir(parents=True, exist_ok=True)
-        self.screenshot_counter = 0
+        self.screenshots = None
+        # Трассировка шагов: sessions/<id>/trace.jsonl (сводка: python tracing.py)
+        self.tracer = Tracer(self.session_dir / "trace.jsonl", session_id=self.session_id)
+        self._close_lock = threading.Lock()
+        self._closed = False
+        self.session_index = session_index
+        self.started_at = None
+        self.joined_at = None
+        self.exit_reason = None
+        self.error = None
 
     def setup_browser(self):
         """Настройка и запуск браузера"""
+        with self.tracer.span("setup_browser") as span:
+            self._setup_browser(span)
+
+    def _setup_browser(self, span):
         print("🚀 Запуск браузера...")
 
-        chrome_options = Options()
+        config = self.config
+        started = time.time()
 
-        # ВАЖНО: если запись включена, НЕ используем headless
-        # Chrome должен рендериться на Xvfb display для записи ffmpeg
-        if HEADLESS and not ENABLE_RECORDING:
-            chrome_options.add_argument("--headless=new")
-            print("   Режим: headless (без GUI)")
+        # Готовый браузер из пула (если есть), иначе холодный запуск
+        if self.browser_pool:
+            self.pooled_browser = self.browser_pool.lease(config)
+        if self.pooled_browser:
+            self.driver = self.pooled_browser.driver
+            print(f"   ♻️  Браузер из пула (использование #{self.pooled_browser.uses})")
         else:
-            if ENABLE_RECORDING:
-                print("   Режим: с GUI на Xvfb (для записи)")
-            else:
-                print("   Режим: с отображением браузера")
-
-        # Базовые опции
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument(f"--window-size={WINDOW_WIDTH},{WINDOW_HEIGHT}")
-        chrome_options.add_argument("--disable-gpu")
-
-        # Аудио опции для PulseAudio
-        chrome_options.add_argument("--enable-audio-service-sandbox=false")
-        chrome_options.add_argument("--autoplay-policy=no-user-gesture-required")
-
-        # Антидетект опции
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")  # Скрыть автоматизацию
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])  # Убрать флаг автоматизации
-        chrome_options.add_experimental_option('useAutomationExtension', False)  # Отключить расширение автоматизации
-
-        # Реалистичный User-Agent
-        chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36")
-
-        # Опции для встреч
-        chrome_options.add_argument("--use-fake-ui-for-media-stream")  # Автоматически разрешать доступ к микро/камере
-        chrome_options.add_argument("--use-fake-device-for-media-stream")  # Использовать виртуальные устройства
-
-        # Отключаем всплывающие диалоги Chrome
-        chrome_options.add_argument("--deny-permission-prompts")  # Автоматически отклонять все запросы permissions
-        chrome_options.add_argument("--disable-popup-blocking")  # Отключить блокировщик попапов
-        chrome_options.add_argument("--disable-notifications")  # Отключить уведомления
-        chrome_options.add_experimental_option("prefs", {
-            "profile.default_content_setting_values.notifications": 2,  # Блокировать уведомления
-            "protocol_handler": {
-                "excluded_schemes": {
-                    "zoommtg": False,
-                    "zoomus": False
-                }
-            }
-        })
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation", "disable-component-update"])
-
-        # Инициализация драйвера (используем встроенный chromedriver)
-        service = Service('/usr/local/bin/chromedriver')
-        self.driver = webdriver.Chrome(service=service, options=chrome_options)
+            self.driver = launch_browser(config)
+        span["attrs"]["pooled"] = self.pooled_browser is not None
+        self.tracer.instrument_driver(self.driver)
+
+        self.screenshots = ScreenshotPipeline(
+            self.driver,
+            self.screenshots_dir,
+            image_format=config.screenshot_format,
+            quality=config.screenshot_quality,
+            scale=config.screenshot_scale,
+            viewport=(config.window_width, config.window_height),
+            policy=config.screenshot_policy
+        )
 
         # Инициализация коннектора
-        if CONNECTOR_TYPE == "zoom":
-            self.connector = ZoomConnector(self.driver, BOT_NAME, self.take_screenshot)
+        if config.connector_type == "zoom":
+            self.connector = ZoomConnector(self.driver, config.bot_name, self.take_screenshot,
+                                           display=config.display, tracer=self.tracer,
+                                           show_markers=config.screenshot_policy == POLICY_ALWAYS)
             print(f"   Коннектор: {self.connector.get_platform_name()}")
         else:
-            raise ValueError(f"Неизвестный тип коннектора: {CONNECTOR_TYPE}")
+            raise ValueError(f"Неизвестный тип коннектора: {config.connector_type}")
 
-        # Удаление webdriver флага через JavaScript
-        self.driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
-            'source': '''
-                Object.defineProperty(navigator, 'webdriver', {
-                    get: () => undefined
-                });
+        # Блокировка аналитики и трекеров до первой навигации
+        patterns = self.connector.BLOCKED_URL_PATTERNS + REQUEST_FILTER_EXTRA
+        if config.request_filter and patterns:
+            self.request_filter = RequestFilter(self.driver, patterns)
+            self.request_filter.apply()
+            span["attrs"]["blocked_patterns"] = len(self.request_filter.patterns)
 
-                // Переопределение других детектируемых свойств
-                window.navigator.chrome = {
-                    runtime: {}
-                };
+        print(f"   Размер окна: {config.resolution}")
+        print(f"✅ Браузер запущен за {time.time() - started:.2f} сек")
 
-                Object.defineProperty(navigator, 'plugins', {
-                    get: () => [1, 2, 3, 4, 5]
-                });
+    def take_screenshot(self, name=None):
+        """Делает скриншот текущей страницы (запись на диск - в фоне)"""
+        return self.screenshots.capture(name)
 
-                Object.defineProperty(navigator, 'languages', {
-                    get: () => ['en-US', 'en', 'ru']
-                });
-            '''
-        })
+    def close(self):
+        """Закрывает браузер и останавливает запись (повторный вызов ничего не делает)
+
+        Выход из встречи с закрытием браузера и финализация записи идут параллельно
+        и укладываются в config.shutdown_deadline_seconds. Если дедлайн наступил -
+        ffmpeg завершается принудительно, записанное до этого момента сохраняется.
+        """
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
 
-        print(f"   Размер окна: {WINDOW_WIDTH}x{WINDOW_HEIGHT}")
-        print("✅ Браузер запущен")
+        with self.tracer.span("close") as span:
+            self._close(span)
+        self.tracer.close()
 
-    def take_screenshot(self, name=None):
-        """Делает скриншот текущей страницы"""
-        self.screenshot_counter += 1
+    def _close(self, span):
+        deadline = time.time() + self.config.shutdown_deadline_seconds
 
-        if name is None:
-            name = f"{self.screenshot_counter:02d}_screenshot.png"
+        # Запись подготовлена, но не запущена (вход не удался) - освобождаем pipe и screencast.
+        # Зависшую подготовку ждём только в пределах дедлайна: она отменит себя сама, когда закончится
+        if self.recorder and not self.recorder.process:
+            recorder = self.recorder
+            self._wait_recorder_prepared(timeout=max(0, deadline - time.time()))
+            self.recorder = None
+            recorder.cancel()
 
-        screenshot_path = self.screenshots_dir / name
+        tasks = [threading.Thread(target=self._close_browser, name=f"close-browser-{self.session_id}", daemon=True)]
+        if self.recorder and self.recorder.is_recording():
+            tasks.append(threading.Thread(target=self._close_recorder, args=(deadline,),
+                                          name=f"close-recorder-{self.session_id}", daemon=True))
+        elif self.audio_tap:
+            self.audio_tap.close()
+        for task in tasks:
+            task.start()
+        for task in tasks:
+            task.join(timeout=max(0, deadline - time.time()))
+
+        late = [task.name for task in tasks if task.is_alive()]
+        if late:
+            print(f"   ⚠️  Дедлайн завершения ({self.config.shutdown_deadline_seconds} сек) истёк, "
+                  f"не завершено: {', '.join(late)}")
+            span["outcome"] = "deadline"
+            span["attrs"]["late"] = late
+
+        # Итог сессии: manifest.json + строка в индексе
+        try:
+            manifest = self.write_manifest(shutdown="deadline" if late else "ok")
+            print(f"   ✅ Manifest: {MANIFEST_FILENAME}")
+        except Exception as e:
+            print(f"   ⚠️  Не удалось записать manifest: {e}")
+            return
+        self._index("session_finished", manifest)
 
-        self.driver.save_screenshot(str(screenshot_path))
-        print(f"📸 Скриншот #{self.screenshot_counter} сохранен: {screenshot_path}")
+    def _index(self, method: str, *args):
+        """Обновить индекс сессий (ошибка индекса не должна ронять сессию)"""
+        try:
+            if self.session_index is None:
+                self.session_index = SessionIndex(SESSIONS_DIR)
+            getattr(self.session_index, method)(*args)
+        except Exception as e:
+            print(f"   ⚠️  Индекс сессий недоступен: {e}")
+
+    def write_manifest(self, shutdown: str = "ok") -> dict:
+        """Структурированный итог сессии в sessions/<id>/manifest.json"""
+        config = self.config
+        ended_at = time.time()
+        failed = self.status == "failed" or self.exit_reason in ("join_failed", "error")
+
+        recording = None
+        if self.recorder:
+            files = [f for f in self.recorder.output_files() if f.exists()]
+            recording = {
+                "mode": self.recorder.mode,
+                "capture": "changes" if self.recorder.change_driven else "constant",
+                "files": [{"path": str(f.relative_to(self.session_dir)), "bytes": f.stat().st_size}
+                          for f in files],
+                "bytes": sum(f.stat().st_size for f in files),
+                "playlist": self.recorder.playlist_path.name if self.recorder.segmented else None,
+                "keyframes": self.recorder.keyframes_path.name if self.recorder.change_driven else None,
+                "encoder": self.recorder.stats(),
+            }
 
-        return screenshot_path
+        manifest = {
+            "session_id": self.session_id,
+            "meeting_url": config.meeting_url,
+            "bot_name": config.bot_name,
+            "platform": config.connector_type,
+            "status": "failed" if failed else "finished",
+            "exit_reason": self.exit_reason,
+            "error": self.error,
+            "started_at": self.started_at,
+            "joined_at": self.joined_at,
+            "ended_at": ended_at,
+            "duration_seconds": round(ended_at - self.joined_at, 1) if self.joined_at else None,
+            "shutdown": shutdown,
+            "session_dir": str(self.session_dir),
+            "recording": recording,
+            "screenshots": sum(1 for _ in self.screenshots_dir.iterdir()) if self.screenshots_dir.exists() else 0,
+            "requests": self.request_filter.stats() if self.request_filter else None,
+            "rejoins": self.rejoins,
+            "gaps": GAPS_FILENAME if self.gaps else None,
+            "trace": self.tracer.path.name if self.tracer.path else None,
+        }
+
+        manifest_path = self.session_dir / MANIFEST_FILENAME
+        temp_path = manifest_path.with_suffix(".json.tmp")
+        temp_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2))
+        temp_path.replace(manifest_path)
+        return manifest
+
+    def _close_recorder(self, deadline: float):
+        """Остановка записи: ffmpeg сам сообщает о финализации завершением процесса"""
+        print("\n🛑 Останавливаю запись...")
+        with self.tracer.span("recorder.stop") as span:
+            self.recorder.stop(timeout=max(0, deadline - time.time() - SHUTDOWN_KILL_MARGIN_SECONDS))
+            span["attrs"]["encoder"] = self.recorder.stats()
+        if self.audio_tap:
+            self.audio_tap.close()
+
+    def _close_browser(self):
+        """Выход из встречи, дозапись скриншотов, закрытие браузера (или возврат в пул)"""
+        # Монитор - первым: собственный выход и закрытие браузера - не сбой
+        if self.page_monitor:
+            self.page_monitor.close()
+            self.page_monitor = None
 
-    def close(self):
-        """Закрывает браузер и останавливает запись"""
         # Выходим из встречи
         if self.connector and self.driver:
             print("\n👋 Выхожу из встречи...")
             try:
                 # Проверяем что driver ещё жив
                 self.driver.current_url  # Попытка обращения к driver
-                self.connector.leave_meeting()
+                with self.tracer.span("close.leave_meeting"):
+                    self.connector.leave_meeting()
             except Exception as e:
                 print(f"   ⚠️  Не удалось выйти из встречи: {e}")
                 print(f"   (Driver возможно уже закрыт)")
 
-        # Останавливаем запись ПЕРЕД закрытием браузера
-        if self.recorder and self.recorder.is_recording():
-            print("\n🛑 Останавливаю запись...")
-            self.recorder.stop()
-            # Даём ffmpeg время на финализацию (увеличено до 5 сек)
-            print("   ⏳ Ожидание финализации видео...")
-            time.sleep(5)
-
-            # Создаём индикатор готовности файла
-            ready_file = self.session_dir / "RECORDING_READY.txt"
+        # Последние события сети - до закрытия браузера
+        if self.request_filter and self.driver:
             try:
-                recording_path = self.session_dir / "recording.mp4"
-                if recording_path.exists():
-                    size_mb = recording_path.stat().st_size / (1024 * 1024)
-                    ready_file.write_text(
-                        f"Запись готова к просмотру!\n\n"
-                        f"Файл: {recording_path.name}\n"
-                        f"Размер: {size_mb:.2f} MB\n"
-                        f"Сессия: {self.session_id}\n"
-                    )
-                    print(f"   ✅ Создан индикатор готовности: {ready_file.name}")
+                self.request_filter.collect()
             except Exception as e:
-                print(f"   ⚠️  Не удалось создать индикатор: {e}")
-
-        # Закрываем браузер
-        if self.driver:
+                print(f"   ⚠️  Статистика фильтра запросов: {e}")
+
+        # Дописываем скриншоты из очереди
+        if self.screenshots:
+            self.screenshots.close()
+            self.screenshots = None
+
+        # Закрываем браузер (или возвращаем его в пул)
+        if self.pooled_browser:
+            print("\n♻️  Возвращаю браузер в пул...")
+            with self.tracer.span("close.browser_release"):
+                self.browser_pool.release(self.pooled_browser, joined=self.joined_at is not None)
+            self.pooled_browser = None
+            self.driver = None
+        elif self.driver:
             print("\n🛑 Закрываю браузер...")
             try:
-                self.driver.quit()
+                with self.tracer.span("close.browser_quit"):
+                    # После удачной встречи кэш профиля становится новым шаблоном
+                    quit_browser(self.driver, promote=self.joined_at is not None)
                 print("✅ Браузер закрыт")
             except Exception as e:
                 print(f"   ⚠️  Ошибка при закрытии браузера: {e}")
+            self.driver = None
+
+    def _try_rejoin(self) -> bool:
+        """Выход из-за сбоя вкладки (а не из встречи) - повторный вход тем же браузером
+
+        Запись не останавливается; время без встречи пишется в gaps.json.
+        """
+        # Событие CDP может прийти чуть позже, чем наблюдатель заметил пропажу встречи
+        failure = self.page_monitor.failure(wait=FAILURE_EVENT_WAIT_SECONDS) if self.page_monitor else None
+        if not failure:
+            return False
+        if failure["kind"] == BROWSER_GONE:
+            self.exit_reason = "browser_crashed"
+            return False
+        if self.rejoins >= self.config.max_rejoins:
+            print(f"   ⚠️  Сбой {failure['kind']}, но лимит повторных входов ({self.config.max_rejoins}) исчерпан")
+            return False
+
+        self.rejoins += 1
+        print(f"\n⚡ Сбой вкладки: {failure['kind']} ({failure['detail']}) - повторный вход #{self.rejoins}")
+        gap = {"reason": failure["kind"], "detail": failure["detail"], "start": failure["at"]}
+        with self.tracer.span("rejoin", reason=failure["kind"], attempt=self.rejoins) as span:
+            if failure["kind"] == CRASH:
+                self.page_monitor.revive()
+            rejoined = self.connector.rejoin_meeting(self.config.meeting_url)
+            span["outcome"] = "ok" if rejoined else "failed"
+        gap["end"] = time.time()
+        gap["rejoined"] = rejoined
+        self._record_gap(gap)
+        if rejoined:
+            self.screenshots.discard()
+        else:
+            self.screenshots.persist("rejoin_failed")
+
+        if rejoined:
+            print(f"   ✅ Снова во встрече (разрыв {gap['end'] - gap['start']:.1f} сек)")
+            self.page_monitor.reset()
+            self.connector.start_presence_watcher()
+            if self.recorder and self.recorder.screencast:
+                self.recorder.screencast.resume()
+        return rejoined
+
+    def _record_gap(self, gap: dict):
+        """Разрыв в gaps.json: время по часам и смещение от начала записи"""
+        gap["duration_seconds"] = round(gap["end"] - gap["start"], 3)
+        if self.recorder and self.recorder.started_at:
+            gap["recording_offset_seconds"] = round(max(0.0, gap["start"] - self.recorder.started_at), 3)
+        self.gaps.append(gap)
+        gaps_path = self.session_dir / GAPS_FILENAME
+        temp_path = gaps_path.with_suffix(".json.tmp")
+        temp_path.write_text(json.dumps(self.gaps, ensure_ascii=False, indent=2))
+        temp_path.replace(gaps_path)
+
+    def _prepare_recorder(self):
+        """Создать ScreenRecorder и подготовить его в фоне (см. ScreenRecorder.prepare)"""
+        config = self.config
+        # Живой звук для локальных потребителей (bot.audio_tap.frames() или Unix-сокет)
+        if config.audio_tap:
+            self.audio_tap = AudioTap()
+            self.audio_tap.serve(self.session_dir / "audio.sock")
+        recording_path = self.session_dir / recording_filename(config.recording_mode,
+                                                               config.recording_audio_codec)
+        # Видео из CDP screencast - без Xvfb, Chrome headless
+        screencast = None
+        if config.records_video and config.recording_video_source == "screencast":
+            screencast = ScreencastSource(self.driver, config.window_width, config.window_height)
+        self.recorder = ScreenRecorder(
+            output_path=recording_path,
+            display=config.display,
+            resolution=config.resolution,
+            audio_source=config.audio_source,
+            segment_seconds=config.recording_segment_seconds,
+            mode=config.recording_mode,
+            audio_codec=config.recording_audio_codec,
+            audio_tap=self.audio_tap,
+            change_driven=config.recording_capture == "changes",
+            screencast=screencast
+        )
+        self._recorder_prepared = False
+        self._recorder_preparing = threading.Thread(target=self._run_recorder_prepare,
+                                                    name=f"recorder-prepare-{self.session_id}", daemon=True)
+        self._recorder_preparing.start()
+
+    def _run_recorder_prepare(self):
+        recorder = self.recorder
+        with self.tracer.span("recorder.prepare") as span:
+            try:
+                self._recorder_prepared = recorder.prepare()
+            except Exception as e:
+                print(f"   ❌ Ошибка подготовки записи: {e}")
+            span["outcome"] = "ok" if self._recorder_prepared else "failed"
+        # Сессия закрылась, не дождавшись подготовки - освобождаем pipe и screencast здесь
+        if self.recorder is not recorder:
+            recorder.cancel()
+
+    def _wait_recorder_prepared(self, timeout: float = None) -> bool:
+        if self._recorder_preparing:
+            self._recorder_preparing.join(timeout=timeout)
+            if self._recorder_preparing.is_alive():
+                print("   ⚠️  Подготовка записи не завершилась к дедлайну")
+                return False
+            self._recorder_preparing = None
+        return self._recorder_prepared
+
+    def _start_recorder(self, join_finished: float):
+        """Запуск ffmpeg после входа (подготовка к этому моменту обычно уже закончена)"""
+        with self.tracer.span("recorder.start") as span:
+            started = self._wait_recorder_prepared() and self.recorder.start()
+            span["outcome"] = "ok" if started else "failed"
+            if started:
+                # Сколько встречи не попало в запись после входа
+                span["attrs"]["join_to_capture_ms"] = round((self.recorder.started_at - join_finished) * 1000, 1)
+        if not started:
+            print("⚠️  Не удалось запустить запись, продолжаем без неё...")
+            self.recorder.cancel()
+            self.recorder = None
+            if self.audio_tap:
+                self.audio_tap.close()
+                self.audio_tap = None
+
+    def _start_page_monitor(self):
+        """События вкладки (падение рендерера, пропажа iframe, сеть) - чтобы отличить сбой от выхода"""
+        monitor = PageMonitor(self.driver)
+        try:
+            monitor.start()
+        except Exception as e:
+            print(f"   ⚠️  Монитор вкладки не запущен, повторного входа не будет: {e}")
+            monitor.close()
+            return
+        self.page_monitor = monitor
+
+    def report_recorder_stats(self):
+        """Статистика энкодера в лог (и предупреждение, если запись отстаёт от реального времени)"""
+        if not self.recorder or not self.recorder.is_recording():
+            return
+        stats = self.recorder.stats()
+        if not stats:
+            return
+        print(f"   🎞️  Запись: fps={stats.get('fps')} speed={stats.get('speed')}x "
+              f"bitrate={stats.get('bitrate_kbps')}kbit/s drop={stats.get('drop_frames')} dup={stats.get('dup_frames')}")
+        if stats.get("falling_behind"):
+            print(f"   ⚠️  Энкодер не успевает за реальным временем (speed {stats.get('speed')}x) - "
+                  f"возможны потери кадров")
 
     def signal_handler(self, sig, frame):
         """Обработчик сигналов для graceful shutdown"""
         print(f"\n\n⚠️  Получен сигнал {sig} (Docker stop или Ctrl+C)")
+        self.exit_reason = self.exit_reason or "signal"
         print("🔄 Корректное завершение...")
         self.close()
         sys.exit(0)
 
-    def run(self):
-        """Основной процесс бота"""
-        # Регистрируем обработчики сигналов
-        signal.signal(signal.SIGTERM, self.signal_handler)  # Docker stop
-        signal.signal(signal.SIGINT, self.signal_handler)   # Ctrl+C
+    def stop(self):
+        """Запросить досрочное завершение сессии (потокобезопасно)"""
+        self.stop_event.set()
+
+    def _stop_requested(self, step: str) -> bool:
+        """Остановка, запрошенная до входа во встречу: проверяется между шагами запуска"""
+        if not self.stop_event.is_set():
+            return False
+        print(f"\n🛑 Получен запрос на остановку сессии ({step})")
+        self.exit_reason = "stop_requested"
+        return True
+
+    def run(self, handle_signals=True):
+        """Основной процесс бота
+
+        Args:
+            handle_signals: Регистрировать обработчики SIGTERM/SIGINT
+                (только для главного потока; оркестратор передаёт False)
+        """
+        if handle_signals:
+            # Регистрируем обработчики сигналов
+            signal.signal(signal.SIGTERM, self.signal_handler)  # Docker stop
+            signal.signal(signal.SIGINT, self.signal_handler)   # Ctrl+C
+
+        config = self.config
+        max_duration = config.max_meeting_duration_seconds
 
         try:
             print("="*60)
@@ -219,26 +492,48 @@ class MeetingBot:
             print(f"   Session ID: {self.session_id}")
             print("="*60)
 
-            # Запуск браузера
+            self.started_at = time.time()
+            self._index("session_started", self.session_id, config, self.session_dir, self.started_at)
+
+            # Запуск браузера; запись готовится параллельно (проверки входов, ffmpeg-команда),
+            # screencast - как только есть вкладка
+            self.status = "starting"
+            screencast_video = config.records_video and config.recording_video_source == "screencast"
+            if config.enable_recording and not screencast_video:
+                self._prepare_recorder()
             self.setup_browser()
+            if config.enable_recording and screencast_video:
+                self._prepare_recorder()
+            if self._stop_requested("после запуска браузера"):
+                return
 
             # Подключение к встрече через коннектор
-            success = self.connector.join_meeting(MEETING_URL)
+            self.status = "joining"
+            success = self.connector.join_meeting(config.meeting_url)
+            join_finished = time.time()
 
             if not success:
                 print(f"❌ Не удалось подключиться к встрече")
+                self.status = "failed"
+                self.exit_reason = "join_failed"
+                self.screenshots.persist("join_failed")
+                return
+            if self._stop_requested("после входа"):
                 return
 
-            # Запуск записи ПОСЛЕ успешного подключения
-            if ENABLE_RECORDING:
-                recording_path = self.session_dir / "recording.mp4"
-                self.recorder = ScreenRecorder(
-                    output_path=recording_path,
-                    resolution=f"{WINDOW_WIDTH}x{WINDOW_HEIGHT}"
-                )
-                if not self.recorder.start():
-                    print("⚠️  Не удалось запустить запись, продолжаем без неё...")
-                    self.recorder = None
+            # Подключились - снимки шагов из буфера не нужны
+            self.screenshots.discard()
+
+            # Сразу после входа - только запуск ffmpeg; монитор вкладки подключается параллельно
+            monitor_thread = None
+            if config.max_rejoins:
+                monitor_thread = threading.Thread(target=self._start_page_monitor,
+                                                  name=f"page-monitor-start-{self.session_id}", daemon=True)
+                monitor_thread.start()
+            if self.recorder:
+                self._start_recorder(join_finished)
+            if monitor_thread:
+                monitor_thread.join()
 
             print("\n" + "="*60)
             print("✅ Подключение к встрече успешно!")
@@ -247,53 +542,87 @@ class MeetingBot:
 
             # Мониторинг встречи
             print(f"\n⏱️  Мониторинг встречи...")
-            print(f"   📏 Максимальная длительность: {MAX_MEETING_DURATION_SECONDS // 60} минут ({MAX_MEETING_DURATION_SECONDS} сек)")
-            print(f"   🔍 Проверка кнопки Leave каждую секунду")
-            print(f"   🚪 Выход при: 1) истечении времени, 2) исчезновении кнопки Leave")
+            print(f"   📏 Максимальная длительность: {max_duration // 60} минут ({max_duration} сек)")
+            print(f"   👁️  Событийное отслеживание выхода (MutationObserver в iframe)")
+            print(f"   🚪 Выход при: 1) истечении времени, 2) выходе/удалении из встречи, 3) завершении встречи")
             print(f"\n⏸️  Бот на встрече. Нажмите Ctrl+C для досрочного выхода...\n")
 
+            self.status = "in_meeting"
+            self.joined_at = time.time()
+            self.connector.start_presence_watcher()
+
             start_time = time.time()
-            check_counter = 0
+            last_status_time = start_time
 
             while True:
                 elapsed_time = time.time() - start_time
 
                 # Проверка 1: Превышено максимальное время
-                if elapsed_time >= MAX_MEETING_DURATION_SECONDS:
+                if elapsed_time >= max_duration:
                     elapsed_min = int(elapsed_time // 60)
                     print(f"\n\n⏰ Достигнута максимальная длительность встречи ({elapsed_min} минут)")
                     print("   Завершаю сессию...")
+                    self.exit_reason = "max_duration"
                     self.close()
                     return
 
-                # Проверка 2: Кнопка Leave исчезла (КАЖДУЮ СЕКУНДУ)
-                in_meeting = self.connector.check_in_meeting()
+                # Проверка 2: Запрошена остановка (оркестратор)
+                if self.stop_event.is_set():
+                    print(f"\n\n🛑 Получен запрос на остановку сессии")
+                    self.exit_reason = "stop_requested"
+                    self.close()
+                    return
 
+                # Проверка 3: Ждём событие выхода (блокирующе, без ежесекундного опроса)
+                exit_reason = self.connector.wait_for_meeting_end(
+                    timeout=min(max_duration - elapsed_time, STOP_CHECK_INTERVAL_SECONDS)
+                )
+
+                elapsed_time = time.time() - start_time
                 elapsed_min = int(elapsed_time // 60)
                 elapsed_sec = int(elapsed_time % 60)
 
-                if not in_meeting:
-                    print(f"\n\n🚪 Кнопка Leave исчезла (встреча завершена или бот выгнан)")
+                # "left" без команды на выход - возможно сбой вкладки, а не конец встречи
+                if exit_reason == "left" and self._try_rejoin():
+                    continue
+
+                if exit_reason:
+                    reasons = {
+                        "left": "бот вышел из встречи",
+                        "removed": "хост удалил бота",
+                        "ended": "встреча завершена",
+                    }
+                    print(f"\n\n🚪 Выход из встречи: {reasons.get(exit_reason, exit_reason)}")
                     print(f"   Время в встрече: {elapsed_min}м {elapsed_sec}с")
                     print("   Завершаю сессию...")
+                    self.exit_reason = self.exit_reason or exit_reason
                     self.close()
                     return
 
                 # Статус каждую минуту
-                if check_counter > 0 and check_counter % 60 == 0:
-                    remaining_min = (MAX_MEETING_DURATION_SECONDS - elapsed_time) // 60
+                if time.time() - last_status_time >= 60:
+                    last_status_time = time.time()
+                    remaining_min = (max_duration - elapsed_time) // 60
                     print(f"   ✅ В встрече: {elapsed_min}м {elapsed_sec}с | Осталось до автовыхода: ~{int(remaining_min)}м")
-
-                time.sleep(1)
-                check_counter += 1
+                    self.report_recorder_stats()
+                    if self.request_filter:
+                        # Разбираем лог сети, чтобы он не копился в chromedriver
+                        self.request_filter.collect()
 
         except Exception as e:
             print(f"\n❌ Ошибка: {e}")
+            self.status = "failed"
+            self.exit_reason = self.exit_reason or "error"
+            if self.screenshots:
+                self.screenshots.persist("error")
+            self.error = f"{type(e).__name__}: {e}"
             import traceback
             traceback.print_exc()
 
         finally:
             self.close()
+            if self.status != "failed":
+                self.status = "finished"
 
 
 if __name__ == "__main__":
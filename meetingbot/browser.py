@@ -0,0 +1,373 @@
+"""
+Browser - запуск Chrome и пул заранее запущенных браузеров
+"""
+import os
+import threading
+import time
+from urllib.parse import urlparse
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from config import BotConfig
+from profiles import ProfileStore
+
+# Скрипт, скрывающий признаки автоматизации (выполняется в каждом новом документе)
+STEALTH_JS = '''
+    Object.defineProperty(navigator, 'webdriver', {
+        get: () => undefined
+    });
+
+    // Переопределение других детектируемых свойств
+    window.navigator.chrome = {
+        runtime: {}
+    };
+
+    Object.defineProperty(navigator, 'plugins', {
+        get: () => [1, 2, 3, 4, 5]
+    });
+
+    Object.defineProperty(navigator, 'languages', {
+        get: () => ['en-US', 'en', 'ru']
+    });
+'''
+
+# Типы данных, которые очищаются между сессиями в пуле
+CLEARED_STORAGE_TYPES = "cookies,local_storage,session_storage,indexeddb,websql,service_workers,cache_storage"
+
+# Шаблон профиля с HTTP/V8-кэшем, общий для всех браузеров процесса
+profile_store = ProfileStore()
+
+# Сколько ждать запускающийся в пуле браузер, прежде чем сессия запустит свой (холодный старт)
+POOL_LEASE_TIMEOUT_SECONDS = float(os.getenv("POOL_LEASE_TIMEOUT_SECONDS", "60"))
+
+
+def build_chrome_options(config: BotConfig, profile_dir=None) -> Options:
+    """Опции Chrome для сессии (profile_dir - рабочая копия профиля с кэшем)"""
+    chrome_options = Options()
+
+    # ВАЖНО: при записи видео через x11grab НЕ используем headless
+    # Chrome должен рендериться на Xvfb display для записи ffmpeg
+    # (для записи только звука и screencast headless не мешает - звук идёт в PulseAudio sink)
+    if config.run_headless:
+        chrome_options.add_argument("--headless=new")
+        print("   Режим: headless (без GUI)")
+    else:
+        if config.grabs_display:
+            print(f"   Режим: с GUI на Xvfb {config.display} (для записи)")
+        else:
+            print("   Режим: с отображением браузера")
+
+    # Базовые опции
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument(f"--window-size={config.window_width},{config.window_height}")
+    chrome_options.add_argument("--disable-gpu")
+
+    # Свой профиль с кэшем бандла web client'а (иначе каждый запуск качает и компилирует его заново)
+    if profile_dir:
+        for argument in profile_store.chrome_arguments(profile_dir):
+            chrome_options.add_argument(argument)
+
+    # Аудио опции для PulseAudio
+    chrome_options.add_argument("--enable-audio-service-sandbox=false")
+    chrome_options.add_argument("--autoplay-policy=no-user-gesture-required")
+
+    # Антидетект опции
+    chrome_options.add_argument("--disable-blink-features=AutomationControlled")  # Скрыть автоматизацию
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])  # Убрать флаг автоматизации
+    chrome_options.add_experimental_option('useAutomationExtension', False)  # Отключить расширение автоматизации
+
+    # Реалистичный User-Agent
+    chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36")
+
+    # Опции для встреч
+    chrome_options.add_argument("--use-fake-ui-for-media-stream")  # Автоматически разрешать доступ к микро/камере
+    chrome_options.add_argument("--use-fake-device-for-media-stream")  # Использовать виртуальные устройства
+
+    # Отключаем всплывающие диалоги Chrome
+    chrome_options.add_argument("--deny-permission-prompts")  # Автоматически отклонять все запросы permissions
+    chrome_options.add_argument("--disable-popup-blocking")  # Отключить блокировщик попапов
+    chrome_options.add_argument("--disable-notifications")  # Отключить уведомления
+    chrome_options.add_experimental_option("prefs", {
+        "profile.default_content_setting_values.notifications": 2,  # Блокировать уведомления
+        "protocol_handler": {
+            "excluded_schemes": {
+                "zoommtg": False,
+                "zoomus": False
+            }
+        }
+    })
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation", "disable-component-update"])
+
+    # События сети в performance-лог - статистика фильтра запросов (request_filter.py)
+    if config.request_filter:
+        chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        chrome_options.add_experimental_option("perfLoggingPrefs", {"enableNetwork": True, "enablePage": False})
+
+    return chrome_options
+
+
+def launch_browser(config: BotConfig):
+    """Холодный запуск chromedriver + Chrome с антидетект-скриптом
+
+    Returns:
+        WebDriver: готовый к навигации драйвер (закрывать через quit_browser)
+    """
+    profile_dir = profile_store.checkout() if config.browser_profile_cache else None
+    chrome_options = build_chrome_options(config, profile_dir)
+
+    # Инициализация драйвера (используем встроенный chromedriver)
+    # Chrome рендерится на display сессии и выводит звук в её PulseAudio sink
+    browser_env = dict(os.environ, DISPLAY=config.display, PULSE_SINK=config.pulse_sink)
+    service = Service('/usr/local/bin/chromedriver', env=browser_env)
+    try:
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+    except Exception:
+        if profile_dir:
+            profile_store.release(profile_dir)
+        raise
+    driver.profile_dir = profile_dir
+
+    # Удаление webdriver флага через JavaScript
+    driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': STEALTH_JS})
+
+    return driver
+
+
+def quit_browser(driver, promote: bool = False):
+    """Закрыть Chrome и удалить его копию профиля
+
+    Args:
+        promote: Сессия прошла удачно - её кэши становятся новым шаблоном профиля
+    """
+    try:
+        driver.quit()
+    finally:
+        profile_dir = getattr(driver, "profile_dir", None)
+        if profile_dir:
+            if promote:
+                profile_store.promote(profile_dir)
+            profile_store.release(profile_dir)
+
+
+def browser_key(config: BotConfig) -> tuple:
+    """Параметры запуска, при совпадении которых браузер можно переиспользовать"""
+    return (
+        config.run_headless,
+        config.window_width,
+        config.window_height,
+        config.display,
+        config.pulse_sink,
+        config.browser_profile_cache,
+        config.request_filter,
+    )
+
+
+class PooledBrowser:
+    """Браузер из пула (аренда)"""
+
+    def __init__(self, driver, key: tuple, config: BotConfig):
+        self.driver = driver
+        self.key = key
+        self.config = config
+        self.uses = 0
+        self.launched_at = time.time()
+        # Была ли удачная встреча - тогда кэш профиля продвигается при закрытии браузера
+        self.joined = False
+
+
+class BrowserPool:
+    """Пул заранее запущенных и настроенных браузеров
+
+    Сессия арендует браузер (lease), после встречи возвращает его (release):
+    браузер очищается (cookies, storage, вкладки) и снова ждёт в пуле,
+    либо пересоздаётся после max_uses использований.
+
+    Браузеры привязаны к display/sink из конфига, поэтому на один набор
+    параметров одновременно существует не больше size браузеров
+    (свободных + арендованных) - запасной Chrome не попадёт в чужую запись.
+    """
+
+    def __init__(self, size: int = 1, max_uses: int = 5):
+        """
+        Args:
+            size: Сколько браузеров держать на каждый набор параметров
+            max_uses: После скольких сессий браузер пересоздаётся
+        """
+        self.size = size
+        self.max_uses = max_uses
+        self._idle = []
+        self._configs = {}  # key -> конфиг для пополнения
+        self._launching = {}  # key -> количество запусков в процессе
+        self._leased = {}  # key -> количество арендованных браузеров
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._closed = False
+
+    # --- Прогрев ---
+
+    def warm(self, config: BotConfig):
+        """Поддерживать size свободных браузеров для этого набора параметров (в фоне)"""
+        key = browser_key(config)
+        with self._lock:
+            self._configs[key] = config
+        self._replenish(key)
+
+    def _replenish(self, key: tuple):
+        with self._lock:
+            if self._closed or key not in self._configs:
+                return
+            idle = sum(1 for b in self._idle if b.key == key)
+            missing = self.size - idle - self._launching.get(key, 0) - self._leased.get(key, 0)
+            if missing <= 0:
+                return
+            self._launching[key] = self._launching.get(key, 0) + missing
+            config = self._configs[key]
+
+        for _ in range(missing):
+            threading.Thread(target=self._launch_idle, args=(key, config), daemon=True).start()
+
+    def _launch_idle(self, key: tuple, config: BotConfig):
+        started = time.time()
+        try:
+            driver = launch_browser(config)
+            # Прогреваем рендерер, чтобы первая навигация не платила за его запуск
+            driver.get("about:blank")
+        except Exception as e:
+            print(f"   ⚠️  Пул: не удалось запустить браузер: {e}")
+            driver = None
+
+        with self._lock:
+            self._launching[key] -= 1
+            # Пока браузер запускался, набор параметров могли снять с прогрева (discard) -
+            # тогда его слот уже освобождён и браузер в пуле никому не нужен
+            accepted = driver is not None and not self._closed and key in self._configs
+            if accepted:
+                self._idle.append(PooledBrowser(driver, key, config))
+            self._ready.notify_all()
+
+        if accepted:
+            print(f"   🔥 Пул: браузер готов за {time.time() - started:.1f} сек")
+        elif driver is not None:
+            self._quit(driver)
+
+    # --- Аренда ---
+
+    def lease(self, config: BotConfig, timeout: float = POOL_LEASE_TIMEOUT_SECONDS):
+        """Взять готовый браузер (или None, если подходящего нет)
+
+        Если браузер для этих параметров уже запускается - дожидаемся его:
+        это быстрее холодного старта и не даёт запустить второй Chrome на том же display.
+        Зависший запуск (например, chromedriver на мёртвом display) ждём не дольше timeout.
+        """
+        key = browser_key(config)
+        deadline = time.time() + timeout
+        with self._lock:
+            leased = None
+            while leased is None:
+                for i, browser in enumerate(self._idle):
+                    if browser.key == key:
+                        leased = self._idle.pop(i)
+                        break
+                else:
+                    remaining = deadline - time.time()
+                    if self._closed or not self._launching.get(key) or remaining <= 0:
+                        break
+                    self._ready.wait(timeout=remaining)
+
+        if leased is not None:
+            # Проверяем что браузер жив (мог упасть пока ждал в пуле)
+            try:
+                leased.driver.execute_script("return 1")
+            except Exception:
+                self._quit(leased.driver)
+                leased = None
+
+        if leased is not None:
+            leased.uses += 1
+            with self._lock:
+                self._leased[key] = self._leased.get(key, 0) + 1
+        self._replenish(key)
+        return leased
+
+    def release(self, browser: PooledBrowser, joined: bool = False):
+        """Вернуть браузер в пул (с очисткой) или пересоздать его
+
+        Args:
+            joined: Сессия дошла до встречи (кэш профиля стоит сохранить)
+        """
+        browser.joined = browser.joined or joined
+        recycle = browser.uses >= self.max_uses
+        if not recycle:
+            try:
+                self._reset(browser.driver)
+            except Exception as e:
+                print(f"   ⚠️  Пул: очистка браузера не удалась, пересоздаю: {e}")
+                recycle = True
+
+        with self._lock:
+            self._leased[browser.key] -= 1
+            keep = not recycle and not self._closed and browser.key in self._configs and \
+                sum(1 for b in self._idle if b.key == browser.key) < self.size
+            if keep:
+                self._idle.append(browser)
+
+        if not keep:
+            self._quit(browser.driver, browser.joined)
+            self._replenish(browser.key)
+
+    def discard(self, config: BotConfig):
+        """Перестать прогревать браузеры для этого набора параметров и закрыть свободные"""
+        key = browser_key(config)
+        with self._lock:
+            self._configs.pop(key, None)
+            dropped = [b for b in self._idle if b.key == key]
+            self._idle = [b for b in self._idle if b.key != key]
+        for browser in dropped:
+            self._quit(browser.driver, browser.joined)
+
+    def _reset(self, driver):
+        """Очистка состояния браузера между сессиями"""
+        # Собираем origin'ы, которые трогала сессия (страница + iframe'ы)
+        driver.switch_to.default_content()
+        urls = driver.execute_script("""
+            var urls = [location.href];
+            document.querySelectorAll('iframe').forEach(function(f) { if (f.src) urls.push(f.src); });
+            return urls;
+        """) or []
+        origins = set()
+        for url in urls:
+            parsed = urlparse(url)
+            if parsed.scheme in ("http", "https"):
+                origins.add(f"{parsed.scheme}://{parsed.netloc}")
+
+        # Закрываем лишние вкладки
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+
+        driver.get("about:blank")
+        driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        for origin in origins:
+            driver.execute_cdp_cmd("Storage.clearDataForOrigin", {
+                "origin": origin,
+                "storageTypes": CLEARED_STORAGE_TYPES
+            })
+
+    def _quit(self, driver, promote: bool = False):
+        try:
+            quit_browser(driver, promote)
+        except Exception:
+            pass
+
+    def close(self):
+        """Закрыть все свободные браузеры пула"""
+        with self._lock:
+            self._closed = True
+            idle = self._idle
+            self._idle = []
+            self._ready.notify_all()
+        for browser in idle:
+            self._quit(browser.driver, browser.joined)
@@ -0,0 +1,132 @@
+"""
+CDP Client - прямое подключение к DevTools страницы, открытой chromedriver'ом
+
+execute_cdp_cmd из Selenium умеет только команды; события (screencast, сеть,
+падение вкладки) приходят лишь по собственному websocket-соединению с целью.
+Chrome допускает несколько клиентов одной цели, chromedriver не мешает.
+"""
+import itertools
+import json
+import threading
+import urllib.request
+import websocket
+
+
+class CDPError(Exception):
+    """Ошибка команды CDP или разрыв соединения"""
+
+
+def page_websocket_url(driver) -> str:
+    """webSocketDebuggerUrl текущей вкладки браузера driver"""
+    address = driver.capabilities["goog:chromeOptions"]["debuggerAddress"]
+    with urllib.request.urlopen(f"http://{address}/json/list", timeout=5) as response:
+        targets = json.loads(response.read())
+    handle = driver.current_window_handle
+    pages = [t for t in targets if t.get("type") == "page"]
+    for target in pages:
+        # Дескриптор окна chromedriver = id цели DevTools
+        if target["id"] == handle or handle.endswith(target["id"]):
+            return target["webSocketDebuggerUrl"]
+    if not pages:
+        raise CDPError("У браузера нет открытых вкладок")
+    return pages[0]["webSocketDebuggerUrl"]
+
+
+class CDPClient:
+    """Команды и события CDP по websocket (чтение - в фоновом потоке)"""
+
+    def __init__(self, websocket_url: str, timeout: float = 10):
+        """
+        Args:
+            websocket_url: webSocketDebuggerUrl цели (см. page_websocket_url)
+            timeout: Таймаут команд по умолчанию (сек)
+        """
+        self.timeout = timeout
+        self._socket = websocket.create_connection(websocket_url, timeout=timeout, suppress_origin=True)
+        # Чтение без таймаута: события могут не приходить долго
+        self._socket.settimeout(None)
+        self._ids = itertools.count(1)
+        self._send_lock = threading.Lock()
+        self._pending = {}  # id -> [Event, response]
+        self._pending_lock = threading.Lock()
+        self._handlers = {}  # method -> [callback]
+        self.closed = False
+        self._reader = threading.Thread(target=self._read, name="cdp-reader", daemon=True)
+        self._reader.start()
+
+    @classmethod
+    def for_driver(cls, driver, timeout: float = 10) -> "CDPClient":
+        return cls(page_websocket_url(driver), timeout)
+
+    def on(self, method: str, callback):
+        """Подписаться на событие (callback(params) вызывается в потоке чтения - не блокировать)"""
+        self._handlers.setdefault(method, []).append(callback)
+
+    def send(self, method: str, params: dict = None, timeout: float = None) -> dict:
+        """Выполнить команду и дождаться результата"""
+        if self.closed:
+            raise CDPError(f"{method}: соединение закрыто")
+        message_id = next(self._ids)
+        waiter = [threading.Event(), None]
+        with self._pending_lock:
+            self._pending[message_id] = waiter
+        try:
+            with self._send_lock:
+                self._socket.send(json.dumps({"id": message_id, "method": method, "params": params or {}}))
+            if not waiter[0].wait(timeout or self.timeout):
+                raise CDPError(f"{method}: нет ответа за {timeout or self.timeout} сек")
+        finally:
+            with self._pending_lock:
+                self._pending.pop(message_id, None)
+
+        response = waiter[1]
+        if response is None:
+            raise CDPError(f"{method}: соединение закрыто")
+        if "error" in response:
+            raise CDPError(f"{method}: {response['error'].get('message')}")
+        return response.get("result", {})
+
+    def send_nowait(self, method: str, params: dict = None):
+        """Команда без ожидания ответа (подтверждения кадров screencast и т.п.)"""
+        if self.closed:
+            return
+        with self._send_lock:
+            self._socket.send(json.dumps({"id": next(self._ids), "method": method, "params": params or {}}))
+
+    def _read(self):
+        try:
+            while True:
+                raw = self._socket.recv()
+                if not raw:
+                    break
+                message = json.loads(raw)
+                if "id" in message:
+                    with self._pending_lock:
+                        waiter = self._pending.get(message["id"])
+                    if waiter:
+                        waiter[1] = message
+                        waiter[0].set()
+                    continue
+                for callback in self._handlers.get(message.get("method"), ()):
+                    try:
+                        callback(message.get("params", {}))
+                    except Exception as e:
+                        print(f"   ⚠️  CDP: обработчик {message.get('method')}: {e}")
+        except (websocket.WebSocketException, OSError, ValueError):
+            pass
+        finally:
+            self.closed = True
+            with self._pending_lock:
+                waiters = list(self._pending.values())
+            for waiter in waiters:
+                waiter[0].set()
+            for callback in self._handlers.get("disconnected", ()):
+                callback({})
+
+    def close(self):
+        self.closed = True
+        try:
+            self._socket.close()
+        except Exception:
+            pass
+        self._reader.join(timeout=2)
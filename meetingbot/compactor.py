@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Compactor - фоновое сжатие завершённых сессий и очистка sessions/
+
+- запись (x264 ultrafast) перекодируется пресетом slow, файл заменяется только если стал меньше
+- PNG-скриншоты конвертируются в WebP
+- с COMPACT_CONDENSE рядом с записью собирается версия без простоев (см. idle_compactor.py)
+- retention: сессии старше COMPACT_MAX_AGE_DAYS удаляются, при превышении
+  COMPACT_MAX_TOTAL_GB удаляются давно не использованные (LRU)
+
+Работа идёт в ограниченном пуле процессов с пониженным приоритетом (nice),
+кандидаты берутся из индекса сессий, а не обходом sessions/.
+
+Запуск как скрипт:
+    python compactor.py            # цикл каждые COMPACT_INTERVAL_SECONDS
+    python compactor.py --once     # один проход
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from idle_compactor import condense_session, summary
+from session_index import DEFAULT_SESSIONS_DIR, MANIFEST_FILENAME, SessionIndex
+
+# Сколько процессов сжатия одновременно
+COMPACT_WORKERS = int(os.getenv("COMPACT_WORKERS", "1"))
+# Приращение nice для процессов сжатия (и их ffmpeg)
+COMPACT_NICE = int(os.getenv("COMPACT_NICE", "15"))
+# Потоков на один ffmpeg
+COMPACT_FFMPEG_THREADS = int(os.getenv("COMPACT_FFMPEG_THREADS", "2"))
+# Параметры перекодирования записи
+COMPACT_PRESET = os.getenv("COMPACT_PRESET", "slow")
+COMPACT_CRF = int(os.getenv("COMPACT_CRF", "28"))
+# Качество WebP для скриншотов (0-100)
+COMPACT_WEBP_QUALITY = int(os.getenv("COMPACT_WEBP_QUALITY", "80"))
+# Не трогать сессии, завершившиеся меньше N секунд назад (их ещё могут забирать)
+COMPACT_MIN_AGE_SECONDS = int(os.getenv("COMPACT_MIN_AGE_SECONDS", "300"))
+# Интервал между проходами (сек)
+COMPACT_INTERVAL_SECONDS = int(os.getenv("COMPACT_INTERVAL_SECONDS", "600"))
+# Собирать сжатую версию записи без простоев
+COMPACT_CONDENSE = os.getenv("COMPACT_CONDENSE", "false").lower() == "true"
+# Retention (0 = без ограничения)
+COMPACT_MAX_AGE_DAYS = float(os.getenv("COMPACT_MAX_AGE_DAYS", "0"))
+COMPACT_MAX_TOTAL_GB = float(os.getenv("COMPACT_MAX_TOTAL_GB", "0"))
+
+# Расширения видеозаписей, которые имеет смысл перекодировать (аудио уже компактно)
+VIDEO_SUFFIXES = (".mp4",)
+
+
+def _lower_priority():
+    """Инициализатор процессов пула: всё сжатие - с низким приоритетом"""
+    os.nice(COMPACT_NICE)
+
+
+def directory_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def _run_ffmpeg(args: list) -> bool:
+    result = subprocess.run(["ffmpeg", "-nostdin", "-loglevel", "error", "-y"] + args,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        print(f"   ⚠️  ffmpeg: {result.stderr.strip()[-300:]}")
+    return result.returncode == 0
+
+
+def recompress_video(path: Path) -> int:
+    """Перекодировать запись; возвращает сэкономленные байты (0 если не стало меньше)"""
+    temp_path = path.with_name(f"{path.stem}.compact{path.suffix}")
+    ok = _run_ffmpeg([
+        "-i", str(path),
+        "-map", "0",
+        "-codec:v", "libx264", "-preset", COMPACT_PRESET, "-crf", str(COMPACT_CRF),
+        "-fps_mode", "passthrough",  # сохранить переменный FPS записи по изменениям
+        "-codec:a", "copy",
+        "-threads", str(COMPACT_FFMPEG_THREADS),
+        "-movflags", "+faststart",
+        str(temp_path),
+    ])
+    if not ok or not temp_path.exists():
+        temp_path.unlink(missing_ok=True)
+        return 0
+
+    saved = path.stat().st_size - temp_path.stat().st_size
+    if saved <= 0:
+        temp_path.unlink()
+        return 0
+    temp_path.replace(path)
+    return saved
+
+
+def convert_screenshot(path: Path) -> int:
+    """PNG -> WebP; возвращает сэкономленные байты"""
+    webp_path = path.with_suffix(".webp")
+    ok = _run_ffmpeg(["-i", str(path), "-codec:v", "libwebp", "-quality", str(COMPACT_WEBP_QUALITY),
+                      "-threads", str(COMPACT_FFMPEG_THREADS), str(webp_path)])
+    if not ok or not webp_path.exists():
+        webp_path.unlink(missing_ok=True)
+        return 0
+    saved = path.stat().st_size - webp_path.stat().st_size
+    path.unlink()
+    return saved
+
+
+def compact_session(session_dir: str) -> dict:
+    """Сжать одну сессию (выполняется в процессе пула)"""
+    session_dir = Path(session_dir)
+    started = time.time()
+    result = {"session_dir": str(session_dir), "recording_saved": 0, "screenshots_saved": 0,
+              "screenshots_converted": 0}
+
+    manifest_path = session_dir / MANIFEST_FILENAME
+    manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+    recording = manifest.get("recording") or {}
+
+    # Запись: файлы из manifest (сегменты - по одному)
+    for entry in recording.get("files", []):
+        path = session_dir / entry["path"]
+        if path.suffix in VIDEO_SUFFIXES and path.exists():
+            result["recording_saved"] += recompress_video(path)
+            entry["bytes"] = path.stat().st_size
+
+    # Скриншоты
+    for path in sorted((session_dir / "screenshots").glob("*.png")):
+        result["screenshots_saved"] += convert_screenshot(path)
+        result["screenshots_converted"] += 1
+
+    # Версия без простоев: анализ в этом же процессе пула (пул внутри пула не запускаем)
+    if COMPACT_CONDENSE and recording.get("files"):
+        try:
+            index = condense_session(session_dir, workers=1)
+            if index:
+                recording["condensed"] = summary(index)
+        except Exception as e:
+            print(f"   ⚠️  Сжатая версия {session_dir.name} не собрана: {e}")
+
+    if recording:
+        recording["bytes"] = sum(entry["bytes"] for entry in recording.get("files", []))
+        result["recording_bytes"] = recording["bytes"]
+    result["total_bytes"] = directory_size(session_dir)
+    result["seconds"] = round(time.time() - started, 1)
+
+    if manifest:
+        manifest["compacted"] = {
+            "at": time.time(),
+            "preset": COMPACT_PRESET,
+            "crf": COMPACT_CRF,
+            "recording_saved": result["recording_saved"],
+            "screenshots_saved": result["screenshots_saved"],
+        }
+        temp_path = manifest_path.with_suffix(".json.tmp")
+        temp_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2))
+        temp_path.replace(manifest_path)
+    return result
+
+
+class Compactor:
+    """Сжатие и retention сессий из индекса"""
+
+    def __init__(self, sessions_dir: Path = None, workers: int = COMPACT_WORKERS,
+                 max_age_days: float = COMPACT_MAX_AGE_DAYS, max_total_gb: float = COMPACT_MAX_TOTAL_GB):
+        """
+        Args:
+            sessions_dir: Папка сессий
+            workers: Размер пула процессов сжатия
+            max_age_days: Удалять сессии старше (0 - не удалять по возрасту)
+            max_total_gb: Предел суммарного размера сессий (0 - без предела)
+        """
+        self.sessions_dir = Path(sessions_dir or DEFAULT_SESSIONS_DIR)
+        self.index = SessionIndex(self.sessions_dir)
+        self.workers = workers
+        self.max_age_days = max_age_days
+        self.max_total_bytes = int(max_total_gb * 1024 ** 3)
+        self._pool = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn, а не fork: compactor работает рядом с потоками сессий (оркестратор)
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_lower_priority,
+                                             mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def compact(self) -> int:
+        """Сжать ожидающие сессии (партиями по размеру пула); возвращает число сжатых"""
+        done = 0
+        while not self._stop.is_set():
+            candidates = self.index.compaction_candidates(COMPACT_MIN_AGE_SECONDS, limit=self.workers)
+            if not candidates:
+                break
+            futures = {row["session_id"]: self._executor().submit(compact_session, row["session_dir"])
+                       for row in candidates}
+            for session_id, future in futures.items():
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"   ⚠️  Сжатие {session_id} не удалось: {e}")
+                    # Отмечаем, чтобы не повторять бесконечно
+                    self.index.mark_compacted(session_id, None)
+                    continue
+                self.index.mark_compacted(session_id, result["total_bytes"], result.get("recording_bytes"))
+                saved_mb = (result["recording_saved"] + result["screenshots_saved"]) / (1024 * 1024)
+                print(f"   🗜️  {session_id}: -{saved_mb:.1f} MB за {result['seconds']} сек "
+                      f"(скриншотов в WebP: {result['screenshots_converted']})")
+                done += 1
+        return done
+
+    def _remove(self, row: dict, reason: str) -> int:
+        session_dir = Path(row["session_dir"] or self.sessions_dir / row["session_id"])
+        size = row["total_bytes"] if row["total_bytes"] is not None else \
+            (directory_size(session_dir) if session_dir.exists() else 0)
+        # Удаляем только папки внутри sessions/
+        if session_dir.exists() and session_dir.resolve().parent != self.sessions_dir.resolve():
+            print(f"   ⚠️  {row['session_id']}: {session_dir} вне {self.sessions_dir}, пропускаю")
+            return 0
+        shutil.rmtree(session_dir, ignore_errors=True)
+        self.index.delete(row["session_id"])
+        print(f"   🗑️  {row['session_id']}: удалена ({reason}, {size / (1024 * 1024):.1f} MB)")
+        return size
+
+    def enforce_retention(self) -> int:
+        """Удалить устаревшие сессии и вытеснить LRU до предела размера; возвращает число удалённых"""
+        removed = 0
+        if self.max_age_days:
+            for row in self.index.expired(time.time() - self.max_age_days * 86400):
+                self._remove(row, f"старше {self.max_age_days:g} дн.")
+                removed += 1
+
+        if self.max_total_bytes:
+            rows = self.index.least_recently_used()
+            sizes = {}
+            for row in rows:
+                if row["total_bytes"] is None:
+                    # Размер ещё не известен (сессия не сжата) - считаем один раз и сохраняем
+                    session_dir = Path(row["session_dir"] or self.sessions_dir / row["session_id"])
+                    row["total_bytes"] = directory_size(session_dir) if session_dir.exists() else 0
+                    self.index.set_total_bytes(row["session_id"], row["total_bytes"])
+                sizes[row["session_id"]] = row["total_bytes"]
+
+            total = sum(sizes.values())
+            for row in rows:
+                if total <= self.max_total_bytes:
+                    break
+                total -= self._remove(row, "LRU, превышен предел размера")
+                removed += 1
+        return removed
+
+    def run_once(self):
+        compacted = self.compact()
+        removed = self.enforce_retention()
+        if compacted or removed:
+            print(f"🗜️  Compactor: сжато {compacted}, удалено {removed}")
+
+    def _loop(self, interval: float):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"   ⚠️  Compactor: {e}")
+            self._stop.wait(interval)
+
+    def start(self, interval: float = COMPACT_INTERVAL_SECONDS):
+        """Запустить в фоновом потоке (сжатие - в процессах пула)"""
+        self._thread = threading.Thread(target=self._loop, args=(interval,), name="compactor", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        if self._pool:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+        self.index.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сжатие и очистка сессий MeetingBot")
+    parser.add_argument("--sessions-dir", type=Path, default=DEFAULT_SESSIONS_DIR)
+    parser.add_argument("--once", action="store_true", help="Один проход и выход")
+    args = parser.parse_args()
+
+    compactor = Compactor(args.sessions_dir)
+    try:
+        if args.once:
+            compactor.run_once()
+        else:
+            print(f"🗜️  Compactor запущен (каждые {COMPACT_INTERVAL_SECONDS} сек, процессов: {compactor.workers})")
+            compactor._loop(COMPACT_INTERVAL_SECONDS)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        compactor.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Конфигурация сессии бота
+"""
+import os
+from dotenv import load_dotenv
+
+# Загрузка переменных окружения
+load_dotenv()
+
+
+def _env_bool(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() == "true"
+
+
+class BotConfig:
+    """Настройки одной сессии бота (одна встреча = один конфиг)"""
+
+    def __init__(
+        self,
+        meeting_url: str,
+        bot_name: str = "MeetingBot",
+        headless: bool = True,
+        window_width: int = 1920,
+        window_height: int = 1080,
+        screenshot_delay: int = 3,
+        connector_type: str = "zoom",
+        enable_recording: bool = False,
+        max_meeting_duration_seconds: int = 7200,
+        display: str = ":99",
+        pulse_sink: str = "virtual_speaker",
+        screenshot_format: str = "png",
+        screenshot_quality: int = 80,
+        screenshot_scale: float = 1.0,
+        recording_segment_seconds: int = 0,
+        shutdown_deadline_seconds: float = 8,
+        recording_mode: str = "video",
+        recording_audio_codec: str = "opus",
+        audio_tap: bool = False,
+        recording_capture: str = "constant",
+        recording_video_source: str = "x11",
+        max_rejoins: int = 3,
+        screenshot_policy: str = "on_failure",
+        browser_profile_cache: bool = True,
+        request_filter: bool = True,
+    ):
+        """
+        Args:
+            meeting_url: URL встречи
+            bot_name: Имя бота для отображения на встрече
+            headless: Запускать Chrome без GUI
+            window_width: Ширина окна браузера
+            window_height: Высота окна браузера
+            screenshot_delay: Задержка перед скриншотом (сек)
+            connector_type: Тип коннектора ("zoom")
+            enable_recording: Включить запись экрана/аудио
+            max_meeting_duration_seconds: Максимальная длительность встречи
+            display: X11 DISPLAY, на котором рендерится Chrome и идёт запись
+            pulse_sink: PulseAudio sink, в который Chrome выводит звук
+            screenshot_format: Формат скриншотов ("png", "jpeg", "webp")
+            screenshot_quality: Качество скриншотов jpeg/webp (0-100)
+            screenshot_scale: Масштаб скриншотов (1.0 = полный размер)
+            recording_segment_seconds: Длина сегмента записи (0 = один файл recording.mp4)
+            shutdown_deadline_seconds: За сколько секунд close() обязан завершиться
+                (docker stop по умолчанию даёт 10 сек до SIGKILL)
+            recording_mode: "video" (экран + звук, нужен Xvfb) или "audio" (только звук,
+                Chrome остаётся headless)
+            recording_audio_codec: Кодек аудио-записи ("opus" или "aac")
+            audio_tap: Живой PCM-поток звука во время встречи (sessions/<id>/audio.sock),
+                отдаётся тем же ffmpeg, что и запись
+            recording_capture: "constant" (каждый кадр с постоянным FPS) или "changes"
+                (только изменившиеся кадры, переменный FPS)
+            recording_video_source: Откуда брать видео: "x11" (x11grab с Xvfb, Chrome с GUI)
+                или "screencast" (CDP Page.startScreencast, Chrome headless, Xvfb не нужен)
+            max_rejoins: Сколько раз за сессию входить повторно после сбоя вкладки (0 - не входить)
+            screenshot_policy: "on_failure" (скриншоты шагов в памяти, на диск - только при сбое
+                подключения, без маркеров кликов) или "always" (отладка: всё на диск, с маркерами)
+            browser_profile_cache: Запускать Chrome с копией профиля, где уже лежат
+                HTTP-кэш и V8 code cache web client'а (см. profiles.py)
+            request_filter: Блокировать аналитику/трекеры по списку коннектора (см. request_filter.py)
+        """
+        self.meeting_url = meeting_url
+        self.bot_name = bot_name
+        self.headless = headless
+        self.window_width = window_width
+        self.window_height = window_height
+        self.screenshot_delay = screenshot_delay
+        self.connector_type = connector_type.lower()
+        self.enable_recording = enable_recording
+        self.max_meeting_duration_seconds = max_meeting_duration_seconds
+        self.display = display
+        self.pulse_sink = pulse_sink
+        self.screenshot_format = screenshot_format.lower()
+        self.screenshot_quality = screenshot_quality
+        self.screenshot_scale = screenshot_scale
+        self.recording_segment_seconds = recording_segment_seconds
+        self.shutdown_deadline_seconds = shutdown_deadline_seconds
+        self.recording_mode = recording_mode.lower()
+        self.recording_audio_codec = recording_audio_codec.lower()
+        self.audio_tap = audio_tap
+        self.recording_capture = recording_capture.lower()
+        self.recording_video_source = recording_video_source.lower()
+        self.max_rejoins = max_rejoins
+        self.screenshot_policy = screenshot_policy.lower()
+        self.browser_profile_cache = browser_profile_cache
+        self.request_filter = request_filter
+
+    @property
+    def resolution(self) -> str:
+        return f"{self.window_width}x{self.window_height}"
+
+    @property
+    def records_video(self) -> bool:
+        """Запись экрана (x11grab) - Chrome должен рендериться на Xvfb"""
+        return self.enable_recording and self.recording_mode == "video"
+
+    @property
+    def grabs_display(self) -> bool:
+        """Запись экрана через x11grab - Chrome должен рендериться на Xvfb"""
+        return self.records_video and self.recording_video_source == "x11"
+
+    @property
+    def run_headless(self) -> bool:
+        """Chrome без GUI: запрошен headless и экран не захватывается через X11"""
+        return self.headless and not self.grabs_display
+
+    @property
+    def needs_display(self) -> bool:
+        """Нужен X display (Xvfb): Chrome с GUI или запись экрана"""
+        return not self.run_headless
+
+    @property
+    def audio_source(self) -> str:
+        """Monitor-источник sink'а, с которого пишется звук встречи"""
+        return f"{self.pulse_sink}.monitor"
+
+    @classmethod
+    def from_env(cls, **overrides) -> "BotConfig":
+        """Собрать конфиг из переменных окружения (с возможностью переопределения полей)"""
+        values = dict(
+            meeting_url=os.getenv("MEETING_URL", "https://www.google.com"),
+            bot_name=os.getenv("BOT_NAME", "MeetingBot"),
+            headless=_env_bool("HEADLESS", "true"),
+            window_width=int(os.getenv("WINDOW_WIDTH", "1920")),
+            window_height=int(os.getenv("WINDOW_HEIGHT", "1080")),
+            screenshot_delay=int(os.getenv("SCREENSHOT_DELAY", "3")),
+            connector_type=os.getenv("CONNECTOR_TYPE", "zoom"),
+            enable_recording=_env_bool("ENABLE_RECORDING", "false"),
+            max_meeting_duration_seconds=int(os.getenv("MAX_MEETING_DURATION_SECONDS", "7200")),  # 2 часа по умолчанию
+            display=os.getenv("X_DISPLAY", ":99"),
+            pulse_sink=os.getenv("PULSE_SINK", "virtual_speaker"),
+            screenshot_format=os.getenv("SCREENSHOT_FORMAT", "png"),
+            screenshot_quality=int(os.getenv("SCREENSHOT_QUALITY", "80")),
+            screenshot_scale=float(os.getenv("SCREENSHOT_SCALE", "1.0")),
+            recording_segment_seconds=int(os.getenv("RECORDING_SEGMENT_SECONDS", "0")),
+            shutdown_deadline_seconds=float(os.getenv("SHUTDOWN_DEADLINE_SECONDS", "8")),
+            recording_mode=os.getenv("RECORDING_MODE", "video"),
+            recording_audio_codec=os.getenv("RECORDING_AUDIO_CODEC", "opus"),
+            audio_tap=_env_bool("AUDIO_TAP", "false"),
+            recording_capture=os.getenv("RECORDING_CAPTURE", "constant"),
+            recording_video_source=os.getenv("RECORDING_VIDEO_SOURCE", "x11"),
+            max_rejoins=int(os.getenv("MAX_REJOINS", "3")),
+            screenshot_policy=os.getenv("SCREENSHOT_POLICY", "on_failure"),
+            browser_profile_cache=_env_bool("BROWSER_PROFILE_CACHE", "true"),
+            request_filter=_env_bool("REQUEST_FILTER", "true"),
+        )
+        values.update(overrides)
+        return cls(**values)
+
+    def copy(self, **overrides) -> "BotConfig":
+        """Копия конфига с переопределёнными полями"""
+        values = dict(vars(self))
+        values.update(overrides)
+        return BotConfig(**values)
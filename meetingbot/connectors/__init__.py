@@ -2,6 +2,12 @@
 Meeting Connectors Package
 """
 from .base_connector import BaseMeetingConnector
+from .batch import BatchResult, ScriptBatch
+from .locators import Locator, LocatorCache
+from .waits import ConditionWaiter, WaitTimeout
 from .zoom_connector import ZoomConnector
 
-__all__ = ['BaseMeetingConnector', 'ZoomConnector']
+__all__ = [
+    'BaseMeetingConnector', 'BatchResult', 'ConditionWaiter', 'Locator', 'LocatorCache',
+    'ScriptBatch', 'WaitTimeout', 'ZoomConnector',
+]
@@ -1,22 +1,50 @@
 """
 Базовый класс для коннекторов встреч
 """
+import time
 from abc import ABC, abstractmethod
+from typing import Optional
+from tracing import Tracer
+from .batch import ScriptBatch
+from .locators import LocatorCache
+from .waits import ConditionWaiter
 
 
 class BaseMeetingConnector(ABC):
     """Абстрактный базовый класс для подключения к различным платформам встреч"""
 
-    def __init__(self, driver, bot_name: str, take_screenshot_callback=None):
+    # Шаблоны URL, которые не нужны коннектору и блокируются (см. request_filter.py)
+    BLOCKED_URL_PATTERNS = ()
+
+    def __init__(self, driver, bot_name: str, take_screenshot_callback=None, display: str = ":99",
+                 tracer: Tracer = None, show_markers: bool = True):
         """
         Args:
             driver: Selenium WebDriver instance
             bot_name: Имя бота для отображения на встрече
             take_screenshot_callback: Функция для создания скриншотов (опционально)
+            display: X11 DISPLAY, на котором запущен браузер (для xdotool и т.п.)
+            tracer: Трассировка шагов (опционально)
+            show_markers: Рисовать в странице маркеры кликов для отладочных скриншотов
         """
         self.driver = driver
         self.bot_name = bot_name
         self.take_screenshot = take_screenshot_callback
+        self.display = display
+        self.tracer = tracer or Tracer()
+        self.show_markers = show_markers
+        self.waiter = ConditionWaiter(driver)
+        self.locators = LocatorCache(driver)
+
+    def batch(self) -> ScriptBatch:
+        """
+        Новый пакет скриптов: несколько проб/действий за один round trip
+        с отдельным результатом (и изоляцией ошибок) для каждого элемента
+
+        Returns:
+            ScriptBatch: Пакет, выполняемый через run()
+        """
+        return ScriptBatch(self.driver)
 
     @abstractmethod
     def join_meeting(self, meeting_url: str) -> bool:
@@ -31,6 +59,21 @@ class BaseMeetingConnector(ABC):
         """
         pass
 
+    def rejoin_meeting(self, meeting_url: str) -> bool:
+        """
+        Повторно войти во встречу тем же браузером после сбоя (вкладка упала, iframe ушёл, сеть)
+
+        Базовая реализация просто проходит join_meeting заново; коннекторы могут
+        пропускать шаги, которые уже сделаны.
+
+        Args:
+            meeting_url: URL встречи
+
+        Returns:
+            bool: True если снова во встрече
+        """
+        return self.join_meeting(meeting_url)
+
     @abstractmethod
     def get_platform_name(self) -> str:
         """
@@ -60,3 +103,23 @@ class BaseMeetingConnector(ABC):
             bool: True если в встрече (кнопка Leave есть), False если встреча завершена
         """
         pass
+
+    def wait_for_meeting_end(self, timeout: float) -> Optional[str]:
+        """
+        Дождаться выхода из встречи (не дольше timeout секунд)
+
+        Базовая реализация опрашивает check_in_meeting() раз в секунду.
+        Коннекторы могут переопределить её событийным механизмом.
+
+        Args:
+            timeout: Максимальное время ожидания в секундах
+
+        Returns:
+            Optional[str]: Причина выхода ("left", "removed", "ended") или None если встреча продолжается
+        """
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if not self.check_in_meeting():
+                return "left"
+            time.sleep(min(1, max(0, deadline - time.time())))
+        return None
@@ -0,0 +1,75 @@
+"""
+Пакетное выполнение скриптов - несколько проб/действий за один round trip
+"""
+
+# Каждый элемент пакета выполняется в своей функции со своими arguments,
+# ошибка одного элемента не влияет на остальные
+BATCH_RUNNER_JS = """
+var fns = [%s];
+var items = arguments[0];
+var results = [];
+for (var i = 0; i < fns.length; i++) {
+    try {
+        results.push({ok: true, value: fns[i].apply(null, items[i])});
+    } catch (e) {
+        results.push({ok: false, error: String(e && e.message || e)});
+    }
+}
+return results;
+"""
+
+
+class BatchResult:
+    """Результат одного элемента пакета"""
+
+    def __init__(self, ok: bool, value=None, error: str = None):
+        self.ok = ok
+        self.value = value
+        self.error = error
+
+    def __repr__(self):
+        if self.ok:
+            return f"BatchResult(ok, {self.value!r})"
+        return f"BatchResult(error, {self.error!r})"
+
+
+class ScriptBatch:
+    """Набор скриптов, отправляемых в браузер одним execute_script
+
+    Пример:
+        batch = connector.batch()
+        batch.add("mute_info", PROBE_JS, 350, 212)
+        batch.add("name_info", PROBE_JS, 395, 386)
+        results = batch.run()
+        results["mute_info"].value
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self._items = []
+
+    def add(self, key: str, script: str, *args) -> "ScriptBatch":
+        """Добавить скрипт (тело функции, аргументы доступны как arguments[0], ...)"""
+        self._items.append((key, script, list(args)))
+        return self
+
+    def __len__(self):
+        return len(self._items)
+
+    def run(self) -> dict:
+        """Выполнить все скрипты за один round trip
+
+        Returns:
+            dict: key -> BatchResult
+        """
+        if not self._items:
+            return {}
+
+        functions = ",\n".join(f"function() {{\n{script}\n}}" for _, script, _ in self._items)
+        raw = self.driver.execute_script(BATCH_RUNNER_JS % functions, [args for _, _, args in self._items])
+
+        results = {}
+        for (key, _, _), item in zip(self._items, raw):
+            results[key] = BatchResult(item.get("ok"), item.get("value"), item.get("error"))
+        self._items = []
+        return results
@@ -0,0 +1,152 @@
+"""
+Поиск элементов управления по aria-label/role/тексту с кэшированием
+"""
+from selenium.common.exceptions import StaleElementReferenceException
+
+# Поиск элемента: aria-label -> точный текст -> координаты (fallback).
+# Возвращает {element, strategy} или null
+RESOLVE_JS = """
+var ariaLabels = arguments[0], texts = arguments[1], selector = arguments[2], point = arguments[3];
+
+function visible(el) {
+    return el.getClientRects().length > 0;
+}
+
+var candidates = document.querySelectorAll(selector);
+if (ariaLabels.length) {
+    for (var i = 0; i < candidates.length; i++) {
+        var aria = (candidates[i].getAttribute('aria-label') || '').toLowerCase();
+        for (var j = 0; j < ariaLabels.length; j++) {
+            if (aria.indexOf(ariaLabels[j]) !== -1 && visible(candidates[i])) {
+                return {element: candidates[i], strategy: 'aria-label'};
+            }
+        }
+    }
+}
+if (texts.length) {
+    for (var i = 0; i < candidates.length; i++) {
+        var text = (candidates[i].textContent || '').trim().toLowerCase();
+        if (texts.indexOf(text) !== -1 && visible(candidates[i])) {
+            return {element: candidates[i], strategy: 'text'};
+        }
+    }
+}
+if (point) {
+    var elem = document.elementFromPoint(point[0], point[1]);
+    var target = elem && elem.closest(selector);
+    if (target) {
+        return {element: target, strategy: 'point'};
+    }
+}
+return null;
+"""
+
+# Префикс для скриптов над закэшированным элементом: отсоединённый от DOM элемент = промах кэша
+STALE_GUARD_JS = """
+if (!arguments[0] || !arguments[0].isConnected) {
+    return {__stale: true};
+}
+"""
+
+# Клик по элементу (arguments[0])
+CLICK_ELEMENT_JS = """
+var elem = arguments[0];
+elem.click();
+return {success: true, aria: elem.getAttribute('aria-label'), text: (elem.textContent || '').trim()};
+"""
+
+
+class Locator:
+    """Описание элемента управления"""
+
+    def __init__(self, name: str, aria_labels=(), texts=(), selector="button, [role='button']", point=None):
+        """
+        Args:
+            name: Имя элемента (ключ кэша)
+            aria_labels: Подстроки aria-label (без учёта регистра)
+            texts: Точные тексты элемента (без учёта регистра)
+            selector: CSS-селектор кандидатов
+            point: (x, y) для поиска через elementFromPoint, если остальное не нашло
+        """
+        self.name = name
+        self.aria_labels = [label.lower() for label in aria_labels]
+        self.texts = [text.lower() for text in texts]
+        self.selector = selector
+        self.point = list(point) if point else None
+
+    def script_args(self) -> tuple:
+        return (self.aria_labels, self.texts, self.selector, self.point)
+
+
+class LocatorCache:
+    """Кэш найденных элементов для текущего фрейма
+
+    Элемент ищется один раз, дальше скрипты выполняются над ссылкой из кэша.
+    Если элемент отсоединился от DOM (или документ пересоздан) - кэш
+    сбрасывается и элемент ищется заново.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.frame = None
+        self._elements = {}
+        self.hits = 0
+        self.misses = 0
+
+    def set_frame(self, frame_name):
+        """Драйвер переключился во фрейм - кэш предыдущего фрейма недействителен"""
+        self.frame = frame_name
+        self._elements.clear()
+
+    def invalidate(self, locator: Locator = None):
+        if locator is None:
+            self._elements.clear()
+        else:
+            self._elements.pop(locator.name, None)
+
+    def remember(self, locator: Locator, resolved):
+        """Сохранить результат RESOLVE_JS (например, полученный при ожидании)"""
+        if resolved and resolved.get("element") is not None:
+            self._elements[locator.name] = resolved["element"]
+            return resolved["element"]
+        return None
+
+    def resolve(self, locator: Locator):
+        """Найти элемент (из кэша или в DOM)"""
+        element = self._elements.get(locator.name)
+        if element is not None:
+            self.hits += 1
+            return element
+
+        self.misses += 1
+        resolved = self.driver.execute_script(RESOLVE_JS, *locator.script_args())
+        if resolved:
+            print(f"   🎯 {locator.name}: найден по {resolved.get('strategy')}")
+        return self.remember(locator, resolved)
+
+    def wait_for(self, waiter, locator: Locator, timeout: float, description: str = "", required=True, floor=None):
+        """Дождаться появления элемента и сразу закэшировать его"""
+        resolved = waiter.until(RESOLVE_JS, timeout, description or locator.name,
+                                floor=floor, required=required, args=locator.script_args())
+        return self.remember(locator, resolved)
+
+    def run(self, locator: Locator, script: str, *args):
+        """Выполнить скрипт над элементом (arguments[0]) за один round trip
+
+        Returns:
+            Результат скрипта или None если элемент не найден
+        """
+        for attempt in range(2):
+            element = self.resolve(locator)
+            if element is None:
+                return None
+            try:
+                result = self.driver.execute_script(STALE_GUARD_JS + script, element, *args)
+            except StaleElementReferenceException:
+                result = {"__stale": True}
+
+            if isinstance(result, dict) and result.get("__stale"):
+                self.invalidate(locator)
+                continue
+            return result
+        return None
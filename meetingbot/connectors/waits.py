@@ -0,0 +1,76 @@
+"""
+Ожидание условий в DOM вместо фиксированных задержек
+"""
+import random
+import time
+
+
+class WaitTimeout(Exception):
+    """Условие не выполнилось за отведённое время"""
+
+
+class ConditionWaiter:
+    """Ждёт выполнения JS-условия на странице с небольшой случайной
+    минимальной задержкой (чтобы действия не выглядели мгновенными)"""
+
+    def __init__(self, driver, poll_interval=0.1, floor=(0.3, 0.8)):
+        """
+        Args:
+            driver: Selenium WebDriver instance
+            poll_interval: Интервал между проверками условия (сек)
+            floor: Диапазон минимальной задержки "как у человека" (сек)
+        """
+        self.driver = driver
+        self.poll_interval = poll_interval
+        self.floor = floor
+
+    def until(self, condition_js: str, timeout: float, description: str = "", floor=None, required=True, args=()):
+        """Дождаться, пока JS-выражение станет истинным
+
+        Args:
+            condition_js: Тело JS-функции, возвращающее truthy значение когда условие выполнено
+            timeout: Таймаут шага (сек)
+            description: Описание шага для логов
+            floor: Минимальная задержка (min, max); None - значение по умолчанию
+            required: True - бросить WaitTimeout по таймауту, False - вернуть None
+            args: Аргументы для скрипта (arguments[0], ...)
+
+        Returns:
+            Значение условия (или None если не дождались и required=False)
+        """
+        floor_min, floor_max = floor if floor is not None else self.floor
+        min_delay = random.uniform(floor_min, floor_max)
+        started = time.time()
+        deadline = started + timeout
+        last_error = None
+
+        while True:
+            try:
+                value = self.driver.execute_script(condition_js, *args)
+                last_error = None
+            except Exception as e:
+                value = None
+                last_error = e
+
+            now = time.time()
+            if value:
+                if now - started < min_delay:
+                    time.sleep(min_delay - (now - started))
+                print(f"   ⏱️  {description or 'Условие'}: {time.time() - started:.2f} сек")
+                return value
+
+            if now >= deadline:
+                message = f"{description or 'Условие'} не выполнено за {timeout} сек"
+                if last_error:
+                    message += f" (последняя ошибка: {last_error})"
+                if required:
+                    raise WaitTimeout(message)
+                print(f"   ⚠️  {message}")
+                return None
+
+            time.sleep(min(self.poll_interval, deadline - now))
+
+    def pause(self, floor=None):
+        """Только минимальная "человеческая" задержка, без условия"""
+        floor_min, floor_max = floor if floor is not None else self.floor
+        time.sleep(random.uniform(floor_min, floor_max))
@@ -3,12 +3,328 @@ Zoom Meeting Connector
 """
 import time
 import random
+from typing import Optional
 from .base_connector import BaseMeetingConnector
+from .locators import CLICK_ELEMENT_JS, Locator
+from .waits import WaitTimeout
+
+
+# Элементы управления Zoom: aria-label/текст, координаты (800x600) - запасной вариант
+MUTE_BUTTON = Locator("mute", aria_labels=("mute",), point=(350, 212))
+VIDEO_BUTTON = Locator("video", aria_labels=("stop video", "start video"), point=(437, 212))
+JOIN_BUTTON = Locator("join", texts=("join",), point=(394, 507))
+LEAVE_BUTTON = Locator("leave", aria_labels=("leave",), texts=("leave",), point=(760, 485))
+LEAVE_CONFIRM_BUTTON = Locator("leave_confirm", texts=("leave meeting",))
+
+# Аналитика, реклама и трекеры на страницах Zoom - коннектору не нужны.
+# Шрифты и CSS не блокируются: клики идут в том числе по координатам,
+# и другая вёрстка сдвинула бы кнопки.
+ZOOM_BLOCKED_URL_PATTERNS = (
+    "*google-analytics.com*",
+    "*googletagmanager.com*",
+    "*doubleclick.net*",
+    "*googleadservices.com*",
+    "*facebook.net*",
+    "*facebook.com/tr*",
+    "*snap.licdn.com*",
+    "*px.ads.linkedin.com*",
+    "*bat.bing.com*",
+    "*demdex.net*",
+    "*omtrdc.net*",
+    "*hotjar.com*",
+    "*clarity.ms*",
+    "*optimizely.com*",
+    "*qualtrics.com*",
+    "*ws.zoominfo.com*",
+    "*js.driftt.com*",
+    "*munchkin.marketo.net*",
+    "*6sc.co*",
+    "*t.co/i/adsct*",
+    "*analytics.twitter.com*",
+)
+
+# Визуальный маркер места клика (arguments: id, x, y)
+MARKER_JS = """
+var marker = document.createElement('div');
+if (arguments[0]) {
+    marker.id = arguments[0];
+}
+marker.style.position = 'fixed';
+marker.style.left = arguments[1] + 'px';
+marker.style.top = arguments[2] + 'px';
+marker.style.width = '20px';
+marker.style.height = '20px';
+marker.style.borderRadius = '50%';
+marker.style.backgroundColor = 'red';
+marker.style.border = '3px solid yellow';
+marker.style.zIndex = '999999';
+marker.style.pointerEvents = 'none';
+marker.style.transform = 'translate(-50%, -50%)';
+document.body.appendChild(marker);
+return true;
+"""
+
+# Диагностика элемента в точке (arguments: x, y)
+PROBE_AT_POINT_JS = """
+var elem = document.elementFromPoint(arguments[0], arguments[1]);
+if (elem) {
+    return {
+        tag: elem.tagName,
+        id: elem.id,
+        class: elem.className,
+        ariaLabel: elem.getAttribute('aria-label'),
+        role: elem.getAttribute('role'),
+        name: elem.getAttribute('name'),
+        placeholder: elem.getAttribute('placeholder'),
+        type: elem.getAttribute('type')
+    };
+}
+return null;
+"""
+
+# Клик с полным циклом мышиных событий (arguments: x, y, список событий)
+DISPATCH_CLICK_JS = """
+var x = arguments[0], y = arguments[1], events = arguments[2];
+var elem = document.elementFromPoint(x, y);
+if (elem) {
+    events.forEach(function(eventType) {
+        var event = new MouseEvent(eventType, {
+            'view': window,
+            'bubbles': true,
+            'cancelable': true,
+            'clientX': x,
+            'clientY': y
+        });
+        elem.dispatchEvent(event);
+    });
+    return {success: true, tag: elem.tagName, text: (elem.textContent || '').substring(0, 50)};
+}
+return {success: false};
+"""
+
+# Закэшированная кнопка Leave всё ещё кнопка Leave
+LEAVE_PRESENT_JS = """
+var text = (arguments[0].textContent || '').toLowerCase();
+var aria = (arguments[0].getAttribute('aria-label') || '').toLowerCase();
+return text.indexOf('leave') !== -1 || aria.indexOf('leave') !== -1;
+"""
+
+# Таймауты шагов подключения (сек)
+STEP_TIMEOUTS = {
+    "page_load": 30,
+    "landing_link": 10,
+    "webclient_iframe": 30,
+    "preview": 30,
+    "av_buttons": 15,
+    "name_input": 15,
+    "name_value": 3,
+    "join_button": 15,
+    "in_meeting": 60,
+    "leave_confirm": 3,
+}
+
+# JS-условия для шагов подключения (выполняются в текущем фрейме)
+PAGE_LOADED_JS = "return document.readyState === 'complete';"
+
+# Кликабельный элемент (кнопка/ссылка) в точке arguments[0], arguments[1]
+CLICKABLE_AT_POINT_JS = """
+var elem = document.elementFromPoint(arguments[0], arguments[1]);
+var target = elem && elem.closest('button, a, [role="button"]');
+return !!(target && !target.disabled);
+"""
+
+WEBCLIENT_IFRAME_JS = "return !!document.getElementById('webclient');"
+
+NAME_INPUT_READY_JS = """
+var input = document.getElementById('input-for-name');
+return !!(input && !input.disabled && input.offsetParent !== null);
+"""
+
+IN_MEETING_JS = """
+var buttons = document.querySelectorAll('button');
+for (var i = 0; i < buttons.length; i++) {
+    var text = (buttons[i].textContent || '').toLowerCase();
+    var aria = (buttons[i].getAttribute('aria-label') || '').toLowerCase();
+    if (text.indexOf('leave') !== -1 || aria.indexOf('leave') !== -1) {
+        return true;
+    }
+}
+return false;
+"""
+
+# Состояние экрана предпросмотра (для повторного входа): микрофон/видео уже выключены, введённое имя
+PREVIEW_STATE_JS = """
+var state = {muted: false, video_off: false, name: null};
+document.querySelectorAll('button, [role="button"]').forEach(function(button) {
+    var label = (button.getAttribute('aria-label') || button.textContent || '').trim().toLowerCase();
+    if (label.indexOf('unmute') === 0) state.muted = true;
+    if (label.indexOf('start video') === 0) state.video_off = true;
+});
+var input = document.getElementById('input-for-name');
+state.name = input ? input.value : null;
+return state;
+"""
+# Где сейчас web client (выполняется в iframe): интерфейс встречи, предпросмотр или ни то ни другое
+WEBCLIENT_STATE_JS = """
+var buttons = document.querySelectorAll('button');
+for (var i = 0; i < buttons.length; i++) {
+    var text = (buttons[i].textContent || '').toLowerCase();
+    var aria = (buttons[i].getAttribute('aria-label') || '').toLowerCase();
+    if (text.indexOf('leave') !== -1 || aria.indexOf('leave') !== -1) {
+        return 'in_meeting';
+    }
+}
+return document.getElementById('input-for-name') ? 'preview' : 'gone';
+"""
+
+# Максимальная длительность одного блокирующего ожидания события (сек)
+PRESENCE_WAIT_MAX_SECONDS = 30
+
+# Наблюдатель присутствия во встрече. Внедряется в iframe 'webclient' и
+# через MutationObserver отслеживает переходы: бот вышел (пропала кнопка Leave),
+# хост удалил бота, встреча завершена. Python-сторона блокируется на
+# execute_async_script и просыпается сразу после перехода.
+PRESENCE_WATCHER_JS = """
+(function() {
+    if (window.__meetingbotPresence) {
+        return window.__meetingbotPresence.state;
+    }
+    var REMOVED_PHRASES = ['removed from this meeting', 'you have been removed', 'host has removed you'];
+    var ENDED_PHRASES = ['meeting has been ended', 'this meeting has ended', 'host has ended this meeting',
+                         'meeting is ended', 'meeting ended by host'];
+    var LEAVE_CONFIRM_MS = 300;
+
+    var presence = {state: 'in_meeting', detail: null, ts: Date.now(), waiters: []};
+    window.__meetingbotPresence = presence;
+
+    function hasLeaveButton() {
+        var buttons = document.querySelectorAll('button');
+        for (var i = 0; i < buttons.length; i++) {
+            var text = (buttons[i].textContent || '').toLowerCase();
+            var aria = (buttons[i].getAttribute('aria-label') || '').toLowerCase();
+            if (text.indexOf('leave') !== -1 || aria.indexOf('leave') !== -1) {
+                return true;
+            }
+        }
+        return false;
+    }
+
+    function dialogText() {
+        var dialogs = document.querySelectorAll('[role="dialog"], [role="alertdialog"], .zm-modal');
+        var text = '';
+        for (var i = 0; i < dialogs.length; i++) {
+            text += ' ' + (dialogs[i].textContent || '');
+        }
+        return text.toLowerCase();
+    }
+
+    function matches(text, phrases) {
+        for (var i = 0; i < phrases.length; i++) {
+            if (text.indexOf(phrases[i]) !== -1) {
+                return phrases[i];
+            }
+        }
+        return null;
+    }
+
+    function transition(state, detail) {
+        if (presence.state !== 'in_meeting') {
+            return;
+        }
+        presence.state = state;
+        presence.detail = detail;
+        presence.ts = Date.now();
+        observer.disconnect();
+        var waiters = presence.waiters;
+        presence.waiters = [];
+        waiters.forEach(function(notify) { notify(); });
+    }
+
+    var leaveMissingSince = null;
+    function detect() {
+        scheduled = false;
+        if (presence.state !== 'in_meeting') {
+            return;
+        }
+        var text = dialogText();
+        var phrase = matches(text, REMOVED_PHRASES);
+        if (phrase) {
+            transition('removed', phrase);
+            return;
+        }
+        phrase = matches(text, ENDED_PHRASES);
+        if (phrase) {
+            transition('ended', phrase);
+            return;
+        }
+        if (hasLeaveButton()) {
+            leaveMissingSince = null;
+            return;
+        }
+        // Кнопка Leave пропала - подтверждаем повторной проверкой,
+        // чтобы не среагировать на кратковременную перерисовку футера
+        if (leaveMissingSince === null) {
+            leaveMissingSince = Date.now();
+            setTimeout(schedule, LEAVE_CONFIRM_MS);
+        } else if (Date.now() - leaveMissingSince >= LEAVE_CONFIRM_MS) {
+            transition('left', 'leave button disappeared');
+        }
+    }
+
+    // Склеиваем пачку мутаций в одну проверку
+    var scheduled = false;
+    function schedule() {
+        if (!scheduled) {
+            scheduled = true;
+            setTimeout(detect, 50);
+        }
+    }
+
+    var observer = new MutationObserver(schedule);
+    observer.observe(document.documentElement, {childList: true, subtree: true, characterData: true, attributes: true,
+                                                attributeFilter: ['aria-label', 'class', 'style', 'hidden']});
+    window.addEventListener('pagehide', function() { transition('left', 'iframe unloaded'); });
+    schedule();
+    return presence.state;
+})();
+"""
+
+# Блокирующее ожидание перехода. Возвращает null если за timeout ничего не произошло
+PRESENCE_WAIT_JS = """
+var done = arguments[arguments.length - 1];
+var timeoutMs = arguments[0];
+var presence = window.__meetingbotPresence;
+if (!presence) {
+    done({state: 'no_watcher'});
+    return;
+}
+if (presence.state !== 'in_meeting') {
+    done({state: presence.state, detail: presence.detail});
+    return;
+}
+var notify = function() {
+    clearTimeout(timer);
+    done({state: presence.state, detail: presence.detail});
+};
+var timer = setTimeout(function() {
+    var idx = presence.waiters.indexOf(notify);
+    if (idx !== -1) {
+        presence.waiters.splice(idx, 1);
+    }
+    done(null);
+}, timeoutMs);
+presence.waiters.push(notify);
+"""
 
 
 class ZoomConnector(BaseMeetingConnector):
     """Коннектор для подключения к Zoom встречам"""
 
+    BLOCKED_URL_PATTERNS = ZOOM_BLOCKED_URL_PATTERNS
+
+    # xdg-open диалог уже закрывался в этом браузере (повторный вход его пропускает)
+    _xdg_dismissed = False
+
     def get_platform_name(self) -> str:
         return "Zoom"
 
@@ -30,50 +346,24 @@ class ZoomConnector(BaseMeetingConnector):
         x_random = x + random.randint(-x_variance, x_variance)
         y_random = y + random.randint(-y_variance, y_variance)
 
-        # Добавляем визуальный маркер на место клика
-        if show_marker:
-            self.driver.execute_script(f"""
-                var marker = document.createElement('div');
-                marker.style.position = 'fixed';
-                marker.style.left = '{x_random}px';
-                marker.style.top = '{y_random}px';
-                marker.style.width = '20px';
-                marker.style.height = '20px';
-                marker.style.borderRadius = '50%';
-                marker.style.backgroundColor = 'red';
-                marker.style.border = '3px solid yellow';
-                marker.style.zIndex = '999999';
-                marker.style.pointerEvents = 'none';
-                marker.style.transform = 'translate(-50%, -50%)';
-                document.body.appendChild(marker);
-            """)
+        # Маркер и клик уходят одним пакетом; если нужен скриншот с маркером -
+        # он делается между ними, поэтому пакетов два
+        batch = self.batch()
+        if show_marker and self.show_markers:
+            batch.add("marker", MARKER_JS, None, x_random, y_random)
 
             # Скриншот с маркером ДО клика
             if screenshot_name and self.take_screenshot:
+                batch.run()
                 time.sleep(0.3)  # Даём маркеру отрисоваться
                 self.take_screenshot(screenshot_name)
                 print(f"   📸 Скриншот с маркером: {screenshot_name}")
 
-        # Прямой JavaScript клик
-        clicked = self.driver.execute_script(f"""
-            var element = document.elementFromPoint({x_random}, {y_random});
-            if (element) {{
-                // Эмулируем полный цикл событий клика
-                var events = ['mouseenter', 'mouseover', 'mousedown', 'mouseup', 'click'];
-                events.forEach(function(eventType) {{
-                    var event = new MouseEvent(eventType, {{
-                        'view': window,
-                        'bubbles': true,
-                        'cancelable': true,
-                        'clientX': {x_random},
-                        'clientY': {y_random}
-                    }});
-                    element.dispatchEvent(event);
-                }});
-                return true;
-            }}
-            return false;
-        """)
+        # Прямой JavaScript клик с полным циклом событий
+        batch.add("click", DISPATCH_CLICK_JS, x_random, y_random,
+                  ['mouseenter', 'mouseover', 'mousedown', 'mouseup', 'click'])
+        click = batch.run()["click"]
+        clicked = click.ok and click.value.get('success')
 
         if clicked:
             print(f"   ✅ JavaScript клик выполнен по ({x_random}, {y_random})")
@@ -84,241 +374,245 @@ class ZoomConnector(BaseMeetingConnector):
 
     def join_meeting(self, meeting_url: str) -> bool:
         """Подключиться к Zoom встрече"""
+        steps = self.tracer.steps("join")
         try:
-            print(f"\n🔗 Открываю Zoom встречу: {meeting_url}")
-            self.driver.get(meeting_url)
-
-            # Скриншот после загрузки
-            print(f"⏳ Ожидание загрузки...")
-            self._human_like_delay(3, 5)
-            if self.take_screenshot:
-                self.take_screenshot("01_page_loaded.png")
-
-            # Прокрутка страницы вниз для 800x600
-            print("\n📜 Прокрутка страницы вниз...")
-            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            self._human_like_delay(1, 1)
-            if self.take_screenshot:
-                self.take_screenshot("01a_after_scroll.png")
-
-            # Клик по центральной кнопке после скрола (с маркером на скриншоте)
-            print("\n🖱️  Клик по центральной кнопке...")
-            self._human_like_click(400, 208, x_variance=0, y_variance=0, screenshot_name="01b_center_click_MARKER.png")
-            self._human_like_delay(2, 3)
-            if self.take_screenshot:
-                self.take_screenshot("01c_after_center_click.png")
+            if not self._open_webclient(meeting_url, steps):
+                return False
+            return self._join_from_preview(steps)
+        except WaitTimeout as e:
+            print(f"❌ Таймаут подключения к {self.get_platform_name()}: {e}")
+            steps.fail(e, "timeout")
+            return False
+        except Exception as e:
+            print(f"❌ Ошибка подключения к {self.get_platform_name()}: {e}")
+            steps.fail(e)
+            import traceback
+            traceback.print_exc()
+            return False
 
-            # Клик по ссылке (536, 392)
-            print("\n🔗 Клик по ссылке...")
-            self._human_like_click(536, 392, x_variance=0, y_variance=0, screenshot_name="01d_link_click_MARKER.png")
-            self._human_like_delay(2, 3)
-            if self.take_screenshot:
-                self.take_screenshot("01e_after_link_click.png")
+    def rejoin_meeting(self, meeting_url: str) -> bool:
+        """Быстрый повторный вход тем же браузером после сбоя
 
-            # Закрываем xdg-open диалог через xdotool (реальный X11 клик)
-            print("\n🧹 Закрываю xdg-open диалог (xdotool)...")
-            try:
-                import subprocess
-
-                # Координаты кнопки Cancel (800x600: 510, 275)
-                # xdotool кликает на реальные координаты экрана X11
-                result = subprocess.run(
-                    ['xdotool', 'mousemove', '510', '275', 'click', '1'],
-                    env={'DISPLAY': ':99'},
-                    capture_output=True,
-                    text=True,
-                    timeout=5
-                )
-
-                if result.returncode == 0:
-                    print(f"   ✅ xdotool клик выполнен (510, 275)")
-                else:
-                    print(f"   ⚠️  xdotool ошибка: {result.stderr}")
+        Шаги, которые уже сделаны, пропускаются: если интерфейс встречи на месте - только
+        переустанавливается наблюдатель; если жив экран предпросмотра - сразу ввод имени и Join;
+        xdg-open диалог в этом браузере уже закрыт, имя и Mute/Video не трогаются, если уже выставлены.
+        """
+        steps = self.tracer.steps("rejoin")
+        try:
+            steps.next("probe")
+            state = self._webclient_state()
+            steps.annotate(state=state)
+            print(f"\n🔁 Повторный вход в {self.get_platform_name()} (состояние: {state})")
+            if state == "in_meeting":
+                steps.end()
+                return True
+            if state != "preview" and not self._open_webclient(meeting_url, steps, rejoin=True):
+                return False
+            return self._join_from_preview(steps, rejoin=True)
+        except WaitTimeout as e:
+            print(f"❌ Таймаут повторного подключения к {self.get_platform_name()}: {e}")
+            steps.fail(e, "timeout")
+            return False
+        except Exception as e:
+            print(f"❌ Ошибка повторного подключения к {self.get_platform_name()}: {e}")
+            steps.fail(e)
+            import traceback
+            traceback.print_exc()
+            return False
 
-                time.sleep(1)
+    def _webclient_state(self) -> str:
+        """Где сейчас web client: "in_meeting", "preview" или "gone" (iframe/вкладки нет)"""
+        if not self._switch_to_webclient():
+            return "gone"
+        try:
+            return self.driver.execute_script(WEBCLIENT_STATE_JS) or "gone"
+        except Exception:
+            return "gone"
+
+    def _open_webclient(self, meeting_url: str, steps, rejoin: bool = False) -> bool:
+        """Лендинг -> iframe web client -> экран предпросмотра (драйвер остаётся в iframe)"""
+        print(f"\n🔗 Открываю Zoom встречу: {meeting_url}")
+        steps.next("navigate")
+        self.driver.get(meeting_url)
+
+        # Скриншот после загрузки
+        steps.next("page_load")
+        print(f"⏳ Ожидание загрузки...")
+        self.waiter.until(PAGE_LOADED_JS, STEP_TIMEOUTS["page_load"], "Загрузка страницы", floor=(0.5, 1.0))
+        self.waiter.until(CLICKABLE_AT_POINT_JS, STEP_TIMEOUTS["landing_link"], "Кнопка на странице",
+                          required=False, args=(400, 208))
+        if self.take_screenshot:
+            self.take_screenshot("01_page_loaded.png")
+
+        # Прокрутка страницы вниз для 800x600
+        steps.next("scroll")
+        print("\n📜 Прокрутка страницы вниз...")
+        self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        self.waiter.pause()
+        if self.take_screenshot:
+            self.take_screenshot("01a_after_scroll.png")
+
+        # Клик по центральной кнопке после скрола (с маркером на скриншоте)
+        steps.next("center_click")
+        print("\n🖱️  Клик по центральной кнопке...")
+        self._human_like_click(400, 208, x_variance=0, y_variance=0, screenshot_name="01b_center_click_MARKER.png")
+        self.waiter.until(CLICKABLE_AT_POINT_JS, STEP_TIMEOUTS["landing_link"], "Ссылка после клика",
+                          required=False, args=(536, 392))
+        if self.take_screenshot:
+            self.take_screenshot("01c_after_center_click.png")
+
+        # Клик по ссылке (536, 392)
+        steps.next("link_click")
+        print("\n🔗 Клик по ссылке...")
+        self._human_like_click(536, 392, x_variance=0, y_variance=0, screenshot_name="01d_link_click_MARKER.png")
+        # iframe клиента появляется вместе с xdg-open диалогом
+        self.waiter.until(WEBCLIENT_IFRAME_JS, STEP_TIMEOUTS["webclient_iframe"], "iframe 'webclient'")
+        if self.take_screenshot:
+            self.take_screenshot("01e_after_link_click.png")
+
+        # Закрываем xdg-open диалог через xdotool (реальный X11 клик);
+        # при повторном входе этот браузер его уже закрывал - шаг пропускается
+        steps.next("xdg_dismiss")
+        if rejoin and self._xdg_dismissed:
+            steps.annotate(skipped=True)
+            print("\n🧹 xdg-open диалог уже закрыт в этом браузере - пропускаю")
+        else:
+            self._dismiss_xdg_open()
 
-            except Exception as e:
-                print(f"   ⚠️  Ошибка xdotool: {e}")
+        # Старые клики для 1200x800 УДАЛЕНЫ (заменены на скрол + 2 клика выше)
 
+        # Переключаемся в iframe где находится Zoom интерфейс
+        steps.next("iframe_switch")
+        print("\n🔄 Переключаюсь в iframe Zoom...")
+        try:
+            iframe = self.driver.find_element("id", "webclient")
+            self.driver.switch_to.frame(iframe)
+            self.locators.set_frame("webclient")
+            print("   ✅ Переключен в iframe 'webclient'")
+
+            # Ждём экран предпросмотра (поле имени + кнопки Mute/Video)
+            self.waiter.until(NAME_INPUT_READY_JS, STEP_TIMEOUTS["preview"], "Экран предпросмотра")
+            self.locators.wait_for(self.waiter, MUTE_BUTTON, STEP_TIMEOUTS["av_buttons"], "Кнопка Mute",
+                                   required=False)
             if self.take_screenshot:
-                self.take_screenshot("01b_after_xdg_close.png")
-
-            # Старые клики для 1200x800 УДАЛЕНЫ (заменены на скрол + 2 клика выше)
+                self.take_screenshot("04b_inside_iframe.png")
+
+            # Диагностика элементов по координатам и маркеры Mute/Video - одним пакетом
+            print("\n🔍 Ищу селекторы элементов...")
+            batch = self.batch() \
+                .add("mute_info", PROBE_AT_POINT_JS, 350, 212) \
+                .add("video_info", PROBE_AT_POINT_JS, 437, 212) \
+                .add("name_info", PROBE_AT_POINT_JS, 395, 386)
+            if self.show_markers:
+                batch.add("mute_marker", MARKER_JS, "mute-marker", 350, 212) \
+                    .add("video_marker", MARKER_JS, "video-marker", 437, 212)
+            probes = batch.run()
+            print(f"   Mute (350, 212): {probes['mute_info']}")
+            print(f"   Stop Video (437, 212): {probes['video_info']}")
+            print(f"   Name Input (395, 386): {probes['name_info']}")
 
-            # Переключаемся в iframe где находится Zoom интерфейс
-            print("\n🔄 Переключаюсь в iframe Zoom...")
-            try:
-                iframe = self.driver.find_element("id", "webclient")
-                self.driver.switch_to.frame(iframe)
-                print("   ✅ Переключен в iframe 'webclient'")
-                if self.take_screenshot:
-                    self.take_screenshot("04b_inside_iframe.png")
-
-                # Выводим информацию об элементах по нашим координатам
-                print("\n🔍 Ищу селекторы элементов...")
-
-                # Mute button (800x600)
-                mute_info = self.driver.execute_script("""
-                    var elem = document.elementFromPoint(350, 212);
-                    if (elem) {
-                        return {
-                            tag: elem.tagName,
-                            id: elem.id,
-                            class: elem.className,
-                            ariaLabel: elem.getAttribute('aria-label'),
-                            role: elem.getAttribute('role'),
-                            type: elem.getAttribute('type')
-                        };
-                    }
-                    return null;
-                """)
-                print(f"   Mute (350, 212): {mute_info}")
-
-                # Stop Video button (800x600)
-                video_info = self.driver.execute_script("""
-                    var elem = document.elementFromPoint(437, 212);
-                    if (elem) {
-                        return {
-                            tag: elem.tagName,
-                            id: elem.id,
-                            class: elem.className,
-                            ariaLabel: elem.getAttribute('aria-label'),
-                            role: elem.getAttribute('role'),
-                            type: elem.getAttribute('type')
-                        };
-                    }
-                    return null;
-                """)
-                print(f"   Stop Video (437, 212): {video_info}")
-
-                # Name input (800x600)
-                name_info = self.driver.execute_script("""
-                    var elem = document.elementFromPoint(395, 386);
-                    if (elem) {
-                        return {
-                            tag: elem.tagName,
-                            id: elem.id,
-                            class: elem.className,
-                            name: elem.getAttribute('name'),
-                            placeholder: elem.getAttribute('placeholder'),
-                            type: elem.getAttribute('type')
-                        };
-                    }
-                    return null;
-                """)
-                print(f"   Name Input (969, 256): {name_info}")
+        except Exception as e:
+            print(f"   ⚠️  Не удалось переключиться в iframe: {e}")
+            steps.fail(e, "timeout" if isinstance(e, WaitTimeout) else "error")
+            return False
 
-            except Exception as e:
-                print(f"   ⚠️  Не удалось переключиться в iframe: {e}")
-                return False
+        return True
 
-            # Находим родительские кнопки для Mute и Stop Video
-            print("\n🔍 Ищу кнопки по aria-label...")
-            print("   ℹ️  Звук динамиков управляется браузером автоматически")
+    def _dismiss_xdg_open(self):
+        """Закрыть диалог открытия zoommtg:// (Cancel) кликом xdotool"""
+        print("\n🧹 Закрываю xdg-open диалог (xdotool)...")
+        try:
+            import subprocess
+
+            # Координаты кнопки Cancel (800x600: 510, 275)
+            # xdotool кликает на реальные координаты экрана X11
+            result = subprocess.run(
+                ['xdotool', 'mousemove', '510', '275', 'click', '1'],
+                env={'DISPLAY': self.display},
+                capture_output=True,
+                text=True,
+                timeout=5
+            )
+
+            if result.returncode == 0:
+                print(f"   ✅ xdotool клик выполнен (510, 275)")
+            else:
+                print(f"   ⚠️  xdotool ошибка: {result.stderr}")
 
-            # Задержка перед кликами Mute/Video
-            print("\n⏳ Ожидание 3 секунды перед кликами Mute/Video...")
-            self._human_like_delay(3, 3)
+            self.waiter.pause((0.2, 0.4))
 
-            # Клик "Mute" микрофон (800x600: 350, 212)
+        except Exception as e:
+            print(f"   ⚠️  Ошибка xdotool: {e}")
+
+        if self.take_screenshot:
+            self.take_screenshot("01b_after_xdg_close.png")
+        self._xdg_dismissed = True
+
+    def _join_from_preview(self, steps, rejoin: bool = False) -> bool:
+        """Экран предпросмотра -> Mute/Video -> имя -> Join -> встреча"""
+        # При повторном входе уже выставленное не трогаем: повторный клик снова включил бы микрофон
+        preview = self.driver.execute_script(PREVIEW_STATE_JS) if rejoin else {}
+        # Находим родительские кнопки для Mute и Stop Video
+        print("\n🔍 Ищу кнопки по aria-label...")
+        print("   ℹ️  Звук динамиков управляется браузером автоматически")
+
+        # Клик "Mute" микрофон (800x600: 350, 212)
+        steps.next("mute")
+        if preview.get("muted"):
+            steps.annotate(skipped=True)
+            print("\n🔇 Микрофон уже выключен - пропускаю")
+        else:
             print("\n🔇 Нажимаю кнопку 'Mute' (микрофон)...")
             try:
-                # Добавляем маркер
-                self.driver.execute_script("""
-                    var marker = document.createElement('div');
-                    marker.id = 'mute-marker';
-                    marker.style.position = 'fixed';
-                    marker.style.left = '350px';
-                    marker.style.top = '212px';
-                    marker.style.width = '20px';
-                    marker.style.height = '20px';
-                    marker.style.borderRadius = '50%';
-                    marker.style.backgroundColor = 'red';
-                    marker.style.border = '3px solid yellow';
-                    marker.style.zIndex = '999999';
-                    marker.style.pointerEvents = 'none';
-                    marker.style.transform = 'translate(-50%, -50%)';
-                    document.body.appendChild(marker);
-                """)
-                time.sleep(0.3)
-                if self.take_screenshot:
+                if self.take_screenshot and self.show_markers:
                     self.take_screenshot("05a_mute_MARKER.png")
 
-                clicked = self.driver.execute_script("""
-                    var elem = document.elementFromPoint(350, 212);
-                    // Поднимаемся по DOM до тега BUTTON
-                    while (elem && elem.tagName !== 'BUTTON') {
-                        elem = elem.parentElement;
-                    }
-                    if (elem) {
-                        console.log('Mute button:', elem);
-                        elem.click();
-                        return {success: true, aria: elem.getAttribute('aria-label')};
-                    }
-                    return {success: false};
-                """)
+                clicked = self.locators.run(MUTE_BUTTON, CLICK_ELEMENT_JS)
+                steps.annotate(clicked=bool(clicked and clicked.get('success')))
 
-                if clicked.get('success'):
+                if clicked and clicked.get('success'):
                     print(f"   ✅ Нажал кнопку через JavaScript: {clicked.get('aria')}")
                 else:
                     print(f"   ⚠️  Кнопка не найдена")
             except Exception as e:
                 print(f"   ⚠️  Ошибка: {e}")
 
-            self._human_like_delay(1, 2)
-            if self.take_screenshot:
-                self.take_screenshot("05b_after_mute.png")
+        self.locators.wait_for(self.waiter, VIDEO_BUTTON, STEP_TIMEOUTS["av_buttons"], "Кнопка Video",
+                               required=False)
+        if self.take_screenshot:
+            self.take_screenshot("05b_after_mute.png")
 
-            # Клик "Stop Video" (800x600: 437, 212)
+        # Клик "Stop Video" (800x600: 437, 212)
+        steps.next("video")
+        if preview.get("video_off"):
+            steps.annotate(skipped=True)
+            print("\n📹 Видео уже выключено - пропускаю")
+        else:
             print("\n📹 Нажимаю кнопку 'Stop Video'...")
             try:
-                # Добавляем маркер
-                self.driver.execute_script("""
-                    var marker = document.createElement('div');
-                    marker.id = 'video-marker';
-                    marker.style.position = 'fixed';
-                    marker.style.left = '437px';
-                    marker.style.top = '212px';
-                    marker.style.width = '20px';
-                    marker.style.height = '20px';
-                    marker.style.borderRadius = '50%';
-                    marker.style.backgroundColor = 'red';
-                    marker.style.border = '3px solid yellow';
-                    marker.style.zIndex = '999999';
-                    marker.style.pointerEvents = 'none';
-                    marker.style.transform = 'translate(-50%, -50%)';
-                    document.body.appendChild(marker);
-                """)
-                time.sleep(0.3)
-                if self.take_screenshot:
+                if self.take_screenshot and self.show_markers:
                     self.take_screenshot("06a_video_MARKER.png")
 
-                clicked = self.driver.execute_script("""
-                    var elem = document.elementFromPoint(437, 212);
-                    // Поднимаемся по DOM до тега BUTTON
-                    while (elem && elem.tagName !== 'BUTTON') {
-                        elem = elem.parentElement;
-                    }
-                    if (elem) {
-                        console.log('Video button:', elem);
-                        elem.click();
-                        return {success: true, aria: elem.getAttribute('aria-label')};
-                    }
-                    return {success: false};
-                """)
+                clicked = self.locators.run(VIDEO_BUTTON, CLICK_ELEMENT_JS)
+                steps.annotate(clicked=bool(clicked and clicked.get('success')))
 
-                if clicked.get('success'):
+                if clicked and clicked.get('success'):
                     print(f"   ✅ Нажал кнопку через JavaScript: {clicked.get('aria')}")
                 else:
                     print(f"   ⚠️  Кнопка не найдена")
             except Exception as e:
                 print(f"   ⚠️  Ошибка: {e}")
 
-            self._human_like_delay(1, 2)
-            if self.take_screenshot:
-                self.take_screenshot("06_after_stop_video.png")
+        self.waiter.until(NAME_INPUT_READY_JS, STEP_TIMEOUTS["name_input"], "Поле имени")
+        if self.take_screenshot:
+            self.take_screenshot("06_after_stop_video.png")
 
-            # Ввод имени бота - CDP Input.insertText
+        # Ввод имени бота - CDP Input.insertText
+        steps.next("name_input")
+        if preview.get("name") == self.bot_name:
+            steps.annotate(skipped=True)
+            print("\n✍️  Имя уже введено - пропускаю")
+        else:
             print(f"\n✍️  Ввожу имя бота: '{self.bot_name}'...")
             try:
                 # Активируем поле через JavaScript
@@ -331,7 +625,7 @@ class ZoomConnector(BaseMeetingConnector):
                 """)
 
                 print(f"   ✅ Поле активировано")
-                self._human_like_delay(0.5, 0.7)
+                self.waiter.pause((0.2, 0.4))
 
                 # Пробуем CDP Input.insertText
                 print(f"   ⌨️  Ввод через CDP Input.insertText...")
@@ -339,13 +633,11 @@ class ZoomConnector(BaseMeetingConnector):
                     'text': self.bot_name
                 })
 
-                self._human_like_delay(0.3, 0.5)
-
-                # Проверяем результат
-                entered_value = self.driver.execute_script("""
+                # Проверяем результат (ждём пока значение применится)
+                entered_value = self.waiter.until("""
                     var input = document.getElementById('input-for-name');
                     return input ? input.value : null;
-                """)
+                """, STEP_TIMEOUTS["name_value"], "Значение имени", floor=(0.1, 0.3), required=False)
 
                 print(f"   ✅ Результат: '{entered_value}'")
 
@@ -376,186 +668,162 @@ class ZoomConnector(BaseMeetingConnector):
                 import traceback
                 traceback.print_exc()
 
-            self._human_like_delay(1, 2)
-            if self.take_screenshot:
-                self.take_screenshot("07_after_name_input.png")
-
-            # Клик "Join" - входим в конференцию (800x600: 394, 507)
-            print("\n🚪 Нажимаю кнопку 'Join'...")
-            try:
-                clicked = self.driver.execute_script("""
-                    var elem = document.elementFromPoint(394, 507);
-                    // Поднимаемся по DOM до тега BUTTON
-                    while (elem && elem.tagName !== 'BUTTON') {
-                        elem = elem.parentElement;
-                    }
-                    if (elem) {
-                        console.log('Join button:', elem);
-                        elem.click();
-                        return {success: true, aria: elem.getAttribute('aria-label'), text: elem.textContent};
-                    }
-                    return {success: false};
-                """)
+        self.locators.wait_for(self.waiter, JOIN_BUTTON, STEP_TIMEOUTS["join_button"], "Кнопка Join",
+                               required=False)
+        if self.take_screenshot:
+            self.take_screenshot("07_after_name_input.png")
 
-                if clicked.get('success'):
-                    print(f"   ✅ Нажал кнопку через JavaScript: '{clicked.get('text')}' (aria: {clicked.get('aria')})")
-                else:
-                    print(f"   ⚠️  Кнопка не найдена")
-            except Exception as e:
-                print(f"   ⚠️  Ошибка: {e}")
+        # Клик "Join" - входим в конференцию (800x600: 394, 507)
+        steps.next("join_click")
+        print("\n🚪 Нажимаю кнопку 'Join'...")
+        try:
+            clicked = self.locators.run(JOIN_BUTTON, CLICK_ELEMENT_JS)
+            steps.annotate(clicked=bool(clicked and clicked.get('success')))
 
-            self._human_like_delay(2, 3)
-            if self.take_screenshot:
-                self.take_screenshot("08_after_join.png")
-
-            # Дополнительный клик через 3 секунды (закрытие диалога/уведомления)
-            print("\n⏳ Ожидание 3 секунды перед дополнительным кликом...")
-            self._human_like_delay(3, 3)
-
-            print(f"🖱️  Клик по (660, 200)...")
-            clicked = self.driver.execute_script("""
-                var elem = document.elementFromPoint(660, 200);
-                if (elem) {
-                    var events = ['mousedown', 'mouseup', 'click'];
-                    events.forEach(function(eventType) {
-                        var event = new MouseEvent(eventType, {
-                            'view': window,
-                            'bubbles': true,
-                            'cancelable': true,
-                            'clientX': 660,
-                            'clientY': 200
-                        });
-                        elem.dispatchEvent(event);
-                    });
-                    return {success: true, tag: elem.tagName, text: elem.textContent.substring(0, 50)};
-                }
-                return {success: false};
-            """)
-
-            if clicked.get('success'):
-                print(f"   ✅ Клик выполнен: {clicked.get('tag')} - '{clicked.get('text')}'")
+            if clicked and clicked.get('success'):
+                print(f"   ✅ Нажал кнопку через JavaScript: '{clicked.get('text')}' (aria: {clicked.get('aria')})")
             else:
-                print(f"   ℹ️  Элемент не найден (возможно диалог не появился)")
+                print(f"   ⚠️  Кнопка не найдена")
+        except Exception as e:
+            print(f"   ⚠️  Ошибка: {e}")
 
-            if self.take_screenshot:
-                self.take_screenshot("09_after_dialog_click.png")
+        # Ждём интерфейс встречи (кнопка Leave) вместо фиксированной паузы
+        steps.next("in_meeting")
+        in_meeting = self.waiter.until(IN_MEETING_JS, STEP_TIMEOUTS["in_meeting"], "Вход во встречу",
+                                       required=False)
+        steps.annotate(confirmed=bool(in_meeting))
+        if self.take_screenshot:
+            self.take_screenshot("08_after_join.png")
 
-            print(f"📄 Заголовок страницы: {self.driver.title}")
-            print(f"✅ Успешно подключился к {self.get_platform_name()}")
+        # Дополнительный клик (закрытие диалога/уведомления)
+        steps.next("dialog_click")
+        self.waiter.pause((0.5, 1.0))
 
-            return True
+        print(f"🖱️  Клик по (660, 200)...")
+        clicked = self.driver.execute_script(DISPATCH_CLICK_JS, 660, 200, ['mousedown', 'mouseup', 'click'])
 
-        except Exception as e:
-            print(f"❌ Ошибка подключения к {self.get_platform_name()}: {e}")
-            import traceback
-            traceback.print_exc()
-            return False
+        if clicked.get('success'):
+            print(f"   ✅ Клик выполнен: {clicked.get('tag')} - '{clicked.get('text')}'")
+        else:
+            print(f"   ℹ️  Элемент не найден (возможно диалог не появился)")
+
+        if self.take_screenshot:
+            self.take_screenshot("09_after_dialog_click.png")
+
+        print(f"📄 Заголовок страницы: {self.driver.title}")
+        print(f"✅ Успешно подключился к {self.get_platform_name()}")
+        steps.end()
+
+        return True
 
     def leave_meeting(self) -> bool:
         """Выйти из Zoom встречи"""
         try:
             print(f"🚪 Выхожу из {self.get_platform_name()} встречи...")
 
-            # Сначала выходим из iframe если мы в нём
+            # Кнопка Leave из кэша; при промахе - переключаемся в iframe и ищем заново
             try:
-                self.driver.switch_to.default_content()
-            except:
-                pass
-
-            # Переключаемся в iframe
-            try:
-                iframe = self.driver.find_element("id", "webclient")
-                self.driver.switch_to.frame(iframe)
+                clicked = self.locators.run(LEAVE_BUTTON, CLICK_ELEMENT_JS)
+            except Exception:
+                clicked = None
+            if not clicked:
+                if not self._switch_to_webclient():
+                    print(f"   ⚠️  Не удалось переключиться в iframe")
+                    return False
                 print(f"   ✅ Переключился в iframe")
-            except Exception as e:
-                print(f"   ⚠️  Не удалось переключиться в iframe: {e}")
-                return False
+                clicked = self.locators.run(LEAVE_BUTTON, CLICK_ELEMENT_JS)
 
-            # Кликаем по координатам кнопки Leave (800x600: x: 735-785, y: 465-505)
-            leave_x = 760  # Середина диапазона 735-785
-            leave_y = 485  # Середина диапазона 465-505
-
-            print(f"   🖱️  Кликаю на Leave кнопку ({leave_x}, {leave_y})...")
-
-            clicked = self.driver.execute_script(f"""
-                var elem = document.elementFromPoint({leave_x}, {leave_y});
-                // Поднимаемся по DOM до тега BUTTON
-                while (elem && elem.tagName !== 'BUTTON') {{
-                    elem = elem.parentElement;
-                }}
-                if (elem) {{
-                    console.log('Leave button:', elem);
-                    elem.click();
-                    return {{success: true, aria: elem.getAttribute('aria-label'), text: elem.textContent}};
-                }}
-                return {{success: false}};
-            """)
-
-            if clicked.get('success'):
+            if clicked and clicked.get('success'):
                 print(f"   ✅ Нажал кнопку Leave: '{clicked.get('text')}' (aria: {clicked.get('aria')})")
-                time.sleep(2)
 
                 # Если появился диалог подтверждения - ищем "Leave Meeting" кнопку
-                confirm_clicked = self.driver.execute_script("""
-                    var buttons = document.querySelectorAll('button');
-                    for (var i = 0; i < buttons.length; i++) {
-                        var btn = buttons[i];
-                        var text = btn.textContent || btn.innerText || '';
-                        if (text.toLowerCase().includes('leave meeting')) {
-                            console.log('Confirming leave:', btn);
-                            btn.click();
-                            return {success: true, text: text};
-                        }
-                    }
-                    return {success: false};
-                """)
+                self.locators.wait_for(self.waiter, LEAVE_CONFIRM_BUTTON, STEP_TIMEOUTS["leave_confirm"],
+                                       "Диалог подтверждения выхода", required=False, floor=(0, 0))
+                confirm_clicked = self.locators.run(LEAVE_CONFIRM_BUTTON, CLICK_ELEMENT_JS)
 
-                if confirm_clicked.get('success'):
+                if confirm_clicked and confirm_clicked.get('success'):
                     print(f"   ✅ Подтвердил выход: {confirm_clicked.get('text')}")
 
                 return True
             else:
-                print(f"   ⚠️  Кнопка Leave не найдена в точке ({leave_x}, {leave_y})")
+                print(f"   ⚠️  Кнопка Leave не найдена")
                 return False
 
         except Exception as e:
             print(f"   ❌ Ошибка при выходе: {e}")
             return False
 
+    def _switch_to_webclient(self) -> bool:
+        """Переключиться в iframe 'webclient' (False если iframe не найден)"""
+        try:
+            self.driver.switch_to.default_content()
+            iframe = self.driver.find_element("id", "webclient")
+            self.driver.switch_to.frame(iframe)
+            self.locators.set_frame("webclient")
+            return True
+        except Exception:
+            self.locators.set_frame(None)
+            return False
+
+    def start_presence_watcher(self) -> bool:
+        """Внедрить наблюдатель присутствия в iframe 'webclient'"""
+        if not self._switch_to_webclient():
+            print("   ⚠️  Не удалось внедрить наблюдатель: iframe не найден")
+            return False
+        try:
+            # Скрипт-таймаут должен перекрывать самое длинное блокирующее ожидание
+            self.driver.set_script_timeout(PRESENCE_WAIT_MAX_SECONDS + 10)
+            state = self.driver.execute_script(PRESENCE_WATCHER_JS)
+            print(f"   👁️  Наблюдатель присутствия запущен (состояние: {state})")
+            return True
+        except Exception as e:
+            print(f"   ⚠️  Не удалось внедрить наблюдатель: {e}")
+            return False
+
+    def wait_for_meeting_end(self, timeout: float) -> Optional[str]:
+        """Блокирующее ожидание события выхода из встречи через наблюдатель в iframe"""
+        timeout = max(0.0, min(timeout, PRESENCE_WAIT_MAX_SECONDS))
+        try:
+            result = self.driver.execute_async_script(PRESENCE_WAIT_JS, int(timeout * 1000))
+        except Exception:
+            # iframe пропал или был перезагружен - проверяем состояние заново
+            if not self._switch_to_webclient():
+                return "left"
+            result = {"state": "no_watcher"}
+
+        if result is None:
+            return None
+
+        state = result.get("state")
+        if state == "no_watcher":
+            # Документ iframe был пересоздан - переустанавливаем наблюдатель
+            # и перепроверяем присутствие обычным способом
+            if not self.check_in_meeting():
+                return "left"
+            self.start_presence_watcher()
+            return None
+
+        if result.get("detail"):
+            print(f"   👁️  Наблюдатель: {state} ({result.get('detail')})")
+        return state
+
     def check_in_meeting(self) -> bool:
         """Проверить находится ли бот в Zoom встрече"""
         try:
-            # Переключаемся в iframe
+            # Закэшированная кнопка Leave - один round trip без переключения фреймов
             try:
-                self.driver.switch_to.default_content()
-                iframe = self.driver.find_element("id", "webclient")
-                self.driver.switch_to.frame(iframe)
-            except:
-                # Если iframe не найден - встреча завершена
-                return False
-
-            # Проверяем наличие кнопки Leave по координатам (800x600)
-            leave_x = 760
-            leave_y = 485
-
-            leave_exists = self.driver.execute_script(f"""
-                var elem = document.elementFromPoint({leave_x}, {leave_y});
-                // Поднимаемся по DOM до тега BUTTON
-                while (elem && elem.tagName !== 'BUTTON') {{
-                    elem = elem.parentElement;
-                }}
-                if (elem) {{
-                    var text = elem.textContent || elem.innerText || '';
-                    var aria = elem.getAttribute('aria-label') || '';
-                    // Проверяем что это действительно кнопка Leave
-                    if (text.toLowerCase().includes('leave') || aria.toLowerCase().includes('leave')) {{
-                        return true;
-                    }}
-                }}
-                return false;
-            """)
-
-            return leave_exists
+                leave_exists = self.locators.run(LEAVE_BUTTON, LEAVE_PRESENT_JS)
+            except Exception:
+                leave_exists = None
+
+            if leave_exists is None:
+                # Кнопка не найдена - возможно драйвер не в том фрейме, пересинхронизируемся
+                if not self._switch_to_webclient():
+                    # Если iframe не найден - встреча завершена
+                    return False
+                leave_exists = self.locators.run(LEAVE_BUTTON, LEAVE_PRESENT_JS)
+
+            return bool(leave_exists)
 
         except Exception as e:
             # Если произошла ошибка - считаем что встреча завершена
@@ -0,0 +1,487 @@
+#!/usr/bin/env python3
+"""
+Daemon - постоянный процесс, который заходит на запланированные встречи по очереди заданий
+
+Задания (URL встречи, имя бота, время старта, максимальная длительность) лежат
+в SQLite (sessions/jobs.sqlite3) и добавляются CLI без перезапуска демона.
+Демон передаёт задание оркестратору за DAEMON_PREWARM_SECONDS до старта: к
+этому моменту поднимаются display, sink и Chrome сессии, а в момент старта
+остаётся только вход во встречу.
+
+Приём задания (admission control) - по запасу памяти и CPU хоста с учётом
+уже принятых, но ещё не запущенных сессий. Не принятое задание ждёт запаса до
+DAEMON_START_GRACE_SECONDS после времени старта, потом отклоняется.
+
+Запуск:
+    python daemon.py run
+    python daemon.py add <meeting_url> --at 2025-10-01T14:30 [--name Bot] [--max-duration 3600]
+                         [--set RECORDING_MODE=audio ...]
+    python daemon.py list [--all] [--json]
+    python daemon.py cancel <job_id>
+"""
+import argparse
+import json
+import os
+import signal
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from config import BotConfig
+from bot import SESSIONS_DIR
+from compactor import Compactor
+from orchestrator import COMPACTOR_ENABLED, STATUS_INTERVAL_SECONDS, Orchestrator
+
+# Очередь заданий
+DAEMON_JOBS_DB = Path(os.getenv("DAEMON_JOBS_DB", str(SESSIONS_DIR / "jobs.sqlite3")))
+# Как часто демон читает очередь (сек)
+DAEMON_POLL_SECONDS = float(os.getenv("DAEMON_POLL_SECONDS", "5"))
+# За сколько секунд до старта готовить слот сессии (display, sink, Chrome)
+DAEMON_PREWARM_SECONDS = float(os.getenv("DAEMON_PREWARM_SECONDS", "120"))
+# Сколько после времени старта задание может ждать запуска (нет запаса ресурсов, демон был остановлен)
+DAEMON_START_GRACE_SECONDS = float(os.getenv("DAEMON_START_GRACE_SECONDS", "300"))
+# Запас сверх max_duration до принудительной остановки: вход, зал ожидания, завершение
+DAEMON_DURATION_GRACE_SECONDS = float(os.getenv("DAEMON_DURATION_GRACE_SECONDS", "300"))
+# Верхний предел длительности любого задания
+MAX_MEETING_DURATION_SECONDS = int(os.getenv("MAX_MEETING_DURATION_SECONDS", "7200"))
+
+# Admission control: сколько памяти должно остаться свободным и сколько берёт одна сессия
+ADMISSION_MIN_FREE_MEMORY_MB = int(os.getenv("ADMISSION_MIN_FREE_MEMORY_MB", "1024"))
+ADMISSION_SESSION_MEMORY_MB = int(os.getenv("ADMISSION_SESSION_MEMORY_MB", "800"))
+# Предел load average на ядро и вклад одной сессии в load average
+ADMISSION_MAX_LOAD_PER_CPU = float(os.getenv("ADMISSION_MAX_LOAD_PER_CPU", "0.85"))
+ADMISSION_SESSION_LOAD = float(os.getenv("ADMISSION_SESSION_LOAD", "0.5"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id               INTEGER PRIMARY KEY AUTOINCREMENT,
+    meeting_url          TEXT NOT NULL,
+    bot_name             TEXT,
+    start_at             REAL NOT NULL,
+    max_duration_seconds INTEGER,
+    overrides            TEXT,
+    state                TEXT NOT NULL DEFAULT 'queued',
+    session_id           TEXT,
+    error                TEXT,
+    created_at           REAL,
+    updated_at           REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, start_at);
+"""
+
+# queued -> submitted (у оркестратора, прогревается) -> running -> finished / failed
+# а также cancelled (CLI), rejected (не хватило ресурсов), expired (старт пропущен)
+FINAL_STATES = ("finished", "failed", "cancelled", "rejected", "expired")
+
+# Поля BotConfig, которые задание переопределять не может (их назначает оркестратор)
+RESERVED_FIELDS = ("display", "pulse_sink")
+
+
+class JobQueue:
+    """Очередь заданий в SQLite (WAL: демон и CLI работают с ней одновременно)"""
+
+    def __init__(self, path: Path = DAEMON_JOBS_DB):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), timeout=10, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+
+    def add(self, meeting_url: str, start_at: float, bot_name: str = None, max_duration_seconds: int = None,
+            overrides: dict = None) -> int:
+        """Добавить задание
+
+        Args:
+            meeting_url: Ссылка на встречу
+            start_at: Unix-время входа во встречу
+            bot_name: Имя бота (по умолчанию BOT_NAME)
+            max_duration_seconds: Предел длительности (по умолчанию и не больше MAX_MEETING_DURATION_SECONDS)
+            overrides: Прочие поля BotConfig
+
+        Returns:
+            int: ID задания
+        """
+        overrides = dict(overrides or {})
+        reserved = [field for field in RESERVED_FIELDS if field in overrides]
+        if reserved:
+            raise ValueError(f"Поля назначаются оркестратором: {', '.join(reserved)}")
+        now = time.time()
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "INSERT INTO jobs (meeting_url, bot_name, start_at, max_duration_seconds, overrides, "
+                "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (meeting_url, bot_name, start_at, max_duration_seconds,
+                 json.dumps(overrides, ensure_ascii=False) if overrides else None, now, now)
+            )
+        return cursor.lastrowid
+
+    def get(self, job_id: int):
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def due(self, until: float) -> list:
+        """Задания в очереди со стартом не позже until"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT * FROM jobs WHERE state = 'queued' AND start_at <= ? ORDER BY start_at", (until,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def list(self, include_final: bool = False, limit: int = 100) -> list:
+        sql = "SELECT * FROM jobs"
+        if not include_final:
+            sql += f" WHERE state NOT IN ({', '.join('?' for _ in FINAL_STATES)})"
+        sql += " ORDER BY start_at DESC LIMIT ?"
+        params = ([] if include_final else list(FINAL_STATES)) + [limit]
+        with self._lock:
+            return [dict(row) for row in self._db.execute(sql, params)]
+
+    def update(self, job_id: int, **fields):
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self._lock, self._db:
+            self._db.execute(f"UPDATE jobs SET {assignments} WHERE job_id = ?", list(fields.values()) + [job_id])
+
+    def cancel(self, job_id: int) -> bool:
+        """Отменить задание (работающую сессию демон остановит при следующем опросе)"""
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                f"UPDATE jobs SET state = 'cancelled', updated_at = ? "
+                f"WHERE job_id = ? AND state NOT IN ({', '.join('?' for _ in FINAL_STATES)})",
+                [time.time(), job_id] + list(FINAL_STATES)
+            )
+        return cursor.rowcount > 0
+
+    def recover(self) -> int:
+        """После перезапуска демона: непринятые оркестратором задания - снова в очередь,
+        работавшие сессии прерваны вместе с прежним процессом"""
+        now = time.time()
+        with self._lock, self._db:
+            requeued = self._db.execute(
+                "UPDATE jobs SET state = 'queued', session_id = NULL, updated_at = ? WHERE state = 'submitted'",
+                (now,)
+            ).rowcount
+            self._db.execute(
+                "UPDATE jobs SET state = 'failed', error = 'daemon restarted', updated_at = ? WHERE state = 'running'",
+                (now,)
+            )
+        return requeued
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def job_config(job: dict) -> BotConfig:
+    """BotConfig задания: окружение + поля задания"""
+    overrides = json.loads(job["overrides"]) if job["overrides"] else {}
+    overrides["meeting_url"] = job["meeting_url"]
+    if job["bot_name"]:
+        overrides["bot_name"] = job["bot_name"]
+    overrides["max_meeting_duration_seconds"] = min(job["max_duration_seconds"] or MAX_MEETING_DURATION_SECONDS,
+                                                    MAX_MEETING_DURATION_SECONDS)
+    return BotConfig.from_env(**overrides)
+
+
+def host_headroom() -> dict:
+    """Свободная память (с учётом лимита cgroup контейнера) и load average на ядро"""
+    available_mb = None
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    available_mb = int(line.split()[1]) / 1024
+                    break
+    except OSError:
+        pass
+
+    # cgroup v2: лимит памяти контейнера меньше памяти хоста
+    try:
+        limit = Path("/sys/fs/cgroup/memory.max").read_text().strip()
+        if limit != "max":
+            current = int(Path("/sys/fs/cgroup/memory.current").read_text())
+            cgroup_available_mb = (int(limit) - current) / (1024 * 1024)
+            available_mb = cgroup_available_mb if available_mb is None else min(available_mb, cgroup_available_mb)
+    except (OSError, ValueError):
+        pass
+
+    cpus = os.cpu_count() or 1
+    return {
+        "memory_available_mb": available_mb,
+        "load_per_cpu": os.getloadavg()[0] / cpus,
+        "cpus": cpus,
+    }
+
+
+def admission(pending: int) -> tuple:
+    """Можно ли принять ещё одну сессию
+
+    Args:
+        pending: Принятые сессии, которые ещё не работают (их ресурсы не видны в метриках)
+
+    Returns:
+        tuple: (принять, причина отказа)
+    """
+    headroom = host_headroom()
+    sessions = pending + 1
+    available_mb = headroom["memory_available_mb"]
+    if available_mb is not None:
+        needed_mb = ADMISSION_MIN_FREE_MEMORY_MB + sessions * ADMISSION_SESSION_MEMORY_MB
+        if available_mb < needed_mb:
+            return False, f"памяти {available_mb:.0f} MB, нужно {needed_mb} MB"
+    load = headroom["load_per_cpu"] + sessions * ADMISSION_SESSION_LOAD / headroom["cpus"]
+    if load > ADMISSION_MAX_LOAD_PER_CPU:
+        return False, f"load на ядро {load:.2f} > {ADMISSION_MAX_LOAD_PER_CPU}"
+    return True, None
+
+
+class JobDaemon:
+    """Передаёт задания из очереди оркестратору и следит за их сессиями"""
+
+    def __init__(self, queue: JobQueue, orchestrator: Orchestrator, poll_seconds: float = DAEMON_POLL_SECONDS):
+        """
+        Args:
+            queue: Очередь заданий
+            orchestrator: Оркестратор с prewarm_seconds (прогрев слота до старта)
+            poll_seconds: Интервал опроса очереди
+        """
+        self.queue = queue
+        self.orchestrator = orchestrator
+        self.poll_seconds = poll_seconds
+        self._jobs = {}  # job_id -> session_id (задания у оркестратора)
+        self._limits = {}  # session_id -> max_meeting_duration_seconds
+        self._denied = {}  # job_id -> причина последнего отказа admission control
+        self._stop = threading.Event()
+
+    def run(self):
+        """Цикл демона (до stop())"""
+        requeued = self.queue.recover()
+        if requeued:
+            print(f"   ♻️  Возвращено в очередь заданий: {requeued}")
+        while not self._stop.is_set():
+            try:
+                self._submit_due()
+                self._sync()
+                self._enforce_durations()
+            except Exception as e:
+                print(f"❌ Демон: {e}")
+            self._stop.wait(self.poll_seconds)
+
+    def stop(self):
+        self._stop.set()
+
+    def _pending_sessions(self) -> int:
+        return sum(1 for s in self.orchestrator.status() if s["state"] in ("queued", "warming", "starting"))
+
+    def _submit_due(self):
+        now = time.time()
+        # Задание уходит оркестратору заранее - он сам прогреет слот и начнёт вход точно в start_at
+        for job in self.queue.due(now + self.orchestrator.prewarm_seconds + self.poll_seconds):
+            job_id = job["job_id"]
+            if now > job["start_at"] + DAEMON_START_GRACE_SECONDS:
+                denied = self._denied.pop(job_id, None)
+                state = "rejected" if denied else "expired"
+                self.queue.update(job_id, state=state, error=denied or "start time passed")
+                print(f"⏭️  Задание {job_id}: {state} ({denied or 'время старта прошло'})")
+                continue
+
+            admitted, reason = admission(self._pending_sessions())
+            if not admitted:
+                if self._denied.get(job_id) != reason:
+                    print(f"⏳ Задание {job_id} ждёт ресурсов: {reason}")
+                self._denied[job_id] = reason
+                continue
+            self._denied.pop(job_id, None)
+
+            try:
+                config = job_config(job)
+            except Exception as e:
+                self.queue.update(job_id, state="failed", error=f"config: {e}")
+                print(f"❌ Задание {job_id}: неверные параметры: {e}")
+                continue
+            session_id = self.orchestrator.submit(config, start_at=max(job["start_at"], now))
+            self._jobs[job_id] = session_id
+            self._limits[session_id] = config.max_meeting_duration_seconds
+            self.queue.update(job_id, state="submitted", session_id=session_id)
+            print(f"📥 Задание {job_id} -> сессия {session_id}, старт "
+                  f"{datetime.fromtimestamp(job['start_at']).strftime('%H:%M:%S')}")
+
+    def _sync(self):
+        """Состояние сессий оркестратора -> состояние заданий; отмены из CLI -> оркестратор"""
+        sessions = {s["session_id"]: s for s in self.orchestrator.status()}
+        for job_id, session_id in list(self._jobs.items()):
+            job = self.queue.get(job_id)
+            session = sessions.get(session_id)
+            if job is None or session is None:
+                self._jobs.pop(job_id)
+                continue
+
+            if job["state"] == "cancelled":
+                if session["state"] not in FINAL_STATES:
+                    print(f"🛑 Задание {job_id} отменено, останавливаю сессию {session_id}")
+                    self.orchestrator.cancel(session_id)
+                self._jobs.pop(job_id)
+                continue
+
+            state = self._job_state(session["state"])
+            if state == "cancelled" and self._stop.is_set():
+                # Остановка демона до старта сессии - задание выполнит следующий запуск
+                self.queue.update(job_id, state="queued", session_id=None)
+                self._jobs.pop(job_id)
+                continue
+            if state != job["state"]:
+                self.queue.update(job_id, state=state, error=session["error"])
+            if state in FINAL_STATES:
+                self._jobs.pop(job_id)
+
+    @staticmethod
+    def _job_state(session_state: str) -> str:
+        if session_state in ("queued", "warming"):
+            return "submitted"
+        if session_state in ("finished", "failed", "cancelled"):
+            return session_state
+        # starting, running и статусы бота (joining, in_meeting, ...)
+        return "running"
+
+    def _enforce_durations(self):
+        """Бот выходит сам по max_duration; здесь - страховка от затянувшегося входа или выхода
+
+        Остановка срабатывает между шагами бота (после запуска браузера, после входа, во встрече);
+        зависший внутри шага вызов коннектора она не прерывает.
+        """
+        now = time.time()
+        for session in self.orchestrator.status():
+            limit = self._limits.get(session["session_id"])
+            if limit is None or not session["started_at"] or session["state"] in FINAL_STATES:
+                continue
+            if now - session["started_at"] > limit + DAEMON_DURATION_GRACE_SECONDS:
+                print(f"⏰ Сессия {session['session_id']} превысила {limit} сек, останавливаю")
+                self.orchestrator.cancel(session["session_id"])
+                self._limits.pop(session["session_id"])
+
+    def finish(self):
+        """После остановки оркестратора: итоговые состояния заданий"""
+        self._sync()
+
+
+def _parse_time(value: str) -> float:
+    return datetime.fromisoformat(value).timestamp()
+
+
+def _format_time(value) -> str:
+    return datetime.fromtimestamp(value).strftime("%Y-%m-%d %H:%M:%S") if value else "-"
+
+
+def _parse_override(value: str) -> tuple:
+    """KEY=VALUE из --set: имя переменной окружения или поля BotConfig, значение - JSON или строка"""
+    key, _, raw = value.partition("=")
+    try:
+        parsed = json.loads(raw)
+    except ValueError:
+        parsed = raw
+    return key.strip().lower(), parsed
+
+
+def run_daemon():
+    queue = JobQueue()
+    orchestrator = Orchestrator(prewarm_seconds=DAEMON_PREWARM_SECONDS)
+    daemon = JobDaemon(queue, orchestrator)
+
+    def handle_signal(sig, frame):
+        print(f"\n\n⚠️  Получен сигнал {sig}, останавливаю демон...")
+        daemon.stop()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    print(f"🤖 Daemon запущен: очередь {queue.path}, прогрев за {DAEMON_PREWARM_SECONDS:.0f} сек, "
+          f"лимит {orchestrator.max_concurrent} сессий")
+    orchestrator.start()
+
+    def report():
+        while True:
+            time.sleep(STATUS_INTERVAL_SECONDS)
+            orchestrator.print_status()
+
+    threading.Thread(target=report, daemon=True).start()
+
+    compactor = None
+    if COMPACTOR_ENABLED:
+        compactor = Compactor(SESSIONS_DIR)
+        compactor.start()
+
+    daemon.run()
+
+    orchestrator.shutdown()
+    orchestrator.wait()
+    daemon.finish()
+    if compactor:
+        compactor.close()
+    orchestrator.close()
+    queue.close()
+    print("✅ Daemon остановлен")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Демон запланированных встреч MeetingBot")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("run", help="Запустить демон")
+
+    add_parser = commands.add_parser("add", help="Добавить задание")
+    add_parser.add_argument("meeting_url")
+    add_parser.add_argument("--at", type=_parse_time, help="ISO дата/время входа (по умолчанию - сейчас)")
+    add_parser.add_argument("--name", help="Имя бота")
+    add_parser.add_argument("--max-duration", type=int, help="Максимальная длительность (сек)")
+    add_parser.add_argument("--set", action="append", default=[], type=_parse_override, metavar="KEY=VALUE",
+                            help="Поле BotConfig (например --set recording_mode=audio)")
+
+    list_parser = commands.add_parser("list", help="Задания")
+    list_parser.add_argument("--all", action="store_true", help="Включая завершённые")
+    list_parser.add_argument("--json", action="store_true", help="Вывод в JSON")
+
+    cancel_parser = commands.add_parser("cancel", help="Отменить задание")
+    cancel_parser.add_argument("job_id", type=int)
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run_daemon()
+        return
+
+    queue = JobQueue()
+    if args.command == "add":
+        try:
+            # Неизвестные поля - ошибка сразу, а не в момент старта
+            BotConfig.from_env(**dict(args.set))
+            job_id = queue.add(args.meeting_url, args.at or time.time(), bot_name=args.name,
+                               max_duration_seconds=args.max_duration, overrides=dict(args.set))
+        except (TypeError, ValueError) as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        print(f"✅ Задание {job_id}: {args.meeting_url} в {_format_time(args.at or time.time())}")
+    elif args.command == "cancel":
+        if not queue.cancel(args.job_id):
+            print(f"Задание {args.job_id} не найдено или уже завершено")
+            sys.exit(1)
+        print(f"✅ Задание {args.job_id} отменено")
+    else:
+        jobs = queue.list(include_final=args.all)
+        if args.json:
+            print(json.dumps(jobs, ensure_ascii=False, indent=2))
+        else:
+            header = f"{'id':>5} {'старт':<19} {'состояние':<10} {'сессия':<24} url"
+            print(header)
+            print("-" * len(header))
+            for job in jobs:
+                print(f"{job['job_id']:>5} {_format_time(job['start_at']):<19} {job['state']:<10} "
+                      f"{job['session_id'] or '-':<24} {job['meeting_url']}")
+    queue.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,29 @@
 #!/bin/bash
 
-# Запускаем Xvfb (виртуальный X сервер) для headless режима
-echo "🖥️  Запуск Xvfb..."
-Xvfb :99 -screen 0 1200x800x24 &
-XVFB_PID=$!
+# Xvfb нужен только Chrome с GUI (запись экрана через x11grab или HEADLESS=false);
+# в режимах RECORDING_MODE=audio и RECORDING_VIDEO_SOURCE=screencast Chrome остаётся headless
+if [ "${HEADLESS:-true}" = "true" ] && { [ "${ENABLE_RECORDING:-false}" != "true" ] || [ "${RECORDING_MODE:-video}" = "audio" ] || [ "${RECORDING_VIDEO_SOURCE:-x11}" = "screencast" ]; }; then
+    echo "🖥️  Xvfb не нужен (headless Chrome)"
+else
+    # Запускаем Xvfb (виртуальный X сервер) для headless режима
+    echo "🖥️  Запуск Xvfb..."
+    Xvfb :99 -screen 0 1200x800x24 &
+    XVFB_PID=$!
 
-# Ждём пока Xvfb запустится
-sleep 3
+    # Ждём пока Xvfb запустится
+    sleep 3
 
-# Устанавливаем DISPLAY
-export DISPLAY=:99
+    # Устанавливаем DISPLAY
+    export DISPLAY=:99
 
-echo "✅ Xvfb запущен (PID: $XVFB_PID)"
+    echo "✅ Xvfb запущен (PID: $XVFB_PID)"
 
-# Проверяем что Xvfb работает
-if xdpyinfo -display :99 >/dev/null 2>&1; then
-    echo "✅ Display :99 доступен"
-else
-    echo "❌ Display :99 недоступен!"
+    # Проверяем что Xvfb работает
+    if xdpyinfo -display :99 >/dev/null 2>&1; then
+        echo "✅ Display :99 доступен"
+    else
+        echo "❌ Display :99 недоступен!"
+    fi
 fi
 
 # Запускаем PulseAudio (виртуальный аудио сервер)
@@ -44,4 +50,4 @@ python bot.py
 
 # При завершении убиваем процессы
 pulseaudio --kill 2>/dev/null
-kill $XVFB_PID 2>/dev/null
+[ -n "$XVFB_PID" ] && kill $XVFB_PID 2>/dev/null
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Idle Compactor - сжатая версия записи без долгих простоев (тишина + неподвижная картинка)
+
+Запись разбивается на куски по IDLE_CHUNK_SECONDS, каждый кусок декодируется
+отдельным ffmpeg в процессе пула: звук - в моно 8 кГц, видео - в серые кадры
+64x36 с частотой 1/IDLE_WINDOW_SECONDS. По окнам IDLE_WINDOW_SECONDS NumPy
+считает RMS звука (dBFS) и среднее изменение кадра относительно предыдущего.
+Окно простое, если тихо и картинка не меняется; серии простых окон длиннее
+IDLE_MIN_SECONDS вырезаются (по краям остаётся IDLE_KEEP_SECONDS контекста).
+
+Декодированные данные читаются из pipe блоками и сразу сворачиваются в числа
+по окнам, поэтому память не зависит от длины записи. Сегменты сегментной
+записи образуют одну шкалу времени; куски не пересекают границы файлов.
+
+Результат:
+    recording.condensed.mp4 (.ogg/.m4a) - сжатая запись
+    condensed.json - соответствие времени сжатой записи исходному (см. to_original)
+
+Запуск как скрипт:
+    python idle_compactor.py <session_dir> [--workers N]
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+from recorder import AUDIO_CODECS
+from session_index import MANIFEST_FILENAME
+
+# Длина окна анализа (сек) и куска для одного процесса пула (сек)
+IDLE_WINDOW_SECONDS = float(os.getenv("IDLE_WINDOW_SECONDS", "0.5"))
+IDLE_CHUNK_SECONDS = float(os.getenv("IDLE_CHUNK_SECONDS", "300"))
+# Процессов анализа
+IDLE_WORKERS = int(os.getenv("IDLE_WORKERS", "2"))
+# Порог тишины (dBFS) и изменения кадра (средняя разница яркости, 0-1)
+IDLE_SILENCE_DB = float(os.getenv("IDLE_SILENCE_DB", "-50"))
+IDLE_FRAME_DELTA = float(os.getenv("IDLE_FRAME_DELTA", "0.01"))
+# Минимальный вырезаемый простой и сколько оставить по его краям (сек)
+IDLE_MIN_SECONDS = float(os.getenv("IDLE_MIN_SECONDS", "20"))
+IDLE_KEEP_SECONDS = float(os.getenv("IDLE_KEEP_SECONDS", "1.5"))
+# Кодирование сжатой записи
+IDLE_PRESET = os.getenv("IDLE_PRESET", "veryfast")
+IDLE_CRF = int(os.getenv("IDLE_CRF", "26"))
+
+# Частота дискретизации звука и размер кадра для анализа
+ANALYSIS_SAMPLE_RATE = 8000
+ANALYSIS_WIDTH, ANALYSIS_HEIGHT = 64, 36
+# Сколько окон читать из pipe за раз
+READ_WINDOWS = 64
+
+CONDENSED_INDEX_FILENAME = "condensed.json"
+
+
+def probe(path: Path) -> dict:
+    """Длительность и наличие звука/видео"""
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration:stream=codec_type", "-of", "json", str(path)],
+        capture_output=True, text=True, check=True
+    )
+    info = json.loads(result.stdout)
+    types = {stream.get("codec_type") for stream in info.get("streams", [])}
+    return {
+        "duration": float(info.get("format", {}).get("duration") or 0),
+        "has_audio": "audio" in types,
+        "has_video": "video" in types,
+    }
+
+
+def _decode(path: Path, start: float, duration: float, stream_args: list) -> subprocess.Popen:
+    return subprocess.Popen(
+        ["ffmpeg", "-nostdin", "-loglevel", "error", "-threads", "1",
+         "-ss", f"{start:.3f}", "-t", f"{duration:.3f}", "-i", str(path)] + stream_args + ["pipe:1"],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+
+
+def _read_blocks(stream, block_bytes: int):
+    """Блоки фиксированного размера из pipe (последний может быть короче)"""
+    while True:
+        data = stream.read(block_bytes)
+        if not data:
+            return
+        yield data
+
+
+def audio_levels(path: Path, start: float, duration: float) -> np.ndarray:
+    """RMS звука по окнам, dBFS"""
+    samples = int(ANALYSIS_SAMPLE_RATE * IDLE_WINDOW_SECONDS)
+    process = _decode(path, start, duration,
+                      ["-map", "0:a:0", "-ac", "1", "-ar", str(ANALYSIS_SAMPLE_RATE), "-f", "s16le"])
+    levels = []
+    for block in _read_blocks(process.stdout, samples * 2 * READ_WINDOWS):
+        pcm = np.frombuffer(block, dtype="<i2").astype(np.float32) / 32768
+        windows = len(pcm) // samples
+        if not windows:
+            continue
+        rms = np.sqrt(np.mean(pcm[:windows * samples].reshape(windows, samples) ** 2, axis=1))
+        levels.append(20 * np.log10(np.maximum(rms, 1e-6)))
+    process.wait()
+    return np.concatenate(levels) if levels else np.empty(0, dtype=np.float32)
+
+
+def frame_deltas(path: Path, start: float, duration: float) -> np.ndarray:
+    """Среднее изменение уменьшенного серого кадра относительно предыдущего (0-1), по окнам"""
+    frame_bytes = ANALYSIS_WIDTH * ANALYSIS_HEIGHT
+    process = _decode(path, start, duration, [
+        "-map", "0:v:0",
+        "-vf", f"fps={1 / IDLE_WINDOW_SECONDS},scale={ANALYSIS_WIDTH}:{ANALYSIS_HEIGHT},format=gray",
+        "-f", "rawvideo",
+    ])
+    deltas = []
+    previous = None
+    for block in _read_blocks(process.stdout, frame_bytes * READ_WINDOWS):
+        frames = len(block) // frame_bytes
+        if not frames:
+            continue
+        pixels = np.frombuffer(block[:frames * frame_bytes], dtype=np.uint8).reshape(frames, frame_bytes)
+        pixels = pixels.astype(np.int16)
+        if previous is not None:
+            pixels = np.vstack([previous, pixels])
+        deltas.append(np.mean(np.abs(np.diff(pixels, axis=0)), axis=1) / 255)
+        previous = pixels[-1:]
+    process.wait()
+    return np.concatenate(deltas) if deltas else np.empty(0, dtype=np.float32)
+
+
+def _fit(values: np.ndarray, windows: int, missing: float) -> np.ndarray:
+    """Привести ряд к числу окон куска (декодер может выдать на окно больше/меньше)"""
+    if len(values) >= windows:
+        return values[:windows]
+    fill = values[-1] if len(values) else missing
+    return np.concatenate([values, np.full(windows - len(values), fill, dtype=np.float32)])
+
+
+def analyze_chunk(path: str, start: float, duration: float, has_audio: bool, has_video: bool) -> np.ndarray:
+    """Маска простых окон куска (выполняется в процессе пула)
+
+    Кусок декодируется с одним окном перед start: первому кадру куска есть с чем сравниться.
+    """
+    path = Path(path)
+    windows = math.ceil(duration / IDLE_WINDOW_SECONDS)
+    lead = min(start, IDLE_WINDOW_SECONDS)
+    lead_windows = round(lead / IDLE_WINDOW_SECONDS)
+
+    idle = np.ones(windows, dtype=bool)
+    if has_audio:
+        levels = audio_levels(path, start - lead, duration + lead)[lead_windows:]
+        idle &= _fit(levels, windows, IDLE_SILENCE_DB) < IDLE_SILENCE_DB
+    if has_video:
+        # Дельта i-го кадра - изменение относительно кадра i-1: без опережения первое окно теряется
+        deltas = frame_deltas(path, start - lead, duration + lead)
+        deltas = deltas[max(lead_windows - 1, 0):]
+        if not lead_windows:
+            deltas = np.concatenate([[0.0], deltas])
+        idle &= _fit(deltas, windows, 0.0) < IDLE_FRAME_DELTA
+    return idle
+
+
+def idle_spans(idle: np.ndarray, window: float = IDLE_WINDOW_SECONDS, min_seconds: float = IDLE_MIN_SECONDS) -> list:
+    """Серии простых окон не короче min_seconds: [(начало, конец), ...] в секундах"""
+    edges = np.diff(np.concatenate([[0], idle.astype(np.int8), [0]]))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    long_runs = (ends - starts) * window >= min_seconds
+    return [(float(s * window), float(e * window)) for s, e in zip(starts[long_runs], ends[long_runs])]
+
+
+def kept_spans(duration: float, cuts: list, keep: float = IDLE_KEEP_SECONDS) -> list:
+    """Что остаётся от [0, duration] после вырезания простоев (с контекстом keep по краям)"""
+    kept = []
+    position = 0.0
+    for start, end in cuts:
+        cut_start, cut_end = start + keep, min(end, duration) - keep
+        if cut_end <= cut_start:
+            continue
+        if cut_start > position:
+            kept.append((position, cut_start))
+        position = cut_end
+    if position < duration:
+        kept.append((position, duration))
+    return kept
+
+
+def to_original(index: dict, condensed_time: float) -> float:
+    """Время в исходной записи по времени в сжатой (index - содержимое condensed.json)"""
+    for span in index["spans"]:
+        if condensed_time < span["condensed_start"] + span["duration"]:
+            return span["original_start"] + max(0.0, condensed_time - span["condensed_start"])
+    last = index["spans"][-1] if index["spans"] else {"original_start": 0.0, "duration": 0.0}
+    return last["original_start"] + last["duration"]
+
+
+def _codec_args(suffix: str, has_video: bool) -> list:
+    if has_video:
+        return ["-codec:v", "libx264", "-preset", IDLE_PRESET, "-crf", str(IDLE_CRF), "-pix_fmt", "yuv420p",
+                "-codec:a", "aac", "-b:a", "128k", "-movflags", "+faststart"]
+    codec = next((c for c in AUDIO_CODECS.values() if c["suffix"] == suffix), AUDIO_CODECS["opus"])
+    return ["-vn"] + codec["args"]
+
+
+def condense(files: list, output_path: Path, workers: int = IDLE_WORKERS) -> dict:
+    """Найти простои в записи (файлы - подряд на одной шкале) и собрать сжатую версию
+
+    Args:
+        files: Файлы записи по порядку (один файл или сегменты)
+        output_path: Сжатая запись; рядом пишется condensed.json
+        workers: Процессов анализа (1 - в текущем процессе)
+
+    Returns:
+        dict: Содержимое condensed.json (cuts пустой - простоев нет, файл не создаётся)
+    """
+    started = time.time()
+    sources = []
+    offset = 0.0
+    for path in files:
+        info = probe(path)
+        sources.append(dict(info, path=Path(path), offset=offset))
+        offset += info["duration"]
+    total = offset
+
+    # Куски не пересекают границы файлов; окна куска ложатся на общую шкалу по offset
+    chunks = []
+    chunk_offsets = []
+    for source in sources:
+        position = 0.0
+        while position < source["duration"]:
+            length = min(IDLE_CHUNK_SECONDS, source["duration"] - position)
+            chunks.append((str(source["path"]), position, length, source["has_audio"], source["has_video"]))
+            chunk_offsets.append(source["offset"] + position)
+            position += length
+
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            masks = list(pool.map(analyze_chunk, *zip(*chunks)))
+    else:
+        masks = [analyze_chunk(*chunk) for chunk in chunks]
+
+    # Неполное последнее окно куска округляется вверх - маски ставятся по началу куска
+    idle = np.zeros(math.ceil(total / IDLE_WINDOW_SECONDS) + len(chunks), dtype=bool)
+    for chunk_offset, mask in zip(chunk_offsets, masks):
+        first = int(round(chunk_offset / IDLE_WINDOW_SECONDS))
+        idle[first:first + len(mask)] = mask[:len(idle) - first]
+
+    kept = kept_spans(total, idle_spans(idle))
+    spans = []
+    cuts = []
+    condensed_position = 0.0
+    previous_end = 0.0
+    for start, end in kept:
+        if start > previous_end:
+            cuts.append({"start": round(previous_end, 3), "end": round(start, 3)})
+        spans.append({"original_start": round(start, 3), "condensed_start": round(condensed_position, 3),
+                      "duration": round(end - start, 3)})
+        condensed_position += end - start
+        previous_end = end
+
+    index = {
+        "source": [str(source["path"].name) for source in sources],
+        "output": output_path.name,
+        "original_seconds": round(total, 3),
+        "condensed_seconds": round(condensed_position, 3),
+        "window_seconds": IDLE_WINDOW_SECONDS,
+        "cuts": cuts,
+        "spans": spans,
+        "analysis_seconds": round(time.time() - started, 1),
+    }
+    if not cuts:
+        return index
+
+    _render(sources, kept, output_path)
+    index["render_seconds"] = round(time.time() - started - index["analysis_seconds"], 1)
+    index_path = output_path.parent / CONDENSED_INDEX_FILENAME
+    temp_path = index_path.with_suffix(".json.tmp")
+    temp_path.write_text(json.dumps(index, ensure_ascii=False, indent=2))
+    temp_path.replace(index_path)
+    return index
+
+
+def _render(sources: list, kept: list, output_path: Path):
+    """Сжатая запись: concat demuxer с inpoint/outpoint по оставленным интервалам каждого файла"""
+    lines = ["ffconcat version 1.0"]
+    for start, end in kept:
+        for source in sources:
+            local_start = max(start, source["offset"]) - source["offset"]
+            local_end = min(end, source["offset"] + source["duration"]) - source["offset"]
+            if local_end - local_start < 0.01:
+                continue
+            lines += [f"file '{source['path'].resolve()}'", f"inpoint {local_start:.3f}", f"outpoint {local_end:.3f}"]
+
+    playlist_path = output_path.with_suffix(".ffconcat")
+    temp_path = output_path.with_name(f"{output_path.stem}.tmp{output_path.suffix}")
+    playlist_path.write_text("\n".join(lines) + "\n")
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-nostdin", "-loglevel", "error", "-y", "-f", "concat", "-safe", "0", "-i", str(playlist_path),
+             "-map", "0:v?", "-map", "0:a?"] + _codec_args(output_path.suffix, sources[0]["has_video"]) +
+            [str(temp_path)],
+            capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            temp_path.unlink(missing_ok=True)
+            raise RuntimeError(f"ffmpeg: {result.stderr.strip()[-300:]}")
+        temp_path.replace(output_path)
+    finally:
+        playlist_path.unlink(missing_ok=True)
+
+
+def condensed_path(recording_path: Path) -> Path:
+    """recording.mp4 -> recording.condensed.mp4 (для сегментов - по имени без номера)"""
+    stem = recording_path.stem.rsplit("_", 1)[0] if recording_path.parent.name == "segments" else recording_path.stem
+    session_dir = recording_path.parent.parent if recording_path.parent.name == "segments" else recording_path.parent
+    return session_dir / f"{stem}.condensed{recording_path.suffix}"
+
+
+def condense_session(session_dir: Path, workers: int = IDLE_WORKERS) -> dict:
+    """Сжатая версия записи сессии по файлам из manifest.json (None - записи нет)"""
+    session_dir = Path(session_dir)
+    manifest_path = session_dir / MANIFEST_FILENAME
+    manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+    files = [session_dir / entry["path"] for entry in (manifest.get("recording") or {}).get("files", [])]
+    files = [path for path in files if path.exists() and ".condensed" not in path.name]
+    if not files:
+        return None
+    return condense(files, condensed_path(files[0]), workers)
+
+
+def summary(index: dict) -> dict:
+    """Краткий итог для manifest.json"""
+    return {
+        "file": index["output"] if index["cuts"] else None,
+        "index": CONDENSED_INDEX_FILENAME if index["cuts"] else None,
+        "original_seconds": index["original_seconds"],
+        "condensed_seconds": index["condensed_seconds"],
+        "cuts": len(index["cuts"]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сжатая запись сессии без простоев")
+    parser.add_argument("session_dir", type=Path)
+    parser.add_argument("--workers", type=int, default=IDLE_WORKERS)
+    args = parser.parse_args()
+
+    index = condense_session(args.session_dir, args.workers)
+    if index is None:
+        print(f"❌ В {args.session_dir} нет записи")
+        return
+    if not index["cuts"]:
+        print(f"✅ Простоев длиннее {IDLE_MIN_SECONDS:g} сек нет (анализ {index['analysis_seconds']} сек)")
+        return
+
+    manifest_path = args.session_dir / MANIFEST_FILENAME
+    manifest = json.loads(manifest_path.read_text())
+    manifest["recording"]["condensed"] = summary(index)
+    temp_path = manifest_path.with_suffix(".json.tmp")
+    temp_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2))
+    temp_path.replace(manifest_path)
+    print(f"✅ {index['output']}: {index['original_seconds'] / 60:.1f} -> {index['condensed_seconds'] / 60:.1f} мин, "
+          f"вырезано простоев: {len(index['cuts'])} (анализ {index['analysis_seconds']} сек, "
+          f"сборка {index['render_seconds']} сек)")
+
+
+if __name__ == "__main__":
+    main()
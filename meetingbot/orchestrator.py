@@ -0,0 +1,535 @@
+#!/usr/bin/env python3
+"""
+Orchestrator - несколько сессий MeetingBot в одном процессе
+
+Каждая сессия получает собственный Xvfb display и PulseAudio sink,
+общий планировщик запускает сессии по времени старта с учётом
+глобального лимита одновременных сессий. С SESSION_PREWARM_SECONDS слот
+сессии (display, sink, Chrome) готовится заранее, к старту остаётся только вход.
+"""
+import heapq
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from browser import BrowserPool, browser_key
+from config import BotConfig
+from bot import SESSIONS_DIR, MeetingBot
+from compactor import Compactor
+from session_index import SessionIndex
+
+# Глобальный лимит одновременных сессий на хост
+MAX_CONCURRENT_SESSIONS = int(os.getenv("MAX_CONCURRENT_SESSIONS", "10"))
+# Первый номер X display для сессий (:99 занят entrypoint.sh)
+FIRST_DISPLAY_NUMBER = int(os.getenv("FIRST_DISPLAY_NUMBER", "100"))
+# Сколько сессионных слотов (display + sink + Chrome) держать прогретыми
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "0"))
+# После скольких встреч браузер из пула пересоздаётся
+BROWSER_MAX_USES = int(os.getenv("BROWSER_MAX_USES", "5"))
+# За сколько секунд до старта прогревать слот запланированной сессии (0 - не прогревать)
+SESSION_PREWARM_SECONDS = float(os.getenv("SESSION_PREWARM_SECONDS", "0"))
+# Как часто печатать сводку статусов (сек)
+STATUS_INTERVAL_SECONDS = int(os.getenv("STATUS_INTERVAL_SECONDS", "60"))
+# Фоновое сжатие и очистка завершённых сессий (см. compactor.py)
+COMPACTOR_ENABLED = os.getenv("COMPACTOR_ENABLED", "false").lower() == "true"
+
+
+class SessionResources:
+    """Изолированные ресурсы одной сессии: Xvfb display и PulseAudio sink"""
+
+    def __init__(self, display_number: int, resolution: str, with_display: bool = True):
+        """
+        Args:
+            display_number: Номер X display (он же суффикс имени sink'а)
+            resolution: Разрешение Xvfb
+            with_display: Запускать Xvfb (headless Chrome без записи экрана обходится без него)
+        """
+        self.display_number = display_number
+        self.with_display = with_display
+        self.display = f":{display_number}"
+        self.sink_name = f"meetingbot_{display_number}"
+        self.resolution = resolution
+        self.xvfb_process = None
+        self.sink_module = None
+
+    @property
+    def _xvfb_running(self) -> bool:
+        return self.xvfb_process is not None and self.xvfb_process.poll() is None
+
+    @property
+    def acquired(self) -> bool:
+        return self.sink_module is not None and (not self.with_display or self._xvfb_running)
+
+    def acquire(self):
+        """Запуск Xvfb (если нужен) и создание виртуального sink - только того, чего ещё нет"""
+        if self.with_display and not self._xvfb_running:
+            self._start_xvfb()
+        if self.sink_module is not None:
+            return
+
+        result = subprocess.run(
+            ["pactl", "load-module", "module-null-sink", f"sink_name={self.sink_name}"],
+            capture_output=True,
+            text=True,
+            timeout=10
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"Не удалось создать sink {self.sink_name}: {result.stderr.strip()}")
+        self.sink_module = result.stdout.strip()
+
+    def _start_xvfb(self):
+        self.xvfb_process = subprocess.Popen(
+            ["Xvfb", self.display, "-screen", "0", f"{self.resolution}x24", "-nolisten", "tcp"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+
+        # Ждём готовности display вместо фиксированной паузы
+        deadline = time.time() + 10
+        while True:
+            if self.xvfb_process.poll() is not None:
+                raise RuntimeError(f"Xvfb {self.display} завершился при запуске")
+            probe = subprocess.run(["xdpyinfo", "-display", self.display], capture_output=True)
+            if probe.returncode == 0:
+                break
+            if time.time() > deadline:
+                raise RuntimeError(f"Display {self.display} недоступен")
+            time.sleep(0.1)
+
+    def release(self):
+        """Освобождение ресурсов (безопасно вызывать повторно)"""
+        if self.sink_module:
+            subprocess.run(["pactl", "unload-module", self.sink_module], capture_output=True)
+            self.sink_module = None
+        if self.xvfb_process and self.xvfb_process.poll() is None:
+            self.xvfb_process.terminate()
+            try:
+                self.xvfb_process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.xvfb_process.kill()
+        self.xvfb_process = None
+
+
+class Session:
+    """Одна запланированная/запущенная сессия оркестратора"""
+
+    def __init__(self, session_id: str, config: BotConfig, start_at: float):
+        self.session_id = session_id
+        self.config = config
+        self.start_at = start_at
+        self.state = "queued"
+        self.stop_requested = False
+        self.error = None
+        self.started_at = None
+        self.ended_at = None
+        self.resources = None
+        self.bot = None
+        self.thread = None
+        self.prewarm_thread = None
+
+    def to_dict(self) -> dict:
+        return {
+            "session_id": self.session_id,
+            "state": self.bot.status if self.state == "running" and self.bot else self.state,
+            "meeting_url": self.config.meeting_url,
+            "bot_name": self.config.bot_name,
+            "display": self.resources.display if self.resources else None,
+            "sink": self.resources.sink_name if self.resources else None,
+            "start_at": self.start_at,
+            "started_at": self.started_at,
+            "ended_at": self.ended_at,
+            "error": self.error,
+        }
+
+
+class Orchestrator:
+    """Планировщик и исполнитель нескольких сессий MeetingBot"""
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_SESSIONS, first_display: int = FIRST_DISPLAY_NUMBER,
+                 browser_pool_size: int = BROWSER_POOL_SIZE, prewarm_seconds: float = SESSION_PREWARM_SECONDS):
+        """
+        Args:
+            max_concurrent: Максимум одновременно работающих (и прогреваемых) сессий
+            first_display: Первый номер X display для сессий
+            browser_pool_size: Сколько слотов с готовым Chrome держать прогретыми
+            prewarm_seconds: За сколько секунд до старта готовить слот конкретной сессии
+        """
+        self.max_concurrent = max_concurrent
+        self.first_display = first_display
+        self.browser_pool_size = browser_pool_size
+        self.prewarm_seconds = prewarm_seconds
+        self.browser_pool = BrowserPool(size=1, max_uses=BROWSER_MAX_USES) \
+            if browser_pool_size or prewarm_seconds else None
+        self.warm_config = BotConfig.from_env()
+        self.session_index = SessionIndex(SESSIONS_DIR)
+        self._warm = []  # SessionResources с уже запущенным Xvfb/sink и браузером в пуле
+        self._dropping = []  # освобождение слотов отменённых прогретых сессий
+        self.sessions = {}
+        self._queue = []  # heap: (start_at, seq, session_id)
+        self._seq = 0
+        self._free_displays = []
+        self._next_display = first_display
+        # RLock: shutdown() вызывается из обработчика сигнала в главном потоке
+        self._lock = threading.RLock()
+        self._wakeup = threading.Condition(self._lock)
+        self._stopping = False
+        self._scheduler = None
+
+    # --- Планирование ---
+
+    def submit(self, config: BotConfig, start_at: float = None) -> str:
+        """Поставить сессию в очередь
+
+        Args:
+            config: Настройки сессии
+            start_at: Unix-время старта (None = как можно скорее)
+
+        Returns:
+            str: ID сессии
+        """
+        with self._lock:
+            self._seq += 1
+            session_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{self._seq:03d}"
+            session = Session(session_id, config, start_at or time.time())
+            self.sessions[session_id] = session
+            heapq.heappush(self._queue, (session.start_at, self._seq, session_id))
+            self._wakeup.notify()
+        print(f"🗓️  Сессия {session_id} в очереди: {config.meeting_url}")
+        return session_id
+
+    def cancel(self, session_id: str):
+        """Отменить сессию из очереди или остановить работающую"""
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                return
+            if session.state in ("queued", "warming"):
+                self._cancel_pending_locked(session)
+                return
+            session.stop_requested = True
+            bot = session.bot
+        if bot:
+            bot.stop()
+
+    def status(self) -> list:
+        """Статус всех сессий"""
+        with self._lock:
+            return [session.to_dict() for session in self.sessions.values()]
+
+    def active_count(self) -> int:
+        with self._lock:
+            return self._active_count_locked()
+
+    def _active_count_locked(self) -> int:
+        # Прогреваемая сессия уже занимает display, sink и Chrome
+        return sum(1 for s in self.sessions.values() if s.state in ("warming", "starting", "running"))
+
+    def _cancel_pending_locked(self, session: Session):
+        """Отмена сессии до старта; прогретый слот освобождается в фоне"""
+        warming = session.state == "warming"
+        session.state = "cancelled"
+        session.ended_at = time.time()
+        if warming:
+            thread = threading.Thread(target=self._drop_prewarmed, args=(session,), daemon=True)
+            self._dropping.append(thread)
+            thread.start()
+        self._wakeup.notify_all()
+
+    def _allocate_display(self) -> int:
+        if self._free_displays:
+            return heapq.heappop(self._free_displays)
+        number = self._next_display
+        self._next_display += 1
+        return number
+
+    # --- Выполнение ---
+
+    # --- Прогретые слоты ---
+
+    def _slot_config(self, config: BotConfig, resources: SessionResources) -> BotConfig:
+        return config.copy(display=resources.display, pulse_sink=resources.sink_name)
+
+    def _prewarm_slot(self):
+        with self._lock:
+            resources = SessionResources(self._allocate_display(), self.warm_config.resolution,
+                                         with_display=self.warm_config.needs_display)
+        try:
+            resources.acquire()
+            self.browser_pool.warm(self._slot_config(self.warm_config, resources))
+        except Exception as e:
+            print(f"   ⚠️  Не удалось прогреть слот {resources.display}: {e}")
+            resources.release()
+            with self._lock:
+                heapq.heappush(self._free_displays, resources.display_number)
+            return
+        with self._lock:
+            self._warm.append(resources)
+            self._wakeup.notify_all()
+
+    def _prewarm_session(self, session: Session):
+        """Слот под конкретную сессию до её старта: Xvfb/sink и Chrome в пуле"""
+        started = time.time()
+        try:
+            session.resources.acquire()
+            self.browser_pool.warm(self._slot_config(session.config, session.resources))
+        except Exception as e:
+            # К старту сессия попробует поднять ресурсы сама
+            print(f"   ⚠️  Не удалось прогреть слот сессии {session.session_id}: {e}")
+            session.resources.release()
+            return
+        print(f"🔥 Сессия {session.session_id}: слот {session.resources.display} прогревается "
+              f"(старт через {max(0.0, session.start_at - time.time()):.0f} сек, "
+              f"ресурсы за {time.time() - started:.1f} сек)")
+
+    def _drop_prewarmed(self, session: Session):
+        if session.prewarm_thread:
+            session.prewarm_thread.join()
+        self._retire_slot(session, self._slot_config(session.config, session.resources))
+
+    def _start_prewarms_locked(self, now: float) -> float:
+        """Начать прогрев сессий, до старта которых осталось prewarm_seconds
+
+        Returns:
+            float: Когда наступит следующий прогрев (inf - некого прогревать)
+        """
+        if not self.prewarm_seconds or not self.browser_pool:
+            return float("inf")
+        for start_at, _, session_id in sorted(self._queue):
+            session = self.sessions[session_id]
+            if session.state != "queued":
+                continue
+            if start_at - self.prewarm_seconds > now:
+                return start_at - self.prewarm_seconds
+            if self._active_count_locked() >= self.max_concurrent:
+                break
+            session.state = "warming"
+            session.resources = self._take_warm(session.config) or \
+                SessionResources(self._allocate_display(), session.config.resolution,
+                                 with_display=session.config.needs_display)
+            session.prewarm_thread = threading.Thread(
+                target=self._prewarm_session, args=(session,), name=f"prewarm-{session_id}", daemon=True
+            )
+            session.prewarm_thread.start()
+        return float("inf")
+
+    def _fits_warm(self, config: BotConfig, resources: SessionResources) -> bool:
+        """Браузер прогретого слота подходит сессии: совпадает весь ключ пула, а не только экран"""
+        return (resources.resolution == config.resolution and resources.with_display == config.needs_display
+                and browser_key(self._slot_config(config, resources))
+                == browser_key(self._slot_config(self.warm_config, resources)))
+
+    def _take_warm(self, config: BotConfig):
+        for i, resources in enumerate(self._warm):
+            if self._fits_warm(config, resources):
+                return self._warm.pop(i)
+        return None
+
+    def _retire_slot(self, session: Session, config: BotConfig):
+        """После сессии: вернуть слот в прогретые или освободить ресурсы"""
+        resources = session.resources
+        with self._lock:
+            keep_warm = (self.browser_pool is not None and not self._stopping and resources.acquired
+                         and self._fits_warm(config, resources)
+                         and len(self._warm) < self.browser_pool_size)
+            if keep_warm:
+                self._warm.append(resources)
+                return
+
+        if self.browser_pool:
+            self.browser_pool.discard(config)
+            # Слот мог быть прогрет под warm_config: его браузер тоже не должен пережить дисплей
+            self.browser_pool.discard(self._slot_config(self.warm_config, resources))
+        resources.release()
+        with self._lock:
+            heapq.heappush(self._free_displays, resources.display_number)
+
+    def start(self):
+        """Запуск планировщика в фоновом потоке"""
+        if self.browser_pool:
+            print(f"🔥 Прогрев {self.browser_pool_size} слотов с браузером...")
+            for _ in range(self.browser_pool_size):
+                threading.Thread(target=self._prewarm_slot, daemon=True).start()
+        self._scheduler = threading.Thread(target=self._schedule_loop, name="orchestrator-scheduler", daemon=True)
+        self._scheduler.start()
+
+    def _schedule_loop(self):
+        with self._lock:
+            while not self._stopping:
+                # Пропускаем отменённые сессии в голове очереди
+                while self._queue and self.sessions[self._queue[0][2]].state not in ("queued", "warming"):
+                    heapq.heappop(self._queue)
+
+                if not self._queue:
+                    self._wakeup.wait()
+                    continue
+
+                now = time.time()
+                next_prewarm = self._start_prewarms_locked(now)
+                start_at, _, session_id = self._queue[0]
+                session = self.sessions[session_id]
+                if start_at > now:
+                    self._wakeup.wait(timeout=min(start_at, next_prewarm) - now)
+                    continue
+
+                # Прогретая сессия уже учтена в лимите
+                if session.state == "queued" and self._active_count_locked() >= self.max_concurrent:
+                    # Ждём освобождения слота (уведомление из _finish)
+                    self._wakeup.wait()
+                    continue
+
+                heapq.heappop(self._queue)
+                if session.resources is None:
+                    session.resources = self._take_warm(session.config) or \
+                        SessionResources(self._allocate_display(), session.config.resolution,
+                                         with_display=session.config.needs_display)
+                session.state = "starting"
+                session.thread = threading.Thread(
+                    target=self._run_session, args=(session,), name=f"session-{session_id}", daemon=True
+                )
+                session.thread.start()
+
+    def _run_session(self, session: Session):
+        config = self._slot_config(session.config, session.resources)
+        if session.prewarm_thread:
+            session.prewarm_thread.join()
+        try:
+            session.resources.acquire()
+            bot = MeetingBot(config=config, session_id=session.session_id, browser_pool=self.browser_pool,
+                             session_index=self.session_index)
+            with self._lock:
+                session.bot = bot
+                session.state = "running"
+                session.started_at = time.time()
+                stop_requested = self._stopping or session.stop_requested
+            if stop_requested:
+                bot.stop()
+            print(f"▶️  Сессия {session.session_id} запущена на {config.display} / {config.pulse_sink}")
+            bot.run(handle_signals=False)
+            final_state = bot.status
+        except Exception as e:
+            print(f"❌ Сессия {session.session_id}: {e}")
+            session.error = str(e)
+            final_state = "failed"
+        finally:
+            self._retire_slot(session, config)
+
+        with self._lock:
+            session.state = final_state
+            session.ended_at = time.time()
+            self._wakeup.notify_all()
+        print(f"⏹️  Сессия {session.session_id} завершена: {final_state}")
+
+    def wait(self):
+        """Дождаться завершения всех сессий (включая запланированные)"""
+        while True:
+            with self._lock:
+                pending = [s for s in self.sessions.values()
+                           if s.state in ("queued", "warming", "starting", "running")]
+                threads = [s.thread for s in pending if s.thread]
+            if not pending:
+                return
+            for thread in threads:
+                thread.join(timeout=1)
+            if not threads:
+                time.sleep(1)
+
+    def shutdown(self):
+        """Отменить очередь и остановить все работающие сессии"""
+        with self._lock:
+            self._stopping = True
+            for session in self.sessions.values():
+                if session.state in ("queued", "warming"):
+                    self._cancel_pending_locked(session)
+            bots = [s.bot for s in self.sessions.values() if s.bot]
+            self._wakeup.notify_all()
+        for bot in bots:
+            bot.stop()
+
+    def close(self):
+        """Освободить прогретые слоты (после wait())"""
+        with self._lock:
+            self._stopping = True
+            warm = self._warm
+            self._warm = []
+            dropping = self._dropping
+            self._dropping = []
+        for thread in dropping:
+            thread.join()
+        if self.browser_pool:
+            self.browser_pool.close()
+        for resources in warm:
+            resources.release()
+
+    def print_status(self):
+        statuses = self.status()
+        active = sum(1 for s in statuses if s["state"] not in ("queued", "finished", "failed", "cancelled"))
+        print(f"\n📊 Сессии: {len(statuses)} всего, {active}/{self.max_concurrent} активно")
+        for s in statuses:
+            where = f" [{s['display']} / {s['sink']}]" if s["display"] else ""
+            print(f"   {s['session_id']}: {s['state']}{where} {s['meeting_url']}")
+
+
+def load_jobs(path: str) -> list:
+    """Загрузить список сессий из JSON файла
+
+    Формат: [{"meeting_url": "...", "bot_name": "...", "start_at": "2025-10-01T14:30:00", ...}, ...]
+    Любые поля BotConfig переопределяют значения из окружения.
+    """
+    with open(path) as f:
+        jobs = json.load(f)
+
+    result = []
+    for job in jobs:
+        job = dict(job)
+        start_at = job.pop("start_at", None)
+        if isinstance(start_at, str):
+            start_at = datetime.fromisoformat(start_at).timestamp()
+        result.append((BotConfig.from_env(**job), start_at))
+    return result
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Использование: python orchestrator.py jobs.json")
+        sys.exit(1)
+
+    orchestrator = Orchestrator()
+
+    def handle_signal(sig, frame):
+        print(f"\n\n⚠️  Получен сигнал {sig}, останавливаю все сессии...")
+        orchestrator.shutdown()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    for config, start_at in load_jobs(sys.argv[1]):
+        orchestrator.submit(config, start_at)
+
+    print(f"🤖 Orchestrator запущен (лимит: {orchestrator.max_concurrent} сессий)")
+    orchestrator.start()
+
+    def report():
+        while True:
+            time.sleep(STATUS_INTERVAL_SECONDS)
+            orchestrator.print_status()
+
+    threading.Thread(target=report, daemon=True).start()
+
+    compactor = None
+    if COMPACTOR_ENABLED:
+        compactor = Compactor(SESSIONS_DIR)
+        compactor.start()
+
+    orchestrator.wait()
+    if compactor:
+        compactor.close()
+    orchestrator.close()
+    orchestrator.print_status()
+
+
+if __name__ == "__main__":
+    main()
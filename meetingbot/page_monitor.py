@@ -0,0 +1,157 @@
+"""
+Page Monitor - события вкладки встречи через CDP: отличить сбой от выхода
+
+Когда наблюдатель присутствия сообщает "left", причина может быть не в
+выходе из встречи, а в сбое: упал рендерер, iframe web client'а удалён или
+перезагружен, пропала сеть, умер весь браузер. PageMonitor слушает эти
+события по отдельному CDP-соединению и классифицирует последний сбой -
+по нему бот решает, входить ли во встречу повторно.
+"""
+import threading
+import time
+from cdp_client import CDPClient
+
+# Виды сбоев
+CRASH = "crash"                      # Inspector.targetCrashed - упал процесс рендерера
+FRAME_DETACHED = "frame_detached"    # iframe web client'а удалён из страницы
+FRAME_NAVIGATED = "frame_navigated"  # iframe web client'а открыл страницу ошибки / about:blank
+NETWORK = "network"                  # пропала связь / документ страницы или iframe клиента не загрузился
+BROWSER_GONE = "browser_gone"        # соединение с DevTools оборвалось - браузера больше нет
+
+# Ошибки, означающие пропажу связи у всей машины: сбой по любому запросу вкладки
+# (во время встречи новых документов не грузится, падают только XHR/медиа клиента)
+CONNECTIVITY_ERRORS = ("ERR_INTERNET_DISCONNECTED", "ERR_NETWORK_CHANGED", "ERR_NETWORK_IO_SUSPENDED")
+
+# Ошибки загрузки, означающие проблемы с сетью, а не с конкретным запросом - сбой, только
+# если не загрузился документ страницы или iframe клиента
+NETWORK_ERRORS = CONNECTIVITY_ERRORS + ("ERR_NAME_NOT_RESOLVED", "ERR_CONNECTION_RESET", "ERR_ADDRESS_UNREACHABLE")
+
+# Сбой считается причиной выхода, если случился не раньше чем N секунд назад
+FAILURE_WINDOW_SECONDS = 120
+
+
+class PageMonitor:
+    """Подписка на события сбоев вкладки встречи"""
+
+    def __init__(self, driver, frame_selector: str = "#webclient", window: float = FAILURE_WINDOW_SECONDS):
+        """
+        Args:
+            driver: Selenium WebDriver instance (вкладка встречи)
+            frame_selector: CSS-селектор iframe'а клиента встречи (тот же элемент, что ищет коннектор)
+            window: Сколько секунд сбой остаётся кандидатом в причину выхода
+        """
+        self.driver = driver
+        self.frame_selector = frame_selector
+        self.window = window
+        self.events = []
+        self._frame_id = None
+        self._main_frame_id = None
+        self._documents = set()  # requestId загрузок документа страницы и iframe клиента
+        self._since = time.time()
+        self._lock = threading.Lock()
+        self._client = None
+        self._closing = False
+
+    def start(self):
+        """Подключиться к вкладке и подписаться на события"""
+        self._client = CDPClient.for_driver(self.driver)
+        self._client.on("Inspector.targetCrashed", lambda params: self._record(CRASH, "renderer crashed"))
+        self._client.on("Page.frameDetached", self._on_frame_detached)
+        self._client.on("Page.frameNavigated", self._on_frame_navigated)
+        # Закрытие websocket'ов и ошибки отдельных запросов - обычная жизнь клиента (и конец
+        # встречи); сбой - пропажа связи или незагрузившийся документ страницы / iframe клиента
+        self._client.on("Network.requestWillBeSent", self._on_request)
+        self._client.on("Network.loadingFinished", lambda params: self._documents.discard(params.get("requestId")))
+        self._client.on("Network.loadingFailed", self._on_loading_failed)
+        self._client.on("disconnected", self._on_disconnected)
+        for domain in ("Inspector", "Page", "Network"):
+            self._client.send(f"{domain}.enable")
+        self._resolve_frame()
+        print(f"   🩺 Монитор вкладки запущен (iframe {self.frame_selector}: {self._frame_id or 'не найден'})")
+
+    def _resolve_frame(self):
+        """frameId iframe'а клиента (меняется после повторного входа) - по элементу, как в коннекторе"""
+        self._main_frame_id = self._client.send("Page.getFrameTree")["frameTree"]["frame"]["id"]
+        self._frame_id = None
+        root = self._client.send("DOM.getDocument", {"depth": 0})["root"]["nodeId"]
+        node_id = self._client.send("DOM.querySelector", {"nodeId": root, "selector": self.frame_selector})["nodeId"]
+        if node_id:
+            # У элемента iframe frameId - это id его документа
+            self._frame_id = self._client.send("DOM.describeNode", {"nodeId": node_id})["node"].get("frameId")
+
+    def _record(self, kind: str, detail: str):
+        with self._lock:
+            self.events.append({"kind": kind, "detail": detail, "at": time.time()})
+        print(f"   🩺 Событие вкладки: {kind} ({detail})")
+
+    def _on_frame_detached(self, params: dict):
+        # reason "swap" - iframe переехал в другой процесс, это не сбой
+        if params.get("frameId") == self._frame_id and params.get("reason") != "swap":
+            self._record(FRAME_DETACHED, "webclient iframe removed")
+
+    def _on_frame_navigated(self, params: dict):
+        # Переход на страницу "встреча завершена" - штатный; сбой - только страница ошибки или пустая
+        frame = params.get("frame", {})
+        url = frame.get("url", "")
+        if frame.get("id") == self._frame_id and \
+                (frame.get("unreachableUrl") or url.startswith("chrome-error:") or url == "about:blank"):
+            self._record(FRAME_NAVIGATED, (frame.get("unreachableUrl") or url)[:100])
+
+    def _on_request(self, params: dict):
+        if params.get("type") == "Document" and params.get("frameId") in (self._main_frame_id, self._frame_id):
+            self._documents.add(params["requestId"])
+
+    def _on_loading_failed(self, params: dict):
+        document = params.get("requestId") in self._documents
+        self._documents.discard(params.get("requestId"))
+        error = params.get("errorText", "")
+        if any(code in error for code in (NETWORK_ERRORS if document else CONNECTIVITY_ERRORS)):
+            self._record(NETWORK, error)
+
+    def _on_disconnected(self, params: dict):
+        if not self._closing:
+            self._record(BROWSER_GONE, "devtools connection lost")
+
+    def failure(self, wait: float = 0) -> dict:
+        """Последний сбой после reset() и не старше window секунд (или None)
+
+        Args:
+            wait: Сколько ждать, если сбоя ещё нет (события приходят асинхронно)
+        """
+        deadline = time.time() + wait
+        while True:
+            cutoff = max(self._since, time.time() - self.window)
+            with self._lock:
+                recent = [event for event in self.events if event["at"] >= cutoff]
+            if recent or time.time() >= deadline:
+                break
+            time.sleep(0.1)
+        if not recent:
+            return None
+        # Падение браузера/рендерера важнее сетевых событий, которые оно за собой тянет
+        for kind in (BROWSER_GONE, CRASH, FRAME_DETACHED, FRAME_NAVIGATED):
+            for event in reversed(recent):
+                if event["kind"] == kind:
+                    return event
+        return recent[-1]
+
+    def revive(self):
+        """Вкладка после падения рендерера: новая навигация поднимает новый процесс"""
+        try:
+            self._client.send("Page.navigate", {"url": "about:blank"})
+        except Exception as e:
+            print(f"   ⚠️  Монитор: не удалось перезапустить вкладку: {e}")
+
+    def reset(self):
+        """После удачного повторного входа: старые сбои больше не причина выхода"""
+        self._since = time.time()
+        try:
+            self._resolve_frame()
+        except Exception as e:
+            print(f"   ⚠️  Монитор: iframe не найден после повторного входа: {e}")
+
+    def close(self):
+        self._closing = True
+        if self._client:
+            self._client.close()
+            self._client = None
@@ -0,0 +1,137 @@
+"""
+Profiles - переиспользуемый кэш браузера между сессиями
+
+Каждый Chrome запускается со своей копией профиля-шаблона (copy-on-write через
+`cp --reflink=auto`: на btrfs/xfs копия почти бесплатна, на других ФС - обычное
+копирование). Шаблон содержит только кэши: HTTP-кэш (бандл web client'а Zoom)
+и V8 code cache (скомпилированный JS/WASM). Cookies, storage и прочие данные
+сессии в шаблон никогда не попадают.
+
+После удачной сессии кэши её профиля продвигаются (promote) в новый шаблон:
+сборка во временной папке и атомарная замена под файловой блокировкой, так что
+параллельные боты всегда копируют целый шаблон.
+"""
+import fcntl
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# Папка шаблона и рабочих копий профилей
+BROWSER_PROFILES_DIR = Path(os.getenv("BROWSER_PROFILES_DIR", str(Path(__file__).parent / "profiles")))
+# Предел HTTP-кэша Chrome (--disk-cache-size), МБ
+BROWSER_DISK_CACHE_MB = int(os.getenv("BROWSER_DISK_CACHE_MB", "512"))
+# Не продвигать шаблон чаще, чем раз в N секунд
+BROWSER_PROFILE_PROMOTE_SECONDS = int(os.getenv("BROWSER_PROFILE_PROMOTE_SECONDS", "600"))
+
+# Что переносится из профиля сессии в шаблон (пути внутри --user-data-dir)
+CACHE_PATHS = (
+    "Default/Cache",        # HTTP-кэш
+    "Default/Code Cache",   # V8 code cache (js, wasm)
+    "GrShaderCache",
+    "ShaderCache",
+)
+
+
+def directory_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def _copy_tree(source: Path, target: Path):
+    """Копия папки с reflink, где ФС это умеет"""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    result = subprocess.run(["cp", "-a", "--reflink=auto", str(source), str(target)],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise OSError(result.stderr.strip() or f"cp завершился с кодом {result.returncode}")
+
+
+class ProfileStore:
+    """Шаблон профиля с кэшами и выдача рабочих копий сессиям"""
+
+    def __init__(self, root: Path = BROWSER_PROFILES_DIR, disk_cache_mb: int = BROWSER_DISK_CACHE_MB,
+                 promote_interval: float = BROWSER_PROFILE_PROMOTE_SECONDS):
+        """
+        Args:
+            root: Папка шаблона (root/template) и рабочих копий (root/live)
+            disk_cache_mb: Предел HTTP-кэша Chrome; шаблон больше 2x предела не продвигается
+            promote_interval: Минимальный интервал между продвижениями шаблона (сек)
+        """
+        self.root = Path(root)
+        self.template_dir = self.root / "template"
+        self.live_dir = self.root / "live"
+        self.disk_cache_bytes = disk_cache_mb * 1024 * 1024
+        self.promote_interval = promote_interval
+
+    def chrome_arguments(self, profile_dir: Path) -> list:
+        return [f"--user-data-dir={profile_dir}", f"--disk-cache-size={self.disk_cache_bytes}"]
+
+    @contextmanager
+    def _template_lock(self, exclusive: bool):
+        """Блокировка шаблона между процессами: копирование - shared, замена - exclusive"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.root / ".lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def checkout(self) -> Path:
+        """Рабочая копия профиля для нового Chrome (пустая, если шаблона ещё нет)"""
+        self.live_dir.mkdir(parents=True, exist_ok=True)
+        profile_dir = Path(tempfile.mkdtemp(prefix="profile-", dir=self.live_dir))
+        started = time.time()
+        with self._template_lock(exclusive=False):
+            if not self.template_dir.exists():
+                return profile_dir
+            profile_dir.rmdir()
+            try:
+                _copy_tree(self.template_dir, profile_dir)
+            except OSError as e:
+                print(f"   ⚠️  Профиль: не удалось скопировать шаблон, старт без кэша: {e}")
+                shutil.rmtree(profile_dir, ignore_errors=True)
+                profile_dir.mkdir()
+                return profile_dir
+        print(f"   🗂️  Профиль с кэшем за {(time.time() - started) * 1000:.0f} мс: {profile_dir.name}")
+        return profile_dir
+
+    def promote(self, profile_dir: Path) -> bool:
+        """Сделать кэши профиля (Chrome уже закрыт) новым шаблоном"""
+        profile_dir = Path(profile_dir)
+        if self.template_dir.exists() and time.time() - self.template_dir.stat().st_mtime < self.promote_interval:
+            return False
+
+        sources = [(profile_dir / path, path) for path in CACHE_PATHS if (profile_dir / path).exists()]
+        if not sources:
+            return False
+        size = sum(directory_size(source) for source, _ in sources)
+        if size > 2 * self.disk_cache_bytes:
+            print(f"   ⚠️  Профиль: кэш {size / (1024 * 1024):.0f} MB больше предела, шаблон не обновлён")
+            return False
+
+        staging = Path(tempfile.mkdtemp(prefix=".template-", dir=self.root))
+        try:
+            for source, path in sources:
+                _copy_tree(source, staging / path)
+            with self._template_lock(exclusive=True):
+                old = None
+                if self.template_dir.exists():
+                    old = self.root / f".template-old-{os.getpid()}-{time.time_ns()}"
+                    self.template_dir.rename(old)
+                staging.rename(self.template_dir)
+            if old:
+                shutil.rmtree(old, ignore_errors=True)
+        except OSError as e:
+            print(f"   ⚠️  Профиль: не удалось обновить шаблон: {e}")
+            shutil.rmtree(staging, ignore_errors=True)
+            return False
+        print(f"   🗂️  Шаблон профиля обновлён ({size / (1024 * 1024):.1f} MB кэша)")
+        return True
+
+    def release(self, profile_dir: Path):
+        """Удалить рабочую копию"""
+        shutil.rmtree(profile_dir, ignore_errors=True)
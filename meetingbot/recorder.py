@@ -1,105 +1,514 @@
 """
 Screen Recorder - запись экрана через ffmpeg
 """
+import json
+import os
+import shutil
 import subprocess
+import threading
 import time
+from collections import deque
 from pathlib import Path
 
+# Сколько последних строк stderr ffmpeg хранить для диагностики
+STDERR_TAIL_LINES = 50
+
+# Энкодер отстаёт, если speed ниже порога столько отчётов -progress подряд (~1 отчёт/сек)
+FALLING_BEHIND_SPEED = 0.9
+FALLING_BEHIND_REPORTS = 10
+
+# Сколько ждать первый отчёт -progress при старте (сек)
+START_TIMEOUT_SECONDS = 5
+
+# Кодеки режима "audio": аргументы ffmpeg, расширение файла, формат сегментов
+AUDIO_CODECS = {
+    "opus": {"args": ["-codec:a", "libopus", "-b:a", "32k", "-application", "voip"],
+             "suffix": ".ogg", "segment_format": "ogg"},
+    "aac": {"args": ["-codec:a", "aac", "-b:a", "64k"],
+            "suffix": ".m4a", "segment_format": "mp4"},
+}
+
+# Запись по изменениям: порог смены сцены scdet (0-100) и максимальная пауза
+# между кадрами на статичном экране (сек) - чтобы файл оставался перематываемым
+SCENE_CHANGE_THRESHOLD = 10
+MAX_STATIC_SECONDS = 10
+
+
+def recording_filename(mode: str = "video", audio_codec: str = "opus") -> str:
+    """Имя файла записи для режима ("video" -> recording.mp4, "audio" -> recording.ogg/.m4a)"""
+    if mode == "audio":
+        return f"recording{AUDIO_CODECS[audio_codec]['suffix']}"
+    return "recording.mp4"
+
 
 class ScreenRecorder:
     """Класс для записи экрана через ffmpeg"""
 
-    def __init__(self, output_path: Path, display=":99", resolution="1200x800", fps=15):
+    def __init__(self, output_path: Path, display=":99", resolution="1200x800", fps=15,
+                 audio_source="virtual_speaker.monitor", segment_seconds=0, mode="video", audio_codec="opus",
+                 audio_tap=None, change_driven=False, screencast=None):
         """
         Args:
             output_path: Путь к выходному видеофайлу
             display: DISPLAY для X11 (по умолчанию :99 для Xvfb)
             resolution: Разрешение записи
             fps: Частота кадров
+            audio_source: PulseAudio источник звука (monitor виртуального sink)
+            segment_seconds: Длина сегмента в секундах (0 = один файл).
+                В сегментном режиме запись идёт в segments/ фрагментированными MP4,
+                всё записанное до падения остаётся читаемым, а закрытые сегменты
+                перечислены в playlist.ffconcat уже во время встречи
+            mode: "video" - экран (x11grab) + звук, "audio" - только звук с audio_source
+                (не нужен X display, нагрузка на CPU на порядок ниже)
+            audio_codec: Кодек режима "audio" ("opus" или "aac")
+            audio_tap: AudioTap - живой PCM-поток того же звука вторым выходом этого ffmpeg
+            change_driven: Кодировать кадр только когда изображение изменилось (mpdecimate,
+                переменный FPS); моменты смены сцены пишутся в keyframes.json
+            screencast: ScreencastSource - видео из CDP screencast в stdin ffmpeg вместо x11grab
+                (Chrome может оставаться headless, X display не нужен)
         """
+        if mode not in ("video", "audio"):
+            raise ValueError(f"Неизвестный режим записи: {mode}")
+        if mode == "audio" and audio_codec not in AUDIO_CODECS:
+            raise ValueError(f"Неизвестный аудио-кодек: {audio_codec}")
         self.output_path = output_path
         # Временный файл - не будет виден пользователю до финализации
         self.temp_path = output_path.parent / f"{output_path.stem}.tmp{output_path.suffix}"
         self.display = display
         self.resolution = resolution
         self.fps = fps
+        self.audio_source = audio_source
+        self.segment_seconds = segment_seconds
+        self.mode = mode
+        self.audio_codec = audio_codec
+        self.audio_tap = audio_tap
+        self._tap_fd = None
+        self._tap_read_fd = None
+        self._command = None
+        self._prepared = False
+        self.change_driven = change_driven and mode == "video"
+        self.screencast = screencast if mode == "video" else None
+        self.changes_log_path = output_path.parent / "changes.log"
+        self.keyframes_path = output_path.parent / "keyframes.json"
+        self.segments_dir = output_path.parent / "segments"
+        self.playlist_path = output_path.parent / "playlist.ffconcat"
         self.process = None
+        self.started_at = None
+        self._readers = []
+        self._stderr_tail = deque(maxlen=STDERR_TAIL_LINES)
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+        self._slow_reports = 0
+        self._first_progress = threading.Event()
 
-    def start(self):
-        """Запуск записи"""
-        print(f"🎬 Запуск записи экрана...")
-        print(f"   Финальный файл: {self.output_path.name}")
-        print(f"   Временный файл: {self.temp_path.name}")
-        print(f"   Разрешение: {self.resolution}")
-        print(f"   FPS: {self.fps}")
-
-        # ffmpeg команда для записи X11 display + PulseAudio
-        # ПИШЕМ ВО ВРЕМЕННЫЙ ФАЙЛ
-        cmd = [
-            "ffmpeg",
-            "-f", "x11grab",
-            "-video_size", self.resolution,
-            "-framerate", str(self.fps),
-            "-i", self.display,
+    @property
+    def segmented(self) -> bool:
+        return self.segment_seconds > 0
+
+    @property
+    def audio_only(self) -> bool:
+        return self.mode == "audio"
+
+    @property
+    def _container(self) -> str:
+        if self.audio_only:
+            return AUDIO_CODECS[self.audio_codec]["segment_format"]
+        return "mp4"
+
+    def _input_args(self) -> list:
+        if self.audio_only:
+            return ["-f", "pulse", "-i", self.audio_source]
+        if self.screencast:
+            video_input = self.screencast.ffmpeg_input_args()
+        else:
+            video_input = [
+                "-f", "x11grab",
+                "-video_size", self.resolution,
+                "-framerate", str(self.fps),
+                "-i", self.display,
+            ]
+        return video_input + [
             "-f", "pulse",
-            "-i", "virtual_speaker.monitor",  # Захват аудио с виртуального устройства
+            "-i", self.audio_source,  # Захват аудио с виртуального устройства
+        ]
+
+    def _codec_args(self) -> list:
+        if self.audio_only:
+            # Речь встречи - моно достаточно
+            return ["-vn", "-ac", "1"] + AUDIO_CODECS[self.audio_codec]["args"]
+        return self._video_filter_args() + [
             "-codec:v", "libx264",
             "-preset", "ultrafast",
             "-pix_fmt", "yuv420p",
             "-codec:a", "aac",
             "-b:a", "128k",
-            "-y",  # Перезаписать если файл существует
-            str(self.temp_path)  # Пишем во временный файл
         ]
 
-        # Проверяем что display доступен
-        import subprocess as sp
+    def _video_filter_args(self) -> list:
+        filters = []
+        if self.screencast:
+            # Кадры screencast могут менять размер (viewport) - приводим к размеру записи
+            width, height = self.resolution.split("x")
+            filters += [
+                f"scale={width}:{height}:force_original_aspect_ratio=decrease",
+                f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2",
+            ]
+        if self.change_driven:
+            # mpdecimate сравнивает блоки 8x8 с последним выпущенным кадром и отбрасывает
+            # неизменившиеся; scdet помечает смену сцены; metadata пишет время каждого выпущенного кадра
+            filters += [
+                f"mpdecimate=max={self.fps * MAX_STATIC_SECONDS}",
+                f"scdet=threshold={SCENE_CHANGE_THRESHOLD}",
+                f"metadata=mode=print:file='{self.changes_log_path}'",
+            ]
+        if not filters:
+            return []
+        return ["-vf", ",".join(filters)] + (["-fps_mode", "vfr"] if self.change_driven else [])
+
+    def write_keyframe_timeline(self) -> dict:
+        """Разобрать changes.log в keyframes.json: число кадров и моменты смены сцены"""
+        emitted = 0
+        last_time = 0.0
+        scene_changes = []
+        score = 0.0
+        if self.changes_log_path.exists():
+            # Формат metadata=print: "frame:N pts:P pts_time:T", затем строки key=value кадра
+            for line in self.changes_log_path.read_text(errors="ignore").splitlines():
+                key, _, value = line.partition("=")
+                try:
+                    if line.startswith("frame:"):
+                        last_time = float(line.rsplit("pts_time:", 1)[-1])
+                        emitted += 1
+                    elif key == "lavfi.scd.score":
+                        score = float(value)
+                    elif key == "lavfi.scd.time":
+                        scene_changes.append({"t": round(float(value), 3), "score": round(score, 2)})
+                except ValueError:
+                    # Недописанная строка (ffmpeg остановлен kill)
+                    continue
+
+        timeline = {
+            "mode": "changes",
+            "emitted_frames": emitted,
+            "constant_rate_frames": int(last_time * self.fps),
+            "duration_seconds": round(last_time, 3),
+            "scene_changes": scene_changes,
+        }
+        self.keyframes_path.write_text(json.dumps(timeline, ensure_ascii=False, indent=2))
+        print(f"   🗂️  Кадров с изменениями: {emitted} (при {self.fps} FPS было бы "
+              f"{timeline['constant_rate_frames']}), смен сцены: {len(scene_changes)}")
+        return timeline
+
+    def _output_args(self) -> list:
+        # Фрагментированный MP4: moov пишется сразу, файл читаем до последнего фрагмента даже после SIGKILL
+        # (Ogg устойчив к обрыву сам по себе)
+        movflags = "+frag_keyframe+empty_moov+default_base_moof" if self._container == "mp4" else None
+
+        if not self.segmented:
+            return (["-movflags", movflags] if movflags else []) + [
+                "-y",  # Перезаписать если файл существует
+                str(self.temp_path)  # Пишем во временный файл
+            ]
+
+        self.segments_dir.mkdir(parents=True, exist_ok=True)
+        # Ключевой кадр точно на границе сегмента (в аудио каждый кадр - ключевой)
+        keyframe_args = [] if self.audio_only else \
+            ["-force_key_frames", f"expr:gte(t,n_forced*{self.segment_seconds})"]
+        return keyframe_args + [
+            "-f", "segment",
+            "-segment_time", str(self.segment_seconds),
+            "-reset_timestamps", "1",
+            "-segment_format", self._container,
+        ] + (["-segment_format_options", f"movflags={movflags}"] if movflags else []) + [
+            # Плейлист обновляется при закрытии каждого сегмента
+            "-segment_list", str(self.playlist_path),
+            "-segment_list_type", "ffconcat",
+            # Плейлист лежит в папке сессии, сегменты - в segments/: пути записей относительно плейлиста
+            "-segment_list_entry_prefix", f"{self.segments_dir.name}/",
+            "-y",
+            str(self.segments_dir / f"{self.output_path.stem}_%05d{self.output_path.suffix}"),
+        ]
+
+    def build_command(self) -> list:
+        """ffmpeg команда для записи X11 display (или CDP screencast) + PulseAudio (или только PulseAudio)"""
+        # Статистика - блоками key=value в stdout (раз в секунду), вместо строк статуса в stderr
+        progress_args = ["-progress", "pipe:1", "-nostats"]
+        cmd = ["ffmpeg"] + progress_args + self._input_args() + self._codec_args() + self._output_args()
+        if self.audio_tap and self._tap_fd is not None:
+            # Второй выход того же процесса: -map действует только на него, запись не меняется
+            cmd += self.audio_tap.ffmpeg_output_args(f"{self._audio_input}:a", self._tap_fd)
+        return cmd
+
+    @property
+    def _audio_input(self) -> int:
+        """Индекс входа pulse в команде ffmpeg"""
+        return 0 if self.audio_only else 1
+
+    def closed_segments(self) -> list:
+        """Закрытые (полностью записанные) сегменты - можно отдавать потребителям во время встречи"""
+        if not self.segmented or not self.playlist_path.exists():
+            return []
+        segments = []
+        for line in self.playlist_path.read_text().splitlines():
+            line = line.strip()
+            if line.startswith("file "):
+                name = line[len("file "):].strip().strip("'")
+                # Записи относительны папке плейлиста (segments/<файл>, см. _output_args)
+                segments.append(self.playlist_path.parent / name)
+        return segments
+
+    def output_files(self) -> list:
+        """Итоговые файлы записи"""
+        if self.segmented:
+            return sorted(self.segments_dir.glob(f"{self.output_path.stem}_*{self.output_path.suffix}"))
+        return [self.output_path] if self.output_path.exists() else []
+
+    def _read_progress(self, stream):
+        """Фоновое чтение -progress: блоки key=value, завершающиеся progress=continue|end"""
+        block = {}
+        for raw in iter(stream.readline, b""):
+            key, _, value = raw.decode(errors="ignore").strip().partition("=")
+            if not key:
+                continue
+            block[key] = value.strip()
+            if key == "progress":
+                self._update_stats(block)
+                block = {}
+        stream.close()
+
+    def _read_stderr(self, stream):
+        """Фоновое чтение stderr - иначе переполненный pipe останавливает ffmpeg"""
+        for raw in iter(stream.readline, b""):
+            line = raw.decode(errors="ignore").rstrip()
+            if line:
+                self._stderr_tail.append(line)
+        stream.close()
+
+    def _update_stats(self, block: dict):
+        def number(key, cast=float, suffix=""):
+            # "N/A" до первых кадров; speed = "1.01x", bitrate = "812.4kbits/s"
+            value = block.get(key, "")
+            if suffix and value.endswith(suffix):
+                value = value[:-len(suffix)]
+            try:
+                return cast(value)
+            except ValueError:
+                return None
+
+        stats = {
+            "frame": number("frame", int),
+            "fps": number("fps"),
+            "speed": number("speed", suffix="x"),
+            "bitrate_kbps": number("bitrate", suffix="kbits/s"),
+            "drop_frames": number("drop_frames", int),
+            "dup_frames": number("dup_frames", int),
+            "total_size": number("total_size", int),
+            "out_time_seconds": (number("out_time_us", int) or 0) / 1_000_000,
+            "progress": block.get("progress"),
+            "updated_at": time.time(),
+        }
+
+        with self._stats_lock:
+            if stats["speed"] is not None and stats["speed"] < FALLING_BEHIND_SPEED:
+                self._slow_reports += 1
+            else:
+                self._slow_reports = 0
+            stats["falling_behind"] = self._slow_reports >= FALLING_BEHIND_REPORTS
+            self._stats = stats
+        self._first_progress.set()
+
+    def stats(self) -> dict:
+        """Последняя статистика энкодера: fps, speed, drop/dup кадры, битрейт (пусто до первого отчёта)"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        if stats and self.screencast:
+            stats["screencast"] = self.screencast.stats()
+        return stats
+
+    def is_falling_behind(self) -> bool:
+        """Энкодер стабильно не успевает за реальным временем (speed < порога)"""
+        return bool(self.stats().get("falling_behind"))
+
+    def stderr_tail(self) -> list:
+        """Последние строки stderr ffmpeg"""
+        return list(self._stderr_tail)
+
+    def _start_readers(self):
+        self._readers = [
+            threading.Thread(target=self._read_progress, args=(self.process.stdout,),
+                             name="ffmpeg-progress", daemon=True),
+            threading.Thread(target=self._read_stderr, args=(self.process.stderr,),
+                             name="ffmpeg-stderr", daemon=True),
+        ]
+        for reader in self._readers:
+            reader.start()
+
+    def _join_readers(self):
+        for reader in self._readers:
+            reader.join(timeout=2)
+        self._readers = []
+
+    def prepare(self) -> bool:
+        """Подготовка к старту: всё, что не пишет запись, - проверки входов, pipe, команда ffmpeg
+
+        Выполняется заранее, параллельно с запуском браузера и входом во встречу,
+        чтобы после входа оставалось только запустить ffmpeg.
+        """
+        if self._prepared:
+            return True
+        started = time.time()
+
+        if not self.audio_only and not self.screencast:
+            try:
+                subprocess.run(["xdpyinfo", "-display", self.display],
+                               check=True, capture_output=True, timeout=2)
+            except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired):
+                print(f"   ❌ Display {self.display} недоступен! Убедитесь что Xvfb запущен.")
+                return False
+
+        if not self._audio_source_available():
+            print(f"   ❌ PulseAudio источник {self.audio_source} не найден")
+            return False
+
+        if not shutil.which("ffmpeg"):
+            print(f"   ❌ ffmpeg не найден! Установите ffmpeg")
+            return False
+
+        if self.screencast:
+            # Кадры начинают приходить заранее; в ffmpeg они пойдут только после start()
+            try:
+                if not self.screencast.start():
+                    print("   ❌ Screencast: вкладка не прислала ни одного кадра")
+                    self.screencast.stop()
+                    return False
+            except Exception as e:
+                print(f"   ❌ Screencast не запустился: {e}")
+                self.screencast.stop()
+                return False
+
+        # Pipe для живого аудио: пишущий конец наследует ffmpeg, читающий - AudioTap
+        if self.audio_tap:
+            self._tap_read_fd, self._tap_fd = os.pipe()
+
+        self._command = self.build_command()
+        self._prepared = True
+        print(f"   🎬 Запись подготовлена за {(time.time() - started) * 1000:.0f} мс")
+        return True
+
+    def _audio_source_available(self) -> bool:
+        """Есть ли источник PulseAudio (без pactl проверку пропускаем - ошибку покажет ffmpeg)"""
         try:
-            sp.run(["xdpyinfo", "-display", self.display],
-                   check=True, capture_output=True, timeout=2)
-        except (sp.CalledProcessError, FileNotFoundError, sp.TimeoutExpired):
-            print(f"   ❌ Display {self.display} недоступен! Убедитесь что Xvfb запущен.")
+            result = subprocess.run(["pactl", "list", "short", "sources"],
+                                    capture_output=True, text=True, timeout=2)
+        except (FileNotFoundError, subprocess.TimeoutExpired):
+            return True
+        if result.returncode != 0:
+            return True
+        return any(line.split("\t")[1:2] == [self.audio_source] for line in result.stdout.splitlines())
+
+    def cancel(self):
+        """Отменить подготовленный старт (вход во встречу не удался)"""
+        if not self._prepared or self.process:
+            return
+        if self.screencast:
+            self.screencast.stop()
+        self._close_tap_fds(self._tap_read_fd)
+        self._tap_read_fd = None
+        self._prepared = False
+
+    def start(self):
+        """Запуск записи (если prepare() уже выполнен - только запуск ffmpeg)"""
+        print(f"🎬 Запуск записи {'звука' if self.audio_only else 'экрана'}...")
+        if self.segmented:
+            print(f"   Сегменты: {self.segments_dir.name}/ по {self.segment_seconds} сек")
+            print(f"   Плейлист: {self.playlist_path.name}")
+        else:
+            print(f"   Финальный файл: {self.output_path.name}")
+            print(f"   Временный файл: {self.temp_path.name}")
+        if self.audio_only:
+            print(f"   Только звук: {self.audio_source} ({self.audio_codec})")
+        else:
+            print(f"   Источник видео: {'CDP screencast' if self.screencast else f'X11 {self.display}'}")
+            print(f"   Разрешение: {self.resolution}")
+            print(f"   FPS: {self.fps}")
+
+        if not self.prepare():
             return False
+        tap_read_fd, self._tap_read_fd = self._tap_read_fd, None
 
         try:
-            # Запускаем ffmpeg с выводом stderr в консоль для диагностики
+            # stdout (-progress) и stderr непрерывно читаются фоновыми потоками
             self.process = subprocess.Popen(
-                cmd,
+                self._command,
+                stdin=subprocess.PIPE if self.screencast else subprocess.DEVNULL,
                 stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE  # Отдельный stderr
+                stderr=subprocess.PIPE,
+                pass_fds=(self._tap_fd,) if self._tap_fd is not None else ()
             )
-            time.sleep(2)  # Даём ffmpeg время на инициализацию
+            # Захват идёт с этого момента - от него считаются смещения в записи
+            self.started_at = time.time()
+            if self.screencast:
+                self.screencast.attach(self.process.stdin)
+            self._start_readers()
+            if self.audio_tap:
+                # Свою копию пишущего конца закрываем - EOF придёт, когда ffmpeg завершится
+                os.close(self._tap_fd)
+                self._tap_fd = None
+                self.audio_tap.attach(tap_read_fd)
+                tap_read_fd = None
+
+            # Запись идёт, когда пришёл первый отчёт о прогрессе (или ffmpeg упал раньше)
+            deadline = time.time() + START_TIMEOUT_SECONDS
+            while not self._first_progress.wait(timeout=0.1):
+                if self.process.poll() is not None or time.time() >= deadline:
+                    break
 
             if self.process.poll() is not None:
                 # Процесс уже завершился - ошибка
-                stdout, stderr = self.process.communicate()
-                print(f"   ❌ Ошибка запуска ffmpeg:")
-                if stderr:
-                    print(stderr.decode())
-                if stdout:
-                    print(stdout.decode())
+                if self.screencast:
+                    self.screencast.stop()
+                self._join_readers()
+                print(f"   ❌ Ошибка запуска ffmpeg (код {self.process.returncode}):")
+                for line in self.stderr_tail()[-15:]:
+                    print(f"      {line}")
                 return False
 
             print(f"   ✅ Запись начата (PID: {self.process.pid})")
 
-            # Читаем первые несколько строк вывода ffmpeg для диагностики
-            import select
-            if select.select([self.process.stderr], [], [], 0.5)[0]:
-                diagnostic = self.process.stderr.read(500).decode(errors='ignore')
-                if 'pulse' in diagnostic.lower() or 'audio' in diagnostic.lower():
-                    print(f"   🔍 FFmpeg аудио: {diagnostic[:200]}")
+            # Диагностика аудио-входа из stderr ffmpeg
+            for line in self.stderr_tail():
+                if 'pulse' in line.lower() or 'audio:' in line.lower():
+                    print(f"   🔍 FFmpeg аудио: {line[:200]}")
+                    break
 
             return True
 
         except FileNotFoundError:
             print(f"   ❌ ffmpeg не найден! Установите ffmpeg")
+            self._abort_start(tap_read_fd)
             return False
         except Exception as e:
             print(f"   ❌ Ошибка запуска записи: {e}")
+            self._abort_start(tap_read_fd)
             return False
 
-    def stop(self):
-        """Остановка записи"""
+    def _abort_start(self, tap_read_fd):
+        if self.screencast:
+            self.screencast.stop()
+        self._close_tap_fds(tap_read_fd)
+
+    def _close_tap_fds(self, read_fd):
+        for fd in (read_fd, self._tap_fd):
+            if fd is not None:
+                os.close(fd)
+        self._tap_fd = None
+
+    def stop(self, timeout: float = 10):
+        """Остановка записи
+
+        Args:
+            timeout: Сколько ждать завершения ffmpeg после SIGINT, потом - kill (сек)
+        """
         if not self.process:
             print("⚠️  Запись не была запущена")
             return False
@@ -107,13 +516,26 @@ class ScreenRecorder:
         print(f"🛑 Остановка записи...")
 
         try:
+            if self.screencast:
+                # Конец видео-входа: stdin закрывается, ffmpeg дописывает кадры из pipe
+                self.screencast.stop()
+
             # Отправляем SIGINT (как Ctrl+C) для graceful shutdown
             import signal
             self.process.send_signal(signal.SIGINT)
 
-            # Ждём завершения (увеличено до 10 секунд)
+            # Завершение процесса = файл финализирован
             try:
-                self.process.wait(timeout=10)
+                self.process.wait(timeout=timeout)
+                self._join_readers()
+                self._print_final_stats()
+                self._finish_timeline()
+
+                if self.segmented:
+                    # Закрывается только текущий сегмент - время не зависит от длины встречи
+                    print(f"   ✅ Сегментов записано: {len(self.output_files())}")
+                    return True
+
                 print(f"   ✅ Временный файл финализирован")
 
                 # Проверяем временный файл
@@ -122,19 +544,24 @@ class ScreenRecorder:
                     print(f"   📊 Размер временного файла: {size_mb:.2f} MB")
 
                     # Переименовываем временный файл в финальный
-                    import shutil
                     shutil.move(str(self.temp_path), str(self.output_path))
                     print(f"   ✅ Файл готов: {self.output_path.name}")
 
                 return True
             except subprocess.TimeoutExpired:
-                print(f"   ⚠️  ffmpeg не завершился за 10 сек, принудительное завершение...")
+                print(f"   ⚠️  ffmpeg не завершился за {timeout:.1f} сек, принудительное завершение...")
                 self.process.kill()
                 self.process.wait()
+                self._join_readers()
+                self._finish_timeline()
+
+                if self.segmented:
+                    # Фрагментированные сегменты читаемы и после kill
+                    print(f"   ⚠️  Сегментов сохранено (после kill): {len(self.output_files())}")
+                    return True
 
                 # Пробуем переименовать даже после kill
                 if self.temp_path.exists():
-                    import shutil
                     shutil.move(str(self.temp_path), str(self.output_path))
                     print(f"   ⚠️  Файл сохранён (после kill): {self.output_path.name}")
 
@@ -144,6 +571,19 @@ class ScreenRecorder:
             print(f"   ❌ Ошибка остановки записи: {e}")
             return False
 
+    def _finish_timeline(self):
+        if self.change_driven:
+            try:
+                self.write_keyframe_timeline()
+            except Exception as e:
+                print(f"   ⚠️  Не удалось записать {self.keyframes_path.name}: {e}")
+
+    def _print_final_stats(self):
+        stats = self.stats()
+        if stats:
+            print(f"   📊 Кадров: {stats.get('frame')}, потеряно: {stats.get('drop_frames')}, "
+                  f"дублировано: {stats.get('dup_frames')}")
+
     def is_recording(self):
         """Проверка, идёт ли запись"""
         return self.process is not None and self.process.poll() is None
@@ -0,0 +1,110 @@
+"""
+Request Filter - блокировка ненужных запросов страницы встречи через CDP
+
+Аналитика, реклама и трекеры не нужны коннектору, но стоят трафика и CPU
+рендерера. Список шаблонов задаёт коннектор (BLOCKED_URL_PATTERNS), плюс
+REQUEST_FILTER_EXTRA из окружения. Блокировка - Network.setBlockedURLs:
+запрос отменяется в браузере ещё до отправки.
+
+Статистика собирается из performance-лога chromedriver (события Network.*):
+сколько запросов заблокировано (по типам и хостам) и сколько загружено.
+Заблокированный запрос не скачивается, поэтому его размер неизвестен -
+сэкономленные байты оцениваются по типичному размеру ресурса данного типа.
+
+Ограничение: setBlockedURLs действует на цель страницы; iframe с другого
+сайта (out-of-process) им не покрывается.
+"""
+import json
+import os
+from collections import Counter
+from urllib.parse import urlparse
+
+# Дополнительные шаблоны через запятую (например "*/analytics/*" для стенда bench/)
+REQUEST_FILTER_EXTRA = tuple(p.strip() for p in os.getenv("REQUEST_FILTER_EXTRA", "").split(",") if p.strip())
+
+# Оценка размера заблокированного ресурса по типу (байт)
+ESTIMATED_BYTES = {
+    "Script": 60 * 1024,
+    "Stylesheet": 20 * 1024,
+    "Font": 40 * 1024,
+    "Image": 15 * 1024,
+    "Media": 200 * 1024,
+    "Document": 30 * 1024,
+}
+DEFAULT_ESTIMATED_BYTES = 1024  # ping, xhr, beacon
+
+
+class RequestFilter:
+    """Блокировка запросов по шаблонам и учёт заблокированного/загруженного"""
+
+    def __init__(self, driver, patterns):
+        """
+        Args:
+            driver: Selenium WebDriver instance (с performance-логом, см. browser.build_chrome_options)
+            patterns: Шаблоны URL для Network.setBlockedURLs ('*' - любая подстрока)
+        """
+        self.driver = driver
+        self.patterns = list(dict.fromkeys(patterns))
+        self.blocked = 0
+        self.blocked_by_type = Counter()
+        self.blocked_by_host = Counter()
+        self.estimated_bytes_saved = 0
+        self.loaded = 0
+        self.loaded_bytes = 0
+        self._pending = {}  # requestId -> (url, type)
+        self._log_available = True
+
+    def apply(self):
+        """Включить блокировку (повторно - для браузера из пула тоже)"""
+        # События прошлой сессии браузера из пула не должны попасть в статистику
+        self._read_log()
+        self.driver.execute_cdp_cmd("Network.enable", {})
+        self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self.patterns})
+        print(f"   🚫 Фильтр запросов: {len(self.patterns)} шаблонов")
+
+    def _read_log(self) -> list:
+        if not self._log_available:
+            return []
+        try:
+            return self.driver.get_log("performance")
+        except Exception as e:
+            # Браузер без performance-лога: блокировка работает, статистики не будет
+            print(f"   ⚠️  Фильтр запросов: performance-лог недоступен ({e})")
+            self._log_available = False
+            return []
+
+    def collect(self):
+        """Разобрать накопившиеся события сети (вызывать периодически - лог копится в chromedriver)"""
+        for entry in self._read_log():
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, ValueError):
+                continue
+            method = message.get("method")
+            params = message.get("params", {})
+
+            if method == "Network.requestWillBeSent":
+                self._pending[params["requestId"]] = (params["request"]["url"], params.get("type", "Other"))
+            elif method == "Network.loadingFinished":
+                self._pending.pop(params["requestId"], None)
+                self.loaded += 1
+                self.loaded_bytes += int(params.get("encodedDataLength", 0))
+            elif method == "Network.loadingFailed":
+                url, resource_type = self._pending.pop(params["requestId"], ("", params.get("type", "Other")))
+                if params.get("blockedReason"):
+                    self.blocked += 1
+                    self.blocked_by_type[resource_type] += 1
+                    self.blocked_by_host[urlparse(url).hostname or "?"] += 1
+                    self.estimated_bytes_saved += ESTIMATED_BYTES.get(resource_type, DEFAULT_ESTIMATED_BYTES)
+
+    def stats(self) -> dict:
+        return {
+            "patterns": len(self.patterns),
+            "blocked": self.blocked,
+            "blocked_by_type": dict(self.blocked_by_type),
+            "blocked_by_host": dict(self.blocked_by_host.most_common(20)),
+            "estimated_bytes_saved": self.estimated_bytes_saved,
+            "loaded": self.loaded,
+            "loaded_bytes": self.loaded_bytes,
+            "stats_available": self._log_available,
+        }
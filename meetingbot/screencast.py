@@ -0,0 +1,125 @@
+"""
+Screencast - видео вкладки через CDP Page.startScreencast (без X display)
+
+Chrome присылает JPEG-кадры только когда страница перерисовалась. Поток
+записи раз в 1/fps отдаёт в stdin ffmpeg последний полученный кадр: на входе
+ffmpeg получается ровный поток с постоянным FPS, а номер кадра считается от
+времени старта, так что время в записи совпадает с реальным (если запись
+на какое-то время не успевала, недостающие кадры дописываются повтором).
+"""
+import base64
+import threading
+import time
+from cdp_client import CDPClient
+
+# Качество JPEG кадров screencast (0-100)
+SCREENCAST_QUALITY = 80
+
+
+class ScreencastSource:
+    """Кадры вкладки из Page.startScreencast -> stdin ffmpeg"""
+
+    def __init__(self, driver, width: int, height: int, fps: int = 15, quality: int = SCREENCAST_QUALITY):
+        """
+        Args:
+            driver: Selenium WebDriver instance (вкладка встречи)
+            width, height: Максимальный размер кадра (окно браузера)
+            fps: Частота кадров на входе ffmpeg
+            quality: Качество JPEG
+        """
+        self.driver = driver
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.quality = quality
+        self.received = 0
+        self.written = 0
+        self._client = None
+        self._frame = None
+        self._frame_lock = threading.Lock()
+        self._first_frame = threading.Event()
+        self._stop = threading.Event()
+        self._writer = None
+
+    def ffmpeg_input_args(self) -> list:
+        """Вход ffmpeg: JPEG-кадры в stdin с постоянным FPS"""
+        return ["-f", "image2pipe", "-framerate", str(self.fps), "-codec:v", "mjpeg", "-i", "pipe:0"]
+
+    def start(self, timeout: float = 5) -> bool:
+        """Подключиться к вкладке и дождаться первого кадра"""
+        self._client = CDPClient.for_driver(self.driver)
+        self._client.on("Page.screencastFrame", self._on_frame)
+        self._client.send("Page.enable")
+        self._client.send("Page.startScreencast", self._screencast_params())
+        if not self._first_frame.wait(timeout):
+            # Статичная страница может не перерисовываться - просим кадр явно
+            self._client.send("Page.bringToFront")
+            return self._first_frame.wait(timeout)
+        return True
+
+    def _screencast_params(self) -> dict:
+        return {
+            "format": "jpeg",
+            "quality": self.quality,
+            "maxWidth": self.width,
+            "maxHeight": self.height,
+            "everyNthFrame": 1,
+        }
+
+    def resume(self):
+        """Перезапустить screencast после перезагрузки вкладки (пока нет кадров, пишется последний)"""
+        try:
+            self._client.send("Page.startScreencast", self._screencast_params())
+        except Exception as e:
+            print(f"   ⚠️  Screencast не возобновился: {e}")
+
+    def _on_frame(self, params: dict):
+        # Подтверждение обязательно: без него Chrome перестаёт слать кадры
+        self._client.send_nowait("Page.screencastFrameAck", {"sessionId": params["sessionId"]})
+        frame = base64.b64decode(params["data"])
+        with self._frame_lock:
+            self._frame = frame
+        self.received += 1
+        self._first_frame.set()
+
+    def attach(self, stream):
+        """Начать отдавать кадры в stdin ffmpeg"""
+        self._writer = threading.Thread(target=self._write, args=(stream,), name="screencast-writer", daemon=True)
+        self._writer.start()
+
+    def _write(self, stream):
+        started = time.monotonic()
+        interval = 1 / self.fps
+        try:
+            while not self._stop.is_set():
+                due = int((time.monotonic() - started) * self.fps) + 1
+                with self._frame_lock:
+                    frame = self._frame
+                while self.written < due and frame is not None:
+                    stream.write(frame)
+                    self.written += 1
+                stream.flush()
+                self._stop.wait(started + self.written * interval - time.monotonic())
+        except (BrokenPipeError, ValueError, OSError):
+            # ffmpeg завершился
+            pass
+        finally:
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+    def stop(self):
+        """Остановить screencast; stdin ffmpeg закрывается - видео-вход получает EOF"""
+        self._stop.set()
+        if self._client:
+            try:
+                self._client.send("Page.stopScreencast", timeout=2)
+            except Exception:
+                pass
+            self._client.close()
+        if self._writer:
+            self._writer.join(timeout=2)
+
+    def stats(self) -> dict:
+        return {"received_frames": self.received, "written_frames": self.written}
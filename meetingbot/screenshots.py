@@ -0,0 +1,159 @@
+"""
+Screenshot Pipeline - асинхронные скриншоты через CDP
+
+Политика "on_failure" (бортовой самописец): снимки шагов уменьшаются и хранятся
+в памяти в кольцевом буфере, на диск попадают только при сбое подключения.
+Политика "always" (отладка) - каждый снимок сразу пишется на диск.
+"""
+import base64
+import queue
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+# Расширения файлов для форматов CDP Page.captureScreenshot
+FORMAT_EXTENSIONS = {
+    "png": ".png",
+    "jpeg": ".jpg",
+    "webp": ".webp",
+}
+
+# Политики записи скриншотов
+POLICY_ALWAYS = "always"
+POLICY_ON_FAILURE = "on_failure"
+
+# Кольцевой буфер: сколько последних снимков держать, их масштаб и качество JPEG
+RING_SIZE = 20
+RING_SCALE = 0.5
+RING_QUALITY = 60
+
+
+class ScreenshotPipeline:
+    """Очередь скриншотов: снимок через CDP в вызывающем потоке,
+    декодирование и запись на диск - в фоновом потоке"""
+
+    def __init__(self, driver, screenshots_dir: Path, image_format="png", quality=80, scale=1.0,
+                 viewport=None, clip=None, policy=POLICY_ALWAYS, ring_size=RING_SIZE, ring_scale=RING_SCALE):
+        """
+        Args:
+            driver: Selenium WebDriver instance
+            screenshots_dir: Папка для скриншотов
+            image_format: Формат ("png", "jpeg", "webp")
+            quality: Качество 0-100 (только для jpeg/webp)
+            scale: Масштаб снимка (1.0 = как есть)
+            viewport: (ширина, высота) окна - нужен для масштабирования без clip
+            clip: Область снимка {"x", "y", "width", "height"} (опционально)
+            policy: POLICY_ALWAYS - писать каждый снимок, POLICY_ON_FAILURE - держать последние
+                ring_size снимков (JPEG, масштаб ring_scale) в памяти до persist()
+            ring_size: Размер кольцевого буфера
+            ring_scale: Дополнительное уменьшение снимков в буфере
+        """
+        if image_format not in FORMAT_EXTENSIONS:
+            raise ValueError(f"Неизвестный формат скриншотов: {image_format}")
+        if policy not in (POLICY_ALWAYS, POLICY_ON_FAILURE):
+            raise ValueError(f"Неизвестная политика скриншотов: {policy}")
+
+        self.driver = driver
+        self.screenshots_dir = screenshots_dir
+        self.image_format = image_format
+        self.quality = quality
+        self.scale = scale
+        self.viewport = viewport
+        self.clip = clip
+        self.policy = policy
+        self.ring_scale = ring_scale
+        self._ring = deque(maxlen=ring_size)
+        self.counter = 0
+        self.written = 0
+        self.failed = 0
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._write_loop, name="screenshot-writer", daemon=True)
+        self._worker.start()
+
+    @property
+    def buffered(self) -> bool:
+        return self.policy == POLICY_ON_FAILURE
+
+    def _capture_params(self, image_format: str, quality: int, scale: float) -> dict:
+        params = {"format": image_format, "optimizeForSpeed": True}
+        if image_format != "png":
+            params["quality"] = quality
+
+        clip = self.clip
+        if clip is None and scale != 1.0 and self.viewport:
+            clip = {"x": 0, "y": 0, "width": self.viewport[0], "height": self.viewport[1]}
+        if clip is not None:
+            params["clip"] = dict(clip, scale=scale)
+        return params
+
+    def capture(self, name=None) -> Path:
+        """Снять скриншот и поставить его в очередь на запись (или в кольцевой буфер)
+
+        Returns:
+            Path: Путь, по которому файл будет записан (в режиме буфера - если буфер сохранят)
+        """
+        self.counter += 1
+
+        if name is None:
+            name = f"{self.counter:02d}_screenshot.png"
+
+        started = time.time()
+        if self.buffered:
+            # Уменьшенный JPEG в памяти: base64 не декодируется, пока буфер не понадобится
+            path = self.screenshots_dir / Path(name).with_suffix(FORMAT_EXTENSIONS["jpeg"]).name
+            params = self._capture_params("jpeg", RING_QUALITY, self.scale * self.ring_scale)
+            result = self.driver.execute_cdp_cmd("Page.captureScreenshot", params)
+            self._ring.append((self.counter, path, result["data"]))
+            print(f"📸 Скриншот #{self.counter} в буфер за {(time.time() - started) * 1000:.0f} мс: {path.stem}")
+            return path
+
+        path = self.screenshots_dir / Path(name).with_suffix(FORMAT_EXTENSIONS[self.image_format]).name
+        result = self.driver.execute_cdp_cmd("Page.captureScreenshot",
+                                             self._capture_params(self.image_format, self.quality, self.scale))
+        self._queue.put((self.counter, path, result["data"]))
+        print(f"📸 Скриншот #{self.counter} снят за {(time.time() - started) * 1000:.0f} мс: {path.name}")
+
+        return path
+
+    def persist(self, reason: str) -> int:
+        """Сбой: записать кольцевой буфер на диск; возвращает число снимков"""
+        frames = list(self._ring)
+        self._ring.clear()
+        for item in frames:
+            self._queue.put(item)
+        if frames:
+            print(f"   💾 Буфер скриншотов на диск ({reason}): {len(frames)} снимков")
+        return len(frames)
+
+    def discard(self):
+        """Подключение удалось: снимки из буфера не нужны"""
+        self._ring.clear()
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                number, path, data = item
+                temp_path = path.with_name(f".{path.name}.tmp")
+                temp_path.write_bytes(base64.b64decode(data))
+                temp_path.replace(path)
+                self.written += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"   ⚠️  Не удалось записать скриншот #{number}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """Дождаться записи всех снятых скриншотов"""
+        self._queue.join()
+
+    def close(self):
+        """Дописать очередь и остановить фоновый поток"""
+        if self._worker.is_alive():
+            self._queue.put(None)
+            self._worker.join()
+        print(f"   📸 Скриншотов записано: {self.written}" + (f", ошибок: {self.failed}" if self.failed else ""))
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Session Index - SQLite индекс сессий (sessions/index.sqlite3)
+
+Бот добавляет строку при старте сессии и обновляет её по manifest.json при
+завершении, поэтому поиск сессий - запрос по индексу, а не обход sessions/.
+
+Запуск как скрипт:
+    python session_index.py list [--since 2025-10-01] [--until ...] [--url https://zoom.us/j/123]
+                                 [--status finished] [--reason ended] [--min-duration 600]
+                                 [--limit 50] [--json]
+    python session_index.py show <session_id>
+    python session_index.py rebuild     # переиндексировать по manifest.json (миграция/восстановление)
+"""
+import argparse
+import json
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+DEFAULT_SESSIONS_DIR = Path(__file__).parent / "sessions"
+INDEX_FILENAME = "index.sqlite3"
+MANIFEST_FILENAME = "manifest.json"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id       TEXT PRIMARY KEY,
+    meeting_url      TEXT,
+    bot_name         TEXT,
+    platform         TEXT,
+    status           TEXT,
+    exit_reason      TEXT,
+    started_at       REAL,
+    ended_at         REAL,
+    duration_seconds REAL,
+    recording_mode   TEXT,
+    recording_bytes  INTEGER,
+    session_dir      TEXT,
+    updated_at       REAL,
+    total_bytes      INTEGER,
+    compacted_at     REAL,
+    accessed_at      REAL
+);
+CREATE INDEX IF NOT EXISTS sessions_started_at ON sessions (started_at);
+CREATE INDEX IF NOT EXISTS sessions_meeting_url ON sessions (meeting_url, started_at);
+CREATE INDEX IF NOT EXISTS sessions_status ON sessions (status, started_at);
+CREATE INDEX IF NOT EXISTS sessions_duration ON sessions (duration_seconds);
+"""
+
+# Колонки, добавленные после первой версии схемы (ALTER TABLE для существующих индексов)
+MIGRATIONS = {
+    "total_bytes": "INTEGER",
+    "compacted_at": "REAL",
+    "accessed_at": "REAL",
+}
+
+# Индексы по колонкам из MIGRATIONS - создаются после миграции
+POST_MIGRATION_SCHEMA = """
+CREATE INDEX IF NOT EXISTS sessions_compaction ON sessions (compacted_at, status);
+CREATE INDEX IF NOT EXISTS sessions_lru ON sessions (status, accessed_at);
+"""
+
+# Время последнего использования сессии (для LRU): просмотр через CLI, иначе завершение/старт
+LAST_USED_SQL = "COALESCE(accessed_at, ended_at, started_at, 0)"
+
+COLUMNS = ("session_id", "meeting_url", "bot_name", "platform", "status", "exit_reason", "started_at",
+           "ended_at", "duration_seconds", "recording_mode", "recording_bytes", "session_dir", "updated_at",
+           "total_bytes", "compacted_at", "accessed_at")
+
+
+class SessionIndex:
+    """Индекс сессий в SQLite (WAL: параллельные сессии пишут, CLI читает одновременно)"""
+
+    def __init__(self, sessions_dir: Path = None):
+        """
+        Args:
+            sessions_dir: Папка сессий (индекс - sessions_dir/index.sqlite3)
+        """
+        self.sessions_dir = Path(sessions_dir or DEFAULT_SESSIONS_DIR)
+        self.sessions_dir.mkdir(parents=True, exist_ok=True)
+        self.path = self.sessions_dir / INDEX_FILENAME
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), timeout=10, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        existing = {row["name"] for row in self._db.execute("PRAGMA table_info(sessions)")}
+        with self._db:
+            for column, column_type in MIGRATIONS.items():
+                if column not in existing:
+                    self._db.execute(f"ALTER TABLE sessions ADD COLUMN {column} {column_type}")
+        self._db.executescript(POST_MIGRATION_SCHEMA)
+
+    def _upsert(self, values: dict):
+        values = dict(values, updated_at=time.time())
+        columns = [c for c in COLUMNS if c in values]
+        updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c != "session_id")
+        with self._lock, self._db:
+            self._db.execute(
+                f"INSERT INTO sessions ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)}) "
+                f"ON CONFLICT(session_id) DO UPDATE SET {updates}",
+                [values[c] for c in columns]
+            )
+
+    def session_started(self, session_id: str, config, session_dir: Path, started_at: float = None):
+        """Сессия запущена (status=running)"""
+        self._upsert({
+            "session_id": session_id,
+            "meeting_url": config.meeting_url,
+            "bot_name": config.bot_name,
+            "platform": config.connector_type,
+            "status": "running",
+            "started_at": started_at or time.time(),
+            "recording_mode": config.recording_mode if config.enable_recording else None,
+            "session_dir": str(session_dir),
+        })
+
+    def session_finished(self, manifest: dict):
+        """Сессия завершена - строка обновляется по manifest.json"""
+        recording = manifest.get("recording") or {}
+        self._upsert({
+            "session_id": manifest["session_id"],
+            "meeting_url": manifest.get("meeting_url"),
+            "bot_name": manifest.get("bot_name"),
+            "platform": manifest.get("platform"),
+            "status": manifest.get("status"),
+            "exit_reason": manifest.get("exit_reason"),
+            "started_at": manifest.get("started_at"),
+            "ended_at": manifest.get("ended_at"),
+            "duration_seconds": manifest.get("duration_seconds"),
+            "recording_mode": recording.get("mode"),
+            "recording_bytes": recording.get("bytes"),
+            "session_dir": manifest.get("session_dir"),
+        })
+
+    def get(self, session_id: str):
+        with self._lock:
+            row = self._db.execute("SELECT * FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return dict(row) if row else None
+
+    def query(self, since: float = None, until: float = None, meeting_url: str = None, status: str = None,
+              exit_reason: str = None, min_duration: float = None, limit: int = 100) -> list:
+        """Сессии по фильтрам, новые первыми
+
+        Args:
+            since/until: Границы started_at (unix time)
+            meeting_url: Точный URL или его начало (диапазон по индексу sessions_meeting_url)
+            status: running / finished / failed
+            exit_reason: Причина завершения (ended, removed, left, max_duration, ...)
+            min_duration: Минимальная длительность (сек)
+            limit: Максимум строк
+        """
+        where, params = [], []
+        if since is not None:
+            where.append("started_at >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("started_at < ?")
+            params.append(until)
+        if meeting_url:
+            # Префикс как диапазон строк: LIKE '%...%' не использует индекс и читает всю таблицу
+            where.append("meeting_url >= ? AND meeting_url < ?")
+            params += [meeting_url, meeting_url[:-1] + chr(ord(meeting_url[-1]) + 1)]
+        if status:
+            where.append("status = ?")
+            params.append(status)
+        if exit_reason:
+            where.append("exit_reason = ?")
+            params.append(exit_reason)
+        if min_duration is not None:
+            where.append("duration_seconds >= ?")
+            params.append(min_duration)
+
+        sql = "SELECT * FROM sessions"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY started_at DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            return [dict(row) for row in self._db.execute(sql, params)]
+
+    def rebuild(self) -> int:
+        """Переиндексировать все manifest.json (единственный случай обхода sessions/)"""
+        count = 0
+        for manifest_path in sorted(self.sessions_dir.glob(f"*/{MANIFEST_FILENAME}")):
+            try:
+                self.session_finished(json.loads(manifest_path.read_text()))
+                count += 1
+            except (json.JSONDecodeError, KeyError) as e:
+                print(f"   ⚠️  Пропущен {manifest_path}: {e}")
+        return count
+
+    def touch(self, session_id: str):
+        """Отметить использование сессии (LRU при очистке по размеру)"""
+        with self._lock, self._db:
+            self._db.execute("UPDATE sessions SET accessed_at = ? WHERE session_id = ?", (time.time(), session_id))
+
+    def compaction_candidates(self, min_age_seconds: float = 0, limit: int = 10) -> list:
+        """Завершённые, ещё не сжатые сессии (старые первыми)"""
+        with self._lock:
+            return [dict(row) for row in self._db.execute(
+                "SELECT * FROM sessions WHERE compacted_at IS NULL AND status IN ('finished', 'failed') "
+                "AND ended_at <= ? ORDER BY ended_at LIMIT ?",
+                (time.time() - min_age_seconds, limit)
+            )]
+
+    def mark_compacted(self, session_id: str, total_bytes: int, recording_bytes: int = None):
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE sessions SET compacted_at = ?, total_bytes = ?, "
+                "recording_bytes = COALESCE(?, recording_bytes), updated_at = ? WHERE session_id = ?",
+                (time.time(), total_bytes, recording_bytes, time.time(), session_id)
+            )
+
+    def set_total_bytes(self, session_id: str, total_bytes: int):
+        with self._lock, self._db:
+            self._db.execute("UPDATE sessions SET total_bytes = ? WHERE session_id = ?", (total_bytes, session_id))
+
+    def expired(self, older_than: float) -> list:
+        """Сессии, начатые раньше older_than (unix time)
+
+        "running" старше суток - процесс бота упал, не дописав manifest: такие тоже устаревают.
+        """
+        with self._lock:
+            return [dict(row) for row in self._db.execute(
+                "SELECT * FROM sessions WHERE started_at < ? AND (status != 'running' OR started_at < ?) "
+                "ORDER BY started_at",
+                (older_than, min(older_than, time.time() - 86400))
+            )]
+
+    def least_recently_used(self) -> list:
+        """Не работающие сессии по давности использования (кандидаты на вытеснение первыми)"""
+        with self._lock:
+            return [dict(row) for row in self._db.execute(
+                f"SELECT * FROM sessions WHERE status != 'running' ORDER BY {LAST_USED_SQL}"
+            )]
+
+    def delete(self, session_id: str):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def _parse_time(value: str) -> float:
+    return datetime.fromisoformat(value).timestamp()
+
+
+def _format_time(value) -> str:
+    return datetime.fromtimestamp(value).strftime("%Y-%m-%d %H:%M:%S") if value else "-"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Индекс сессий MeetingBot")
+    parser.add_argument("--sessions-dir", type=Path, default=DEFAULT_SESSIONS_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = commands.add_parser("list", help="Список сессий по фильтрам")
+    list_parser.add_argument("--since", type=_parse_time, help="ISO дата/время (started_at >=)")
+    list_parser.add_argument("--until", type=_parse_time, help="ISO дата/время (started_at <)")
+    list_parser.add_argument("--url", help="URL встречи или его начало, например https://zoom.us/j/123")
+    list_parser.add_argument("--status")
+    list_parser.add_argument("--reason", help="Причина завершения")
+    list_parser.add_argument("--min-duration", type=float, help="Минимальная длительность (сек)")
+    list_parser.add_argument("--limit", type=int, default=50)
+    list_parser.add_argument("--json", action="store_true", help="Вывод в JSON")
+
+    show_parser = commands.add_parser("show", help="Manifest сессии")
+    show_parser.add_argument("session_id")
+
+    commands.add_parser("rebuild", help="Переиндексировать manifest.json")
+
+    args = parser.parse_args()
+    index = SessionIndex(args.sessions_dir)
+
+    if args.command == "rebuild":
+        print(f"✅ Проиндексировано сессий: {index.rebuild()}")
+    elif args.command == "show":
+        row = index.get(args.session_id)
+        if not row:
+            print(f"Сессия {args.session_id} не найдена")
+            sys.exit(1)
+        index.touch(args.session_id)
+        manifest_path = Path(row["session_dir"] or args.sessions_dir / args.session_id) / MANIFEST_FILENAME
+        print(manifest_path.read_text() if manifest_path.exists() else json.dumps(row, ensure_ascii=False, indent=2))
+    else:
+        rows = index.query(since=args.since, until=args.until, meeting_url=args.url, status=args.status,
+                           exit_reason=args.reason, min_duration=args.min_duration, limit=args.limit)
+        if args.json:
+            print(json.dumps(rows, ensure_ascii=False, indent=2))
+            return
+        header = f"{'session_id':<24} {'начало':<19} {'длит.':>7} {'статус':<9} {'причина':<13} url"
+        print(header)
+        print("-" * len(header))
+        for row in rows:
+            duration = f"{int(row['duration_seconds'] // 60)}м" if row["duration_seconds"] is not None else "-"
+            print(f"{row['session_id']:<24} {_format_time(row['started_at']):<19} {duration:>7} "
+                  f"{row['status'] or '-':<9} {row['exit_reason'] or '-':<13} {row['meeting_url']}")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+"""Модули бота лежат плоско в meetingbot/ - делаем их импортируемыми из тестов"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,84 @@
+"""Очередь заданий демона и admission control (без оркестратора и браузера)"""
+import pytest
+import daemon
+from daemon import JobQueue, admission
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(tmp_path / "jobs.sqlite3")
+    yield queue
+    queue.close()
+
+
+def test_add_rejects_reserved_fields(queue):
+    with pytest.raises(ValueError):
+        queue.add("https://zoom.us/j/1", start_at=100, overrides={"display": ":5"})
+
+
+def test_due_returns_queued_jobs_by_start_time(queue):
+    late = queue.add("https://zoom.us/j/2", start_at=200)
+    early = queue.add("https://zoom.us/j/1", start_at=100)
+    queue.add("https://zoom.us/j/3", start_at=300)
+    assert [job["job_id"] for job in queue.due(250)] == [early, late]
+
+
+def test_recover_requeues_submitted_and_fails_running(queue):
+    submitted = queue.add("https://zoom.us/j/1", start_at=100)
+    running = queue.add("https://zoom.us/j/2", start_at=100)
+    queued = queue.add("https://zoom.us/j/3", start_at=100)
+    finished = queue.add("https://zoom.us/j/4", start_at=100)
+    queue.update(submitted, state="submitted", session_id="s1")
+    queue.update(running, state="running", session_id="s2")
+    queue.update(finished, state="finished", session_id="s4")
+
+    assert queue.recover() == 1
+
+    job = queue.get(submitted)
+    assert job["state"] == "queued" and job["session_id"] is None
+    job = queue.get(running)
+    assert job["state"] == "failed" and job["error"] == "daemon restarted"
+    assert queue.get(queued)["state"] == "queued"
+    assert queue.get(finished)["state"] == "finished"
+    assert sorted(job["job_id"] for job in queue.due(100)) == [submitted, queued]
+
+
+def test_recover_is_noop_on_clean_queue(queue):
+    queue.add("https://zoom.us/j/1", start_at=100)
+    assert queue.recover() == 0
+
+
+def test_cancel_skips_final_jobs(queue):
+    job_id = queue.add("https://zoom.us/j/1", start_at=100)
+    assert queue.cancel(job_id)
+    assert not queue.cancel(job_id)
+    assert queue.get(job_id)["state"] == "cancelled"
+
+
+@pytest.fixture
+def headroom(monkeypatch):
+    state = {"memory_available_mb": 4000, "load_per_cpu": 0.1, "cpus": 4}
+    monkeypatch.setattr(daemon, "host_headroom", lambda: dict(state))
+    monkeypatch.setattr(daemon, "ADMISSION_MIN_FREE_MEMORY_MB", 1000)
+    monkeypatch.setattr(daemon, "ADMISSION_SESSION_MEMORY_MB", 800)
+    monkeypatch.setattr(daemon, "ADMISSION_MAX_LOAD_PER_CPU", 0.85)
+    monkeypatch.setattr(daemon, "ADMISSION_SESSION_LOAD", 0.5)
+    return state
+
+
+def test_admission_counts_pending_sessions_memory(headroom):
+    # 1000 + 3 * 800 = 3400 <= 4000, 1000 + 4 * 800 = 4200 > 4000
+    assert admission(pending=2) == (True, None)
+    admitted, reason = admission(pending=3)
+    assert not admitted and "MB" in reason
+
+
+def test_admission_rejects_high_load(headroom):
+    headroom["load_per_cpu"] = 0.8
+    admitted, reason = admission(pending=0)
+    assert not admitted and "load" in reason
+
+
+def test_admission_without_memory_metrics_checks_load_only(headroom):
+    headroom["memory_available_mb"] = None
+    assert admission(pending=3) == (True, None)
@@ -0,0 +1,153 @@
+"""Поиск простоев и выравнивание окон кусков на общей шкале (без ffmpeg)"""
+import json
+import numpy as np
+import pytest
+import idle_compactor
+from idle_compactor import analyze_chunk, idle_spans, kept_spans, to_original
+
+WINDOW = idle_compactor.IDLE_WINDOW_SECONDS
+KEEP = idle_compactor.IDLE_KEEP_SECONDS
+
+
+# --- idle_spans ---
+
+def test_idle_spans_keeps_only_long_runs():
+    idle = np.array([0, 1, 1, 1, 1, 0, 1, 1], dtype=bool)
+    assert idle_spans(idle, window=0.5, min_seconds=1.0) == [(0.5, 2.5), (3.0, 4.0)]
+    assert idle_spans(idle, window=0.5, min_seconds=1.5) == [(0.5, 2.5)]
+
+
+def test_idle_spans_at_start_and_end_of_recording():
+    idle = np.array([1, 1, 1, 0, 0, 1, 1, 1], dtype=bool)
+    assert idle_spans(idle, window=1.0, min_seconds=3.0) == [(0.0, 3.0), (5.0, 8.0)]
+
+
+def test_idle_spans_empty_mask():
+    assert idle_spans(np.zeros(0, dtype=bool)) == []
+
+
+# --- kept_spans ---
+
+def test_kept_spans_cut_in_the_middle_keeps_context():
+    assert kept_spans(60.0, [(10.0, 40.0)], keep=1.5) == [(0.0, 11.5), (38.5, 60.0)]
+
+
+def test_kept_spans_cut_at_start():
+    assert kept_spans(60.0, [(0.0, 30.0)], keep=1.5) == [(0.0, 1.5), (28.5, 60.0)]
+
+
+def test_kept_spans_cut_at_end_is_clamped_to_duration():
+    assert kept_spans(60.0, [(40.0, 70.0)], keep=1.5) == [(0.0, 41.5), (58.5, 60.0)]
+
+
+@pytest.mark.parametrize("length", [2 * KEEP - WINDOW, 2 * KEEP])
+def test_kept_spans_ignores_cuts_not_longer_than_context(length):
+    assert kept_spans(60.0, [(10.0, 10.0 + length)], keep=KEEP) == [(0.0, 60.0)]
+
+
+def test_kept_spans_adjacent_cuts():
+    cuts = [(5.0, 20.0), (20.0, 30.0)]
+    assert kept_spans(40.0, cuts, keep=1.0) == [(0.0, 6.0), (19.0, 21.0), (29.0, 40.0)]
+
+
+# --- to_original ---
+
+INDEX = {"spans": [
+    {"original_start": 0.0, "condensed_start": 0.0, "duration": 10.0},
+    {"original_start": 30.0, "condensed_start": 10.0, "duration": 5.0},
+]}
+
+
+@pytest.mark.parametrize("condensed, original", [(0.0, 0.0), (9.5, 9.5), (10.0, 30.0), (12.0, 32.0)])
+def test_to_original_inside_spans(condensed, original):
+    assert to_original(INDEX, condensed) == original
+
+
+def test_to_original_past_last_span_is_end_of_recording():
+    assert to_original(INDEX, 15.0) == 35.0
+    assert to_original(INDEX, 100.0) == 35.0
+
+
+def test_to_original_without_spans():
+    assert to_original({"spans": []}, 5.0) == 0.0
+
+
+# --- analyze_chunk: опережающее окно и стыки кусков ---
+
+# Шкала записи по окнам: громко в окнах 10-12, картинка меняется в окне 25
+LEVELS = np.full(40, -60.0, dtype=np.float32)
+LEVELS[10:13] = -20.0
+FRAMES = np.zeros(40, dtype=np.float32)
+FRAMES[25:] = 0.5
+
+
+def _expected_idle():
+    deltas = np.concatenate([[0.0], np.abs(np.diff(FRAMES))])
+    return (LEVELS < idle_compactor.IDLE_SILENCE_DB) & (deltas < idle_compactor.IDLE_FRAME_DELTA)
+
+
+@pytest.fixture
+def fake_decoders(monkeypatch):
+    """Декодеры как ffmpeg: по окну на отрезок, дельта - только между кадрами самого отрезка"""
+    def window_range(start, duration):
+        return round(start / WINDOW), min(round((start + duration) / WINDOW), len(LEVELS))
+
+    def audio_levels(path, start, duration):
+        first, last = window_range(start, duration)
+        return LEVELS[first:last]
+
+    def frame_deltas(path, start, duration):
+        first, last = window_range(start, duration)
+        return np.abs(np.diff(FRAMES[first:last]))
+
+    monkeypatch.setattr(idle_compactor, "audio_levels", audio_levels)
+    monkeypatch.setattr(idle_compactor, "frame_deltas", frame_deltas)
+
+
+@pytest.mark.parametrize("boundaries", [(0, 40), (0, 10, 40), (0, 11, 25, 26, 40), (0, 1, 2, 40)])
+def test_analyze_chunk_masks_join_into_whole_recording(fake_decoders, boundaries):
+    masks = [
+        analyze_chunk("recording.mp4", first * WINDOW, (last - first) * WINDOW, True, True)
+        for first, last in zip(boundaries, boundaries[1:])
+    ]
+    np.testing.assert_array_equal(np.concatenate(masks), _expected_idle())
+
+
+def test_analyze_chunk_pads_short_decoder_output(fake_decoders):
+    # Декодер отдал на окно меньше: последнее окно повторяет предыдущее
+    mask = analyze_chunk("recording.mp4", 30 * WINDOW, 12 * WINDOW, True, False)
+    assert len(mask) == 12
+    assert mask[-1] == mask[-3]
+
+
+# --- condense: несколько сегментов на одной шкале ---
+
+def test_condense_places_segment_chunks_on_global_timeline(tmp_path, monkeypatch):
+    durations = {"recording_000.mp4": 30.0, "recording_001.mp4": 30.0}
+    offsets = {"recording_000.mp4": 0.0, "recording_001.mp4": 30.0}
+    # Простой с 20 по 45 сек - через границу сегментов
+    timeline = np.zeros(120, dtype=bool)
+    timeline[40:90] = True
+    rendered = {}
+
+    def probe(path):
+        return {"duration": durations[path.name], "has_audio": True, "has_video": True}
+
+    def fake_analyze_chunk(path, start, duration, has_audio, has_video):
+        first = round((offsets[path.rsplit("/", 1)[-1]] + start) / WINDOW)
+        return timeline[first:first + int(np.ceil(duration / WINDOW))]
+
+    monkeypatch.setattr(idle_compactor, "IDLE_CHUNK_SECONDS", 7.0)
+    monkeypatch.setattr(idle_compactor, "probe", probe)
+    monkeypatch.setattr(idle_compactor, "analyze_chunk", fake_analyze_chunk)
+    monkeypatch.setattr(idle_compactor, "_render", lambda sources, kept, output: rendered.update(kept=kept))
+
+    files = [tmp_path / name for name in durations]
+    index = idle_compactor.condense(files, tmp_path / "recording.condensed.mp4", workers=1)
+
+    assert index["original_seconds"] == 60.0
+    assert index["cuts"] == [{"start": 20.0 + KEEP, "end": 45.0 - KEEP}]
+    assert rendered["kept"] == [(0.0, 20.0 + KEEP), (45.0 - KEEP, 60.0)]
+    assert index["condensed_seconds"] == 60.0 - (25.0 - 2 * KEEP)
+    saved = json.loads((tmp_path / idle_compactor.CONDENSED_INDEX_FILENAME).read_text())
+    assert to_original(saved, 20.0 + KEEP) == 45.0 - KEEP
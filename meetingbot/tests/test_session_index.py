@@ -0,0 +1,79 @@
+"""Индекс сессий: поиск по началу URL и миграция старой схемы"""
+import sqlite3
+from types import SimpleNamespace
+import pytest
+from session_index import INDEX_FILENAME, MIGRATIONS, SessionIndex
+
+URLS = [
+    "https://zoom.us/j/123",
+    "https://zoom.us/j/123?pwd=abc",
+    "https://zoom.us/j/1234",
+    "https://zoom.us/j/12",
+    "https://zoom.us/j/999",
+    "https://example.com/?next=https://zoom.us/j/123",
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = SessionIndex(tmp_path)
+    for i, url in enumerate(URLS):
+        config = SimpleNamespace(meeting_url=url, bot_name="Bot", connector_type="zoom",
+                                 enable_recording=False, recording_mode=None)
+        index.session_started(f"s{i}", config, tmp_path / f"s{i}", started_at=1000 + i)
+    return index
+
+
+def _urls(rows):
+    return sorted(row["meeting_url"] for row in rows)
+
+
+def test_query_by_url_matches_only_prefix(index):
+    assert _urls(index.query(meeting_url="https://zoom.us/j/123")) == sorted([
+        "https://zoom.us/j/123", "https://zoom.us/j/123?pwd=abc", "https://zoom.us/j/1234",
+    ])
+
+
+def test_query_by_exact_url_with_query_string(index):
+    assert _urls(index.query(meeting_url="https://zoom.us/j/123?pwd=abc")) == ["https://zoom.us/j/123?pwd=abc"]
+
+
+def test_query_by_url_substring_finds_nothing(index):
+    assert index.query(meeting_url="zoom.us/j/123") == []
+
+
+def test_query_by_url_uses_index(index):
+    plan = index._db.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM sessions WHERE meeting_url >= ? AND meeting_url < ?", ("a", "b")
+    ).fetchall()
+    assert "sessions_meeting_url" in " ".join(row[-1] for row in plan)
+
+
+def test_query_combines_url_with_time_filter(index):
+    rows = index.query(meeting_url="https://zoom.us/j/123", since=1001)
+    assert [row["session_id"] for row in rows] == ["s2", "s1"]
+
+
+def test_migrates_first_schema_version(tmp_path):
+    db = sqlite3.connect(str(tmp_path / INDEX_FILENAME))
+    db.executescript("""
+        CREATE TABLE sessions (
+            session_id TEXT PRIMARY KEY, meeting_url TEXT, bot_name TEXT, platform TEXT, status TEXT,
+            exit_reason TEXT, started_at REAL, ended_at REAL, duration_seconds REAL, recording_mode TEXT,
+            recording_bytes INTEGER, session_dir TEXT, updated_at REAL
+        );
+        INSERT INTO sessions (session_id, meeting_url, status, started_at)
+        VALUES ('old', 'https://zoom.us/j/1', 'finished', 5);
+    """)
+    db.close()
+
+    index = SessionIndex(tmp_path)
+    columns = {row["name"] for row in index._db.execute("PRAGMA table_info(sessions)")}
+    assert set(MIGRATIONS) <= columns
+    indexes = {row["name"] for row in index._db.execute("PRAGMA index_list(sessions)")}
+    assert {"sessions_compaction", "sessions_lru"} <= indexes
+    row = index.get("old")
+    assert row["meeting_url"] == "https://zoom.us/j/1" and row["total_bytes"] is None
+
+    # Повторное открытие уже мигрированного индекса ничего не ломает
+    SessionIndex(tmp_path)
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Tracing - замер длительности шагов сессии (spans) в sessions/<id>/trace.jsonl
+
+Запуск как скрипт агрегирует p50/p95 по шагам из множества сессий:
+    python tracing.py [sessions_dir]
+"""
+import json
+import math
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+
+class Tracer:
+    """Пишет spans в JSONL: имя, время начала/конца, число WebDriver-запросов, исход"""
+
+    def __init__(self, path: Path = None, session_id: str = None):
+        """
+        Args:
+            path: Файл trace.jsonl (None - трассировка отключена)
+            session_id: ID сессии (пишется в каждый span)
+        """
+        self.path = path
+        self.session_id = session_id
+        self._file = open(path, "a", buffering=1) if path else None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.webdriver_calls = 0  # всего по всем потокам
+
+    @property
+    def enabled(self) -> bool:
+        return self._file is not None
+
+    def instrument_driver(self, driver):
+        """Считать все команды WebDriver (каждая = HTTP round trip к chromedriver)"""
+        original = getattr(driver, "_untraced_execute", None) or driver.execute
+        driver._untraced_execute = original
+
+        def execute(driver_command, params=None):
+            self._thread_calls()[0] += 1
+            with self._lock:
+                self.webdriver_calls += 1
+            return original(driver_command, params)
+
+        driver.execute = execute
+
+    def _thread_calls(self) -> list:
+        """Счётчик запросов текущего потока: span учитывает только свой поток, а не параллельные
+        подготовку записи, скриншоты и монитор вкладки"""
+        if not hasattr(self._local, "calls"):
+            self._local.calls = [0]
+        return self._local.calls
+
+    def _stack(self) -> list:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def _start(self, name: str, attrs: dict) -> dict:
+        stack = self._stack()
+        span = {
+            "name": name,
+            "parent": stack[-1]["name"] if stack else None,
+            "start": time.time(),
+            "_perf": time.perf_counter(),
+            "_counter": self._thread_calls(),
+            "_calls": self._thread_calls()[0],
+            "attrs": dict(attrs),
+        }
+        stack.append(span)
+        return span
+
+    def _end(self, span: dict, outcome: str, error: str = None):
+        stack = self._stack()
+        if span in stack:
+            stack.remove(span)
+        record = {
+            "session_id": self.session_id,
+            "name": span["name"],
+            "parent": span["parent"],
+            "start": span["start"],
+            "end": time.time(),
+            "duration_ms": round((time.perf_counter() - span["_perf"]) * 1000, 2),
+            "webdriver_calls": span["_counter"][0] - span["_calls"],
+            "outcome": outcome,
+            "thread": threading.current_thread().name,
+        }
+        if error:
+            record["error"] = error
+        if span["attrs"]:
+            record["attrs"] = span["attrs"]
+        with self._lock:
+            # Файл мог быть закрыт, пока шаг выполнялся в другом потоке
+            if self._file:
+                self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """Span вокруг блока кода. Исход: "ok", либо "error" при исключении.
+
+        Внутри можно дописать атрибуты: span["attrs"]["key"] = value
+        или переопределить исход: span["outcome"] = "timeout"
+        """
+        span = self._start(name, attrs)
+        try:
+            yield span
+        except BaseException as e:
+            self._end(span, "error", f"{type(e).__name__}: {e}")
+            raise
+        self._end(span, span.get("outcome", "ok"))
+
+    def steps(self, prefix: str) -> "StepTracker":
+        """Последовательные шаги одного процесса (каждый next() закрывает предыдущий шаг)"""
+        return StepTracker(self, prefix)
+
+    def close(self):
+        if self._file:
+            with self._lock:
+                self._file.close()
+                self._file = None
+
+
+class StepTracker:
+    """Линейная последовательность spans: prefix.step1, prefix.step2, ..."""
+
+    def __init__(self, tracer: Tracer, prefix: str):
+        self.tracer = tracer
+        self.prefix = prefix
+        self.current = None
+
+    def next(self, step: str, **attrs):
+        """Закрыть текущий шаг (ok) и начать следующий"""
+        self.end()
+        self.current = self.tracer._start(f"{self.prefix}.{step}", attrs)
+
+    def annotate(self, **attrs):
+        """Добавить атрибуты текущему шагу"""
+        if self.current:
+            self.current["attrs"].update(attrs)
+
+    def end(self, outcome: str = "ok", error: str = None):
+        """Закрыть текущий шаг"""
+        if self.current:
+            self.tracer._end(self.current, outcome, error)
+            self.current = None
+
+    def fail(self, error, outcome: str = "error"):
+        """Закрыть текущий шаг с ошибкой"""
+        self.end(outcome, f"{type(error).__name__}: {error}" if isinstance(error, BaseException) else str(error))
+
+
+def percentile(values: list, p: float) -> float:
+    """Перцентиль методом ближайшего ранга"""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def load_spans(sessions_dir: Path):
+    for trace_path in sorted(sessions_dir.glob("*/trace.jsonl")):
+        with open(trace_path) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        # Недописанная строка (сессия упала во время записи)
+                        continue
+
+
+def aggregate(spans) -> dict:
+    """Сводка по имени шага: count, p50/p95 длительности, WebDriver-запросы, ошибки"""
+    groups = {}
+    for span in spans:
+        groups.setdefault(span["name"], []).append(span)
+
+    summary = {}
+    for name, items in groups.items():
+        durations = [s["duration_ms"] for s in items]
+        calls = [s.get("webdriver_calls", 0) for s in items]
+        summary[name] = {
+            "count": len(items),
+            "p50_ms": percentile(durations, 50),
+            "p95_ms": percentile(durations, 95),
+            "p50_webdriver_calls": percentile(calls, 50),
+            "p95_webdriver_calls": percentile(calls, 95),
+            "errors": sum(1 for s in items if s.get("outcome") != "ok"),
+        }
+    return summary
+
+
+def main():
+    sessions_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(__file__).parent / "sessions"
+    summary = aggregate(load_spans(sessions_dir))
+    if not summary:
+        print(f"Нет trace.jsonl в {sessions_dir}")
+        return
+
+    header = f"{'шаг':<40} {'n':>5} {'p50 мс':>10} {'p95 мс':>10} {'wd p50':>7} {'wd p95':>7} {'ошибки':>7}"
+    print(header)
+    print("-" * len(header))
+    for name in sorted(summary):
+        s = summary[name]
+        print(f"{name:<40} {s['count']:>5} {s['p50_ms']:>10.1f} {s['p95_ms']:>10.1f} "
+              f"{s['p50_webdriver_calls']:>7} {s['p95_webdriver_calls']:>7} {s['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()